@@ -47,6 +47,14 @@ BOUNDARY_CONDITION_EXPLICIT_INTENSITY: float = 1
 MC_SAMPLES: int = 1000
 NOISE_INCREMENTS: str = "classical" # see 'src.noise' for available choices
 
+# Control variate: the linear Stokes model driven by the same noise serves as control
+CONTROL_VARIATE: bool = False
+CONTROL_MODEL_NAME: str = "Stokes"     #solved by the algorithm ALGORITHM_NAME of this model, one linear solve per time step
+CONTROL_EXTRA_SAMPLES: int = 0     #additional samples of the control only to estimate its mean, must be positive if CONTROL_VARIATE is set
+                                   #without them the paired control mean cancels and the estimate equals the plain mean
+CONTROL_SEED: int | None = None    #seed of the separate random stream of the additional samples, None seeds from system entropy
+                                   #the additional samples use a fresh sampling strategy, hence they are independent of the paired samples
+
 # Noise coefficient
 NOISE_INTENSITY: float = 1000
 NOISE_COEFFICIENT_NAME: str = "polynomial" #see 'src.predefined_data' for available choices
@@ -70,12 +78,21 @@ IND_ENERGY_NUMBER: int = 100
 
 #Statistics
 STATISTICS_CHECK: bool = True
+STATISTICS_QUANTILES: list[float] = []     #e.g. [0.05, 0.95], streamed per time and degree of freedom
+                                           #each quantile stores 5 heights and 5 positions per entry, i.e., 10 times the memory of the mean array per level and statistics object
+STATISTICS_TIMES: str = "coarse"     #"coarse": statistics of all levels at the times of the coarsest level, only these times are stored by the algorithm; "all": all nodal times
 
 #Point statistics
 POINT_STATISTICS_CHECK: bool = True
 POINT: list[float] = [1/2.0,3/4.0]
 IND_POINT_STATISTICS_CHECK_NUMBER: int = 100
+PROBE_STATISTICS_CHECK: bool = True
+PROBE_POINTS: list[list[float]] = [[1/2.0,k/16.0] for k in range(1,16)]     #vertical line through the centre, all probes are stored in one .npz file
 
 #Increment check
 INCREMENT_CHECK: bool = True
 
+#Postprocessing pipeline
+POSTPROCESSING_QUEUE_SIZE: int = 2     #samples that wait for postprocessing on a background thread, 0 postprocesses synchronously
+                                       #only NumPy arrays are handed over, Firedrake and PETSc objects stay on the main thread
+
@@ -3,7 +3,7 @@ from matplotlib.lines import Line2D
 plt.rcParams['patch.edgecolor'] = 'none'
 import seaborn as sns
 import os
-from tools import read_datafile, organize_output
+from tools import read_datafile, organize_output, organize_individual_output
 
 
 ### select the experiments whose data will be visualised 
@@ -19,10 +19,9 @@ if __name__=="__main__":
 
     for expID in cf.EXPERIMENTS.keys():
         print(f'\nLoading data for {cf.EXPERIMENTS[expID]}') 
-        for n in range(cf.NUMBER_SAMPLES):
-            file_location = cf.ROOT_LOCATION + cf.EXPERIMENTS[expID] + cf.IND_LOCATION + f"_{n}/" + cf.DATA_SOURCE
-            complete_data = read_datafile(file_location)
-            time, L1, L2, Linf, SD = organize_output(complete_data)
+        file_location = cf.ROOT_LOCATION + cf.EXPERIMENTS[expID] + cf.IND_LOCATION + "/" + cf.DATA_SOURCE
+        time, trajectories = organize_individual_output(read_datafile(file_location),cf.NUMBER_SAMPLES)
+        for L2 in trajectories:
             for t, l2 in zip(time,L2):
                 if t >= cf.STATIONARY_TIME[expID]:
                     all_data[expID].append(l2)
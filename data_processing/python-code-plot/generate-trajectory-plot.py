@@ -1,6 +1,6 @@
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
-from tools import read_datafile, organize_output
+from tools import read_datafile, organize_output, organize_individual_output
 from tqdm import tqdm
 import os
 
@@ -22,11 +22,10 @@ if __name__=="__main__":
 
     #plot individual energy trajectory
     print(f"\tPlotting individual trajectories")
-    for n in tqdm(range(cf.NUMBER_SAMPLES)):
-        for expID in cf.EXPERIMENTS.keys():
-            file_location = cf.ROOT_LOCATION + cf.EXPERIMENTS[expID] + cf.IND_LOCATION + f"_{n}/" + cf.DATA_SOURCE
-            complete_data = read_datafile(file_location)
-            time, L1, L2, Linf, SD = organize_output(complete_data)
+    for expID in tqdm(cf.EXPERIMENTS.keys()):
+        file_location = cf.ROOT_LOCATION + cf.EXPERIMENTS[expID] + cf.IND_LOCATION + "/" + cf.DATA_SOURCE
+        time, trajectories = organize_individual_output(read_datafile(file_location),cf.NUMBER_SAMPLES)
+        for L2 in trajectories:
             plt.plot(time,L2,color = cf.COLOURS_INDIVIDUAL[expID],linewidth=cf.LINEWIDTH_INDIVIDUAL,alpha=cf.LINEOPACITY_INDIVIDUAL)
 
     #plot mean and standard deviations
@@ -84,10 +83,9 @@ if __name__=="__main__":
         plt.figure()
 
         print(f"\tPlotting individual trajectories")
-        for n in tqdm(range(cf.NUMBER_SAMPLES)):
-            file_location = cf.ROOT_LOCATION + cf.EXPERIMENTS[expID] + cf.IND_LOCATION + f"_{n}/" + cf.DATA_SOURCE
-            complete_data = read_datafile(file_location)
-            time, L1, L2, Linf, SD = organize_output(complete_data)
+        file_location = cf.ROOT_LOCATION + cf.EXPERIMENTS[expID] + cf.IND_LOCATION + "/" + cf.DATA_SOURCE
+        time, trajectories = organize_individual_output(read_datafile(file_location),cf.NUMBER_SAMPLES)
+        for L2 in tqdm(trajectories):
             plt.plot(time,L2,color = cf.COLOURS_INDIVIDUAL[expID],linewidth=cf.LINEWIDTH_INDIVIDUAL,alpha=cf.LINEOPACITY_INDIVIDUAL)
 
         #plot mean and standard deviations
@@ -25,4 +25,10 @@ def organize_output(output):
         Linf.append(row[3])
         SD.append(row[4])
     
-    return time, L1, L2, Linf, SD
\ No newline at end of file
+    return time, L1, L2, Linf, SD
+
+def organize_individual_output(output, number_samples: int):
+    """Return the time and the trajectories of the first 'number_samples' seeds of an individual file with one column per seed."""
+    time = [row[0] for row in output]
+    trajectories = [[row[column] for row in output] for column in range(1,min(number_samples + 1,len(output[0])))]
+    return time, trajectories
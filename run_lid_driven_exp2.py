@@ -2,17 +2,19 @@
 from firedrake import *
 import numpy as np
 import logging
-from time import process_time_ns
+from time import perf_counter_ns
 from functools import partial
+from typing import Any
 
 from src.discretisation.space import get_space_discretisation_from_CONFIG, SpaceDiscretisation
 from src.discretisation.time import TimeDiscretisation
 from src.data_dump.setup import  update_logfile
 from src.algorithms.select import Algorithm, select_algorithm
-from src.noise import SamplingStrategy, select_sampling
+from src.algorithms.observation import Observation, ObservationPlan
+from src.noise import SamplingStrategy, select_sampling, get_group_size
 from src.predefined_data import get_function
 from src.string_formatting import format_runtime, format_header
-from src.utils import logstring_to_logger
+from src.utils import logstring_to_logger, ComputationCache
 
 from src.math.distances.space import l2_distance, h1_distance, V_distance, V_sym_distance
 from src.math.distances.Bochner_time import linf_X_distance, l2_X_distance, end_time_X_distance, h_minus1_X_distance, w_minus1_inf_X_distance
@@ -24,9 +26,11 @@ from src.postprocess.time_convergence import TimeComparison
 from src.postprocess.stability_check import StabilityCheck
 from src.postprocess.energy_check import Energy
 from src.postprocess.statistics import StatisticsObject
-from src.postprocess.point_statistics import PointStatistics
+from src.postprocess.control_variate import check_control_mean_estimate
+from src.postprocess.point_statistics import PointStatistics, ProbeStatistics
 from src.postprocess.increments_check import IncrementCheck
 from src.postprocess.processmanager import ProcessManager
+from src.postprocess.pipeline import PostprocessingPipeline
 
 #load global and lokal configs
 from configs import lid_driven_exp2 as cf
@@ -42,27 +46,22 @@ def generate_one(time_disc: TimeDiscretisation,
                  kappa_value: float,
                  ref_to_time_to_det_forcing: dict[int,dict[float,Function]],
                  algorithm: Algorithm,
-                 sampling_strategy: SamplingStrategy) -> tuple[dict[int,list[float]],
-                                                               dict[int,dict[float,Function]],
-                                                               dict[int,dict[float,Function]],
-                                                               dict[int,dict[float,Function]],
-                                                               dict[int,dict[float,Function]]]:
+                 sampling_strategy: SamplingStrategy,
+                 ref_to_noise_increments: dict[int,list[float]] | None = None,
+                 observation_plan: ObservationPlan | None = None) -> tuple[dict[int,list[float]],
+                                                               dict[Observation,dict[int,dict[float,Any]]]]:
     """Run the numerical experiment once. 
     
-    Return noise and solution."""
+    Return noise and 'observation -> refinement level -> time -> observed value' dictionary. Noise increments are sampled unless they are given. 
+    Only data of the observation plan is stored."""
     ### Generate noise on all refinement levels
-    ref_to_noise_increments = sampling_strategy(time_disc.refinement_levels,time_disc.initial_time,time_disc.end_time)
+    if ref_to_noise_increments is None:
+        ref_to_noise_increments = sampling_strategy(time_disc.refinement_levels,time_disc.initial_time,time_disc.end_time)
     ### initialise storage 
-    ref_to_time_to_velocity = dict()
-    ref_to_time_to_velocity_midpoints = dict()
-    ref_to_time_to_pressure = dict()
-    ref_to_time_to_pressure_midpoints = dict()
+    observation_to_ref_to_time_to_value = dict()
     for level in ref_to_noise_increments: 
         ### Solve algebraic system
-        (ref_to_time_to_velocity[level],
-         ref_to_time_to_pressure[level],
-         ref_to_time_to_velocity_midpoints[level],
-         ref_to_time_to_pressure_midpoints[level])  = algorithm(
+        observation_to_time_to_value = algorithm(
             space_disc=space_disc,
             time_grid=time_disc.ref_to_time_grid[level],
             noise_steps= ref_to_noise_increments[level],
@@ -73,13 +72,12 @@ def generate_one(time_disc: TimeDiscretisation,
             p_value=p_value,
             kappa_value=kappa_value,
             time_to_det_forcing = ref_to_time_to_det_forcing[level],
-            Reynolds_number=1
+            Reynolds_number=1,
+            observation_plan=observation_plan
             )
-    return (ref_to_noise_increments,
-            ref_to_time_to_velocity,
-            ref_to_time_to_pressure,
-            ref_to_time_to_velocity_midpoints,
-            ref_to_time_to_pressure_midpoints)
+        for observation, time_to_value in observation_to_time_to_value.items():
+            observation_to_ref_to_time_to_value.setdefault(observation,dict())[level] = time_to_value
+    return ref_to_noise_increments, observation_to_ref_to_time_to_value
 
 def generate(deterministic: bool = False) -> None:
     """Runs the experiment.
@@ -90,6 +88,9 @@ def generate(deterministic: bool = False) -> None:
     logging.basicConfig(filename=cf.NAME_LOGFILE_GENERATE,format='%(asctime)s| \t %(message)s', datefmt='%d/%m/%Y %I:%M:%S %p', 
                         level=logstring_to_logger(gcf.LOG_LEVEL),force=True)
 
+    if gcf.CONTROL_VARIATE and not deterministic:
+        check_control_mean_estimate(gcf.CONTROL_EXTRA_SAMPLES)
+
 
     # define discretisation
     space_disc = get_space_discretisation_from_CONFIG(name_mesh=gcf.MESH_NAME,
@@ -134,22 +135,26 @@ def generate(deterministic: bool = False) -> None:
 
     # select algorithm
     algorithm = select_algorithm(gcf.MODEL_NAME,cf.ALGORITHM_NAME)
+    if gcf.CONTROL_VARIATE and not deterministic:
+        control_algorithm = select_algorithm(gcf.CONTROL_MODEL_NAME,cf.ALGORITHM_NAME)
 
     #select sampling
     sampling_strategy = select_sampling(gcf.NOISE_INCREMENTS)
 
-    #Initialise process managers to handle data processing
+    #Initialise process managers to handle data processing, the algorithm only stores data observed by the consumers
+    consumers = []
     if gcf.TIME_CONVERGENCE:
         time_convergence_velocity = ProcessManager([
-            TimeComparison(time_disc.ref_to_time_stepsize,"Linf_L2_velocity",linf_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
-            TimeComparison(time_disc.ref_to_time_stepsize,"End_time_L2_velocity",end_time_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
-            TimeComparison(time_disc.ref_to_time_stepsize,"L2_H1_velocity",l2_X_distance,h1_distance,gcf.TIME_COMPARISON_TYPE),
-            ])
+            TimeComparison(time_disc,"Linf_L2_velocity",linf_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
+            TimeComparison(time_disc,"End_time_L2_velocity",end_time_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
+            TimeComparison(time_disc,"L2_H1_velocity",l2_X_distance,h1_distance,gcf.TIME_COMPARISON_TYPE),
+            ],observations=[Observation("velocity")])
         time_convergence_pressure = ProcessManager([
-            TimeComparison(time_disc.ref_to_time_stepsize,"L2_L2_pressure",l2_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
-            TimeComparison(time_disc.ref_to_time_stepsize,"H-1_L2_pressure",h_minus1_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
-            TimeComparison(time_disc.ref_to_time_stepsize,"W-1_inf_L2_pressure",w_minus1_inf_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE)
-            ])
+            TimeComparison(time_disc,"L2_L2_pressure",l2_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
+            TimeComparison(time_disc,"H-1_L2_pressure",h_minus1_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE),
+            TimeComparison(time_disc,"W-1_inf_L2_pressure",w_minus1_inf_X_distance,l2_distance,gcf.TIME_COMPARISON_TYPE)
+            ],observations=[Observation("pressure")])
+        consumers += [time_convergence_velocity, time_convergence_pressure]
 
     if gcf.STABILITY_CHECK:
         stability_check_velocity = ProcessManager([
@@ -157,42 +162,102 @@ def generate(deterministic: bool = False) -> None:
             StabilityCheck(time_disc.ref_to_time_stepsize,"End_time_L2_velocity",end_time_X_norm,l2_space),
             StabilityCheck(time_disc.ref_to_time_stepsize,"L2_H1_velocity",l2_X_norm,h1_space),
             StabilityCheck(time_disc.ref_to_time_stepsize,"L2_Hdiv_velocity",l2_X_norm,hdiv_space)
-        ])
+        ],observations=[Observation("velocity")])
         stability_check_pressure = ProcessManager([
             StabilityCheck(time_disc.ref_to_time_stepsize,"L2_L2_pressure",l2_X_norm,l2_space),
             StabilityCheck(time_disc.ref_to_time_stepsize,"H-1_L2_pressure",h_minus1_X_norm,l2_space)
-        ])
+        ],observations=[Observation("pressure")])
+        consumers += [stability_check_velocity, stability_check_pressure]
 
-    if gcf.ENERGY_CHECK:
+    if gcf.ENERGY_CHECK or gcf.IND_ENERGY_CHECK:
         energy_check_velocity = ProcessManager([
-            Energy(time_disc,"kinetic_energy",kinetic_energy),
+            Energy(time_disc,"kinetic_energy",kinetic_energy,get_group_size(sampling_strategy),gcf.IND_ENERGY_NUMBER + 1 if gcf.IND_ENERGY_CHECK else 0),
             #Energy(time_disc,"potential_energy",potential_energy)
         ])
-
-    if gcf.IND_ENERGY_CHECK:
-        sample_to_energy_check_velocity = dict()
+        consumers += [energy_check_velocity]
 
     if gcf.STATISTICS_CHECK:
-        statistics_velocity = StatisticsObject("velocity",time_disc.ref_to_time_grid,space_disc.velocity_space)
-        statistics_velocity_midpoints = StatisticsObject("velocity_midpoints",time_disc.ref_to_time_grid,space_disc.velocity_space)
-        statistics_pressure = StatisticsObject("pressure",time_disc.ref_to_time_grid,space_disc.pressure_space)
-        statistics_pressure_midpoints = StatisticsObject("pressure_midpoints",time_disc.ref_to_time_grid,space_disc.pressure_space)
+        statistics_times = time_disc.select_times(gcf.STATISTICS_TIMES)
+        statistics_velocity = StatisticsObject("velocity",time_disc.ref_to_time_grid,space_disc.velocity_space,gcf.STATISTICS_QUANTILES,statistics_times)
+        statistics_velocity_midpoints = StatisticsObject("velocity_midpoints",time_disc.ref_to_time_grid,space_disc.velocity_space,gcf.STATISTICS_QUANTILES,statistics_times)
+        statistics_pressure = StatisticsObject("pressure",time_disc.ref_to_time_grid,space_disc.pressure_space,gcf.STATISTICS_QUANTILES,statistics_times)
+        statistics_pressure_midpoints = StatisticsObject("pressure_midpoints",time_disc.ref_to_time_grid,space_disc.pressure_space,gcf.STATISTICS_QUANTILES,statistics_times)
+        field_to_statistics = {"velocity": statistics_velocity,
+                               "velocity_midpoints": statistics_velocity_midpoints,
+                               "pressure": statistics_pressure,
+                               "pressure_midpoints": statistics_pressure_midpoints}
+        consumers += list(field_to_statistics.values())
 
     if gcf.POINT_STATISTICS_CHECK:
+        #point and probes observe different points, hence they are updated by separate managers
         point_statistics_velocity = ProcessManager([
             PointStatistics(time_disc,"p1",gcf.POINT,2)
         ])
+        point_statistics = [point_statistics_velocity]
+        if gcf.PROBE_STATISTICS_CHECK:
+            probe_statistics_velocity = ProcessManager([
+                ProbeStatistics(time_disc,"probes",gcf.PROBE_POINTS,2,gcf.IND_POINT_STATISTICS_CHECK_NUMBER)
+            ])
+            point_statistics += [probe_statistics_velocity]
+        consumers += point_statistics
 
     if gcf.INCREMENT_CHECK:
         increment_check = ProcessManager([
             IncrementCheck(ref_to_stepsize=time_disc.ref_to_time_stepsize,
                            coarse_timeMesh=time_disc.ref_to_time_grid[time_disc.refinement_levels[0]],
                            distance_name="L2-inc",
-                           space_distance=l2_distance)
+                           space_distance=l2_distance,
+                           ref_to_time_grid=time_disc.ref_to_time_grid)
         ])
+        consumers += [increment_check]
 
     
-    runtimes = {"solving": 0,"comparison": 0, "stability": 0, "energy": 0, "statistics": 0, "point-statistics": 0, "increment": 0}
+    runtimes = {"solving": 0, "control": 0, "comparison": 0, "stability": 0, "energy": 0, "statistics": 0, "point-statistics": 0, "increment": 0}
+
+    ### postprocessing stages of a sample, executed in this order by the pipeline, possibly on a background thread on a copy of the sample
+    ### each consumer is updated with the data of its observation
+    def update_comparison(sample: dict) -> None:
+        ref_to_time_to_velocity = sample["observed"][time_convergence_velocity.observation]
+        ref_to_time_to_pressure = sample["observed"][time_convergence_pressure.observation]
+        time_convergence_velocity.update(ref_to_time_to_velocity,ref_to_time_to_velocity[time_disc.refinement_levels[-1]],cache=sample["cache"])
+        time_convergence_pressure.update(ref_to_time_to_pressure,ref_to_time_to_pressure[time_disc.refinement_levels[-1]],cache=sample["cache"])
+
+    def update_stability(sample: dict) -> None:
+        stability_check_velocity.update(sample["observed"][stability_check_velocity.observation],cache=sample["cache"])
+        stability_check_pressure.update(sample["observed"][stability_check_pressure.observation],cache=sample["cache"])
+
+    def update_energy(sample: dict) -> None:
+        observation = energy_check_velocity.observation
+        energy_check_velocity.update(sample["observed"][observation],sample["noise_increments"],ref_to_time_to_control=sample["control"].get(observation),cache=sample["cache"])
+
+    def update_statistics(sample: dict) -> None:
+        for statistics in field_to_statistics.values():
+            statistics.update(sample["observed"][statistics.observation],sample["control"].get(statistics.observation))
+
+    def update_point_statistics(sample: dict) -> None:
+        for manager in point_statistics:
+            manager.update(sample["observed"][manager.observation],sample["noise_increments"],ref_to_time_to_control=sample["control"].get(manager.observation),cache=sample["cache"])
+
+    def update_increment(sample: dict) -> None:
+        increment_check.update(sample["observed"][increment_check.observation],cache=sample["cache"])
+
+    stages = dict()
+    if gcf.TIME_CONVERGENCE:
+        stages["comparison"] = update_comparison
+    if gcf.STABILITY_CHECK:
+        stages["stability"] = update_stability
+    if gcf.ENERGY_CHECK or gcf.IND_ENERGY_CHECK:
+        stages["energy"] = update_energy
+    if gcf.STATISTICS_CHECK:
+        stages["statistics"] = update_statistics
+    if gcf.POINT_STATISTICS_CHECK:
+        stages["point-statistics"] = update_point_statistics
+    if gcf.INCREMENT_CHECK:
+        stages["increment"] = update_increment
+    pipeline = PostprocessingPipeline(stages,runtimes,gcf.POSTPROCESSING_QUEUE_SIZE)
+
+    observation_plan = ObservationPlan(observation for consumer in consumers for observation in consumer.observations)
+    logging.info(format_header("OBSERVATIONS") + str(observation_plan))
     
     if deterministic:
         print(format_header("RUN DETERMINISTIC EXPERIMENT"))
@@ -205,74 +270,81 @@ def generate(deterministic: bool = False) -> None:
     for k in new_seeds:
         ### get solution
         print(f"{k*100/len(new_seeds):4.2f}% completed")
-        time_mark = process_time_ns()
-        (ref_to_noise_increments, 
-         ref_to_time_to_velocity, 
-         ref_to_time_to_pressure, 
-         ref_to_time_to_velocity_midpoints, 
-         ref_to_time_to_pressure_midpoints) = generate_one(time_disc=time_disc,
-                                                           space_disc=space_disc,
-                                                           noise_coefficient=noise_coefficient,
-                                                           initial_velocity=initial_velocity,
-                                                           initial_pressure=initial_pressure,
-                                                           boundary_condition=boundary_condition,
-                                                           p_value=p_value,
-                                                           kappa_value=kappa_value,
-                                                           ref_to_time_to_det_forcing=ref_to_time_to_det_forcing,
-                                                           algorithm=algorithm,
-                                                           sampling_strategy=sampling_strategy)
-        runtimes["solving"] += process_time_ns()-time_mark
-
-        #update data using solution
-        if gcf.TIME_CONVERGENCE:
-            time_mark = process_time_ns()
-            time_to_fine_velocity = ref_to_time_to_velocity[time_disc.refinement_levels[-1]]
-            time_convergence_velocity.update(ref_to_time_to_velocity,time_to_fine_velocity)
-            time_to_fine_pressure = ref_to_time_to_pressure[time_disc.refinement_levels[-1]]
-            time_convergence_pressure.update(ref_to_time_to_pressure,time_to_fine_pressure)
-            runtimes["comparison"] += process_time_ns()-time_mark
-
-        if gcf.STABILITY_CHECK:
-            time_mark = process_time_ns()
-            stability_check_velocity.update(ref_to_time_to_velocity)
-            stability_check_pressure.update(ref_to_time_to_pressure)
-            runtimes["stability"] += process_time_ns()-time_mark
-
-        if gcf.ENERGY_CHECK:
-            time_mark = process_time_ns()
-            energy_check_velocity.update(ref_to_time_to_velocity,ref_to_noise_increments)
-            runtimes["energy"] += process_time_ns()-time_mark
-
-        if gcf.IND_ENERGY_CHECK and k <= gcf.IND_ENERGY_NUMBER:
-            time_mark = process_time_ns()
-            ind_energy_check_velocity = ProcessManager([
-                Energy(time_disc,f"ind_kinetic_energy_{k}",kinetic_energy),
-                #Energy(time_disc,f"ind_potential_energy_{k}",potential_energy)
-                ])
-            ind_energy_check_velocity.update(ref_to_time_to_velocity,ref_to_noise_increments)
-            sample_to_energy_check_velocity[k] = ind_energy_check_velocity
-            runtimes["energy"] += process_time_ns()-time_mark
-
-        if gcf.STATISTICS_CHECK:
-            time_mark = process_time_ns()
-            statistics_velocity.update(ref_to_time_to_velocity)
-            statistics_velocity_midpoints.update(ref_to_time_to_velocity_midpoints)
-            statistics_pressure.update(ref_to_time_to_pressure)
-            statistics_pressure_midpoints.update(ref_to_time_to_pressure_midpoints)
-            runtimes["statistics"] += process_time_ns()-time_mark
-
-        if gcf.POINT_STATISTICS_CHECK:
-            time_mark = process_time_ns()
-            point_statistics_velocity.update(ref_to_time_to_velocity,ref_to_noise_increments)
-            runtimes["point-statistics"] += process_time_ns()-time_mark
-
-        if gcf.INCREMENT_CHECK:
-            time_mark = process_time_ns()
-            increment_check.update(ref_to_time_to_velocity)
-            runtimes["increment"] += process_time_ns()-time_mark
-
-
-
+        time_mark = perf_counter_ns()
+        ref_to_noise_increments, observed = generate_one(time_disc=time_disc,
+                                                         space_disc=space_disc,
+                                                         noise_coefficient=noise_coefficient,
+                                                         initial_velocity=initial_velocity,
+                                                         initial_pressure=initial_pressure,
+                                                         boundary_condition=boundary_condition,
+                                                         p_value=p_value,
+                                                         kappa_value=kappa_value,
+                                                         ref_to_time_to_det_forcing=ref_to_time_to_det_forcing,
+                                                         algorithm=algorithm,
+                                                         sampling_strategy=sampling_strategy,
+                                                         observation_plan=observation_plan)
+        runtimes["solving"] += perf_counter_ns()-time_mark
+
+        #solve the control model with the same noise
+        observed_control = dict()
+        if gcf.CONTROL_VARIATE and not deterministic:
+            time_mark = perf_counter_ns()
+            _, observed_control = generate_one(time_disc=time_disc,
+                                               space_disc=space_disc,
+                                               noise_coefficient=noise_coefficient,
+                                               initial_velocity=initial_velocity,
+                                               initial_pressure=initial_pressure,
+                                               boundary_condition=boundary_condition,
+                                               p_value=p_value,
+                                               kappa_value=kappa_value,
+                                               ref_to_time_to_det_forcing=ref_to_time_to_det_forcing,
+                                               algorithm=control_algorithm,
+                                               sampling_strategy=sampling_strategy,
+                                               ref_to_noise_increments=ref_to_noise_increments,
+                                               observation_plan=observation_plan)
+            runtimes["control"] += perf_counter_ns()-time_mark
+
+        #hand the sample to the postprocessing, quantities of the sample are shared between all managers
+        pipeline.submit({"noise_increments": ref_to_noise_increments,
+                         "observed": observed,
+                         "control": observed_control,
+                         "cache": ComputationCache()})
+
+    ### wait for the postprocessing of the last samples
+    pipeline.close()
+
+    ### additional samples of the control improve the estimate of its mean
+    if gcf.CONTROL_VARIATE and not deterministic:
+        #a fresh strategy on a separate random stream, such that no antithetic partner or Sobol group is shared with the paired samples
+        control_sampling_strategy = select_sampling(gcf.NOISE_INCREMENTS,np.random.RandomState(gcf.CONTROL_SEED))
+        print(format_header("START CONTROL ITERATION") + f"\nRequested samples:\t{gcf.CONTROL_EXTRA_SAMPLES}")
+        for k in range(gcf.CONTROL_EXTRA_SAMPLES):
+            print(f"{k*100/gcf.CONTROL_EXTRA_SAMPLES:4.2f}% completed")
+            time_mark = perf_counter_ns()
+            _, observed_control = generate_one(time_disc=time_disc,
+                                               space_disc=space_disc,
+                                               noise_coefficient=noise_coefficient,
+                                               initial_velocity=initial_velocity,
+                                               initial_pressure=initial_pressure,
+                                               boundary_condition=boundary_condition,
+                                               p_value=p_value,
+                                               kappa_value=kappa_value,
+                                               ref_to_time_to_det_forcing=ref_to_time_to_det_forcing,
+                                               algorithm=control_algorithm,
+                                               sampling_strategy=control_sampling_strategy,
+                                               observation_plan=observation_plan)
+            runtimes["control"] += perf_counter_ns()-time_mark
+
+            if gcf.ENERGY_CHECK or gcf.IND_ENERGY_CHECK:
+                energy_check_velocity.update_control(observed_control[energy_check_velocity.observation])
+
+            if gcf.STATISTICS_CHECK:
+                for statistics in field_to_statistics.values():
+                    statistics.update_control(observed_control[statistics.observation])
+
+            if gcf.POINT_STATISTICS_CHECK:
+                for manager in point_statistics:
+                    manager.update_control(observed_control[manager.observation])
     
     ### storing processed data 
     if gcf.TIME_CONVERGENCE:
@@ -310,9 +382,7 @@ def generate(deterministic: bool = False) -> None:
 
     if gcf.IND_ENERGY_CHECK and not deterministic:
         logging.info(format_header("ENERGY CHECK") + f"\nIndividual energy checks are stored in:\t {cf.ENERGY_DIRECTORYNAME}/individual/")
-        for sample in sample_to_energy_check_velocity.keys():
-            sample_to_energy_check_velocity[sample].save(cf.ENERGY_DIRECTORYNAME + "/individual")
-            #sample_to_energy_check_velocity[sample].plot(cf.ENERGY_DIRECTORYNAME + "/individual")
+        energy_check_velocity.save_individual(cf.ENERGY_DIRECTORYNAME + "/individual")
         #energy_check_velocity.save(cf.ENERGY_DIRECTORYNAME)
 
 
@@ -331,11 +401,12 @@ def generate(deterministic: bool = False) -> None:
 
     if gcf.POINT_STATISTICS_CHECK:
         logging.info(format_header("POINT STATISTICS") + f"\nPoint statistics are stored in:\t {cf.POINT_STATISTICS_DIRECTORYNAME}/")
-        if deterministic:
-            point_statistics_velocity.save(cf.POINT_STATISTICS_DIRECTORYNAME + "/deterministic")
-        else:
-            point_statistics_velocity.save(cf.POINT_STATISTICS_DIRECTORYNAME)
-            point_statistics_velocity.save_individual(cf.POINT_STATISTICS_DIRECTORYNAME,gcf.IND_POINT_STATISTICS_CHECK_NUMBER)
+        for manager in point_statistics:
+            if deterministic:
+                manager.save(cf.POINT_STATISTICS_DIRECTORYNAME + "/deterministic")
+            else:
+                manager.save(cf.POINT_STATISTICS_DIRECTORYNAME)
+                manager.save_individual(cf.POINT_STATISTICS_DIRECTORYNAME,gcf.IND_POINT_STATISTICS_CHECK_NUMBER)
 
     if gcf.INCREMENT_CHECK:
         logging.info(format_header("INCREMENT CHECK") + f"\nIncrement check is stored in:\t {cf.INCREMENT_DIRECTORYNAME}/")
@@ -351,7 +422,8 @@ def generate(deterministic: bool = False) -> None:
 
 
     #show runtimes
-    logging.info(format_runtime(runtimes) + "\n\n")
+    msg_runtime = format_runtime(runtimes,pipeline.overlapping) + "\nRun times are wall times. Times marked by '*' overlap with other run times."
+    logging.info(msg_runtime + "\n\n")
 
 if __name__ == "__main__":
     #remove old logfile
@@ -1,18 +1,18 @@
 from firedrake import *
-from copy import deepcopy
 from tqdm import tqdm
-from typing import TypeAlias, Callable, Optional
+from typing import TypeAlias, Callable, Optional, Any
 import logging
 
 from src.discretisation.time import trajectory_to_incremets
 from src.discretisation.space import SpaceDiscretisation
 from src.math.norms.space import l2_space
 from src.algorithms.solver_configs import enable_light_monitoring, direct_solve, direct_solve_details 
+from src.algorithms.observation import Observation, ObservationPlan, ObservationRecorder
 
 ### abstract structure of a Stokes algorithm
 NavierStokesAlgorithm: TypeAlias = Callable[
-    [SpaceDiscretisation, list[float], list[float], Function, Function, Optional[dict[float,Function]], Optional[float]],
-    tuple[dict[float,Function],dict[float,Function]]
+    [SpaceDiscretisation, list[float], list[float], Function, Function, Optional[dict[float,Function]], Optional[float], Optional[ObservationPlan]],
+    dict[Observation,dict[float,Any]]
 ]
 
 ### converter that maps a string representation of the algorithm to its implementation
@@ -51,10 +51,11 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDi
                            noise_coefficient: Function,
                            initial_condition: Function,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function], dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -91,17 +92,14 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDi
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(uold)
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -138,20 +136,22 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDi
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        time_to_velocity[time] = deepcopy(velocity)
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
+    return recorder.observation_to_time_to_value
 
 def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc: SpaceDiscretisation,
                            time_grid: list[float],
@@ -159,10 +159,11 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc
                            noise_coefficient: Function,
                            initial_condition: Function,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function], dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -198,17 +199,14 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(uold)
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -245,20 +243,22 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        time_to_velocity[time] = deepcopy(velocity)
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
+    return recorder.observation_to_time_to_value
 
 def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_multiplicative(space_disc: SpaceDiscretisation,
                            time_grid: list[float],
@@ -266,10 +266,11 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_multiplicative(spac
                            noise_coefficient: Function,
                            initial_condition: Function,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function], dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -305,17 +306,14 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_multiplicative(spac
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(uold)
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -352,20 +350,22 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym_multiplicative(spac
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        time_to_velocity[time] = deepcopy(velocity)
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
+    return recorder.observation_to_time_to_value
 
 
 #################################################################################################
@@ -378,10 +378,11 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDiscret
                            noise_coefficient: Function,
                            initial_condition: Function,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function], dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -418,17 +419,14 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDiscret
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(uold)
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -465,20 +463,22 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDiscret
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        time_to_velocity[time] = deepcopy(velocity)
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
+    return recorder.observation_to_time_to_value
 
 def implicit_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc: SpaceDiscretisation,
                            time_grid: list[float],
@@ -486,10 +486,11 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc: Spa
                            noise_coefficient: Function,
                            initial_condition: Function,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function], dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -525,17 +526,14 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc: Spa
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(uold)
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -572,20 +570,22 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym_additive(space_disc: Spa
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        time_to_velocity[time] = deepcopy(velocity)
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
+    return recorder.observation_to_time_to_value
 
 def implicit_mixedFEM_strato_transportNoise_withAntisym_multiplicative(space_disc: SpaceDiscretisation,
                            time_grid: list[float],
@@ -593,10 +593,11 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym_multiplicative(space_dis
                            noise_coefficient: Function,
                            initial_condition: Function,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function], dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -632,17 +633,14 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym_multiplicative(space_dis
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(uold)
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -679,17 +677,19 @@ def implicit_mixedFEM_strato_transportNoise_withAntisym_multiplicative(space_dis
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        time_to_velocity[time] = deepcopy(velocity)
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
\ No newline at end of file
+    return recorder.observation_to_time_to_value
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""Defines which data of the fields an algorithm stores."""
+import numpy as np
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from src.math.operators import operator_space, dof_vector, quadratic_form
+from src.math.point_evaluation import get_point_evaluation
+
+### fields an algorithm can observe
+FIELDS = ("velocity", "pressure", "velocity_midpoints", "pressure_midpoints")
+
+### data stored at the selected times of an observation
+REDUCTIONS = ("trajectory", "points", "norms", "increment_norms")
+
+### operators whose quadratic forms define the observable norms
+NORMS = ("mass", "stiffness", "divdiv")
+
+@dataclass(frozen=True)
+class Observation:
+    """Request of a field by a consumer of the solution.
+
+    The times of the observation are the nodal times closest to 'times', all nodal times by default. The data is stored under the requested times.
+    The reduction defines the data stored at these times:
+    'trajectory' a copy of the field, 'points' its values at 'points' as array of shape (points,) + value shape,
+    'norms' its norms given by the quadratic forms of the operators 'norms' and 'increment_norms' the norms of its increment to the previous observed time."""
+    field: str
+    times: tuple[float,...] | None = None
+    reduction: str = "trajectory"
+    points: tuple[tuple[float,...],...] = ()
+    norms: tuple[str,...] = ()
+
+    def __str__(self) -> str:
+        msg = f"{self.field}:\t {self.reduction}"
+        if self.reduction == "points":
+            msg += f" ({len(self.points)})"
+        if self.reduction in ("norms", "increment_norms"):
+            msg += f" {self.norms}"
+        msg += " at all times" if self.times is None else f" at {len(self.times)} times"
+        return msg
+
+class ObservationPlan:
+    """Class that merges observations of several consumers. Data that is not requested is never stored."""
+    def __init__(self, observations: Iterable[Observation] = ()) -> None:
+        self.observations: set[Observation] = set()
+        for observation in observations:
+            self.add(observation)
+
+    @classmethod
+    def everything(cls) -> "ObservationPlan":
+        """Return the plan that observes the trajectories of all fields."""
+        return cls(Observation(field) for field in FIELDS)
+
+    def add(self, observation: Observation) -> None:
+        if observation.field not in FIELDS:
+            msg = f"The field '{observation.field}' can't be observed."
+            msg += f"\nAvailable fields:\t {FIELDS}"
+            raise ValueError(msg)
+        if observation.reduction not in REDUCTIONS:
+            msg = f"The reduction '{observation.reduction}' is not available."
+            msg += f"\nAvailable reductions:\t {REDUCTIONS}"
+            raise ValueError(msg)
+        if observation.reduction == "points" and len(observation.points) == 0:
+            raise ValueError("Observation of point values requires points.")
+        if observation.reduction in ("norms", "increment_norms") and (len(observation.norms) == 0 or not set(observation.norms) <= set(NORMS)):
+            msg = "Observation of norms requires operators of the norms."
+            msg += f"\nProvided:\t {observation.norms}"
+            msg += f"\nAvailable operators:\t {NORMS}"
+            raise ValueError(msg)
+        self.observations.add(observation)
+
+    def observes(self, field: str) -> bool:
+        """Check whether any data of the field is stored."""
+        return any(observation.field == field for observation in self.observations)
+
+    def __str__(self) -> str:
+        msg = "\nObservations:"
+        for observation in sorted(self.observations,key=str):
+            msg += f"\n{observation}"
+        for field in FIELDS:
+            if not self.observes(field):
+                msg += f"\n{field}:\t not stored"
+        return msg
+
+class ObservationRecorder:
+    """Class that stores the observations of a plan during one run of an algorithm.
+
+    The algorithm passes each field at each nodal time it selects, the recorder only keeps the requested data.
+    Copies of a field are shared between the trajectories of several observations.
+    Point values and norms are evaluated by the cached point evaluations and operators, hence they are built on the calling thread."""
+    def __init__(self, observation_plan: ObservationPlan | None = None) -> None:
+        if observation_plan is None:
+            observation_plan = ObservationPlan.everything()
+        self.observation_to_time_to_value: dict[Observation,dict[float,Any]] = {observation: dict() for observation in observation_plan.observations}
+        self._observation_to_previous = dict()
+
+    def _observed_time(self, observation: Observation, time: float) -> float | None:
+        """Return the requested time the nodal time is closest to or None if the nodal time isn't observed."""
+        if observation.times is None:
+            return time
+        times = np.asarray(observation.times,dtype=float)
+        index = int(np.argmin(np.abs(times - time)))
+        if np.isclose(times[index],time,rtol=0,atol=1e-10*max(1.0,abs(time))):
+            return observation.times[index]
+        return None
+
+    def selects(self, field: str, time: float) -> bool:
+        """Check whether any data of the field is stored at the nodal time."""
+        return any(observation.field == field and self._observed_time(observation,time) is not None
+                   for observation in self.observation_to_time_to_value.keys())
+
+    def record(self, field: str, time: float, function) -> None:
+        """Store the requested data of the field at the nodal time."""
+        copy = None
+        for observation, time_to_value in self.observation_to_time_to_value.items():
+            observed_time = self._observed_time(observation,time)
+            if not observation.field == field or observed_time is None:
+                continue
+            match observation.reduction:
+                case "trajectory":
+                    if copy is None:
+                        copy = deepcopy(function)
+                    time_to_value[observed_time] = copy
+                case "points":
+                    evaluation = get_point_evaluation(operator_space(function),np.array(observation.points,dtype=float))
+                    time_to_value[observed_time] = evaluation.evaluate(dof_vector(function)[np.newaxis])[0]
+                case "norms":
+                    time_to_value[observed_time] = self._norms(observation,function,dof_vector(function))
+                case "increment_norms":
+                    vector = dof_vector(function).copy()
+                    previous = self._observation_to_previous.get(observation)
+                    if previous is not None:
+                        time_to_value[observed_time] = self._norms(observation,function,vector - previous)
+                    self._observation_to_previous[observation] = vector
+                case other:
+                    print(f"The reduction '{observation.reduction}' is not available.")
+                    raise NotImplementedError
+
+    def _norms(self, observation: Observation, function, vector: np.ndarray) -> np.ndarray:
+        return np.sqrt([quadratic_form(operator_space(function),name,vector) for name in observation.norms])
@@ -1,18 +1,18 @@
 from firedrake import *
-from copy import deepcopy
 from tqdm import tqdm
-from typing import TypeAlias, Callable, Optional
+from typing import TypeAlias, Callable, Optional, Any
 import logging
 
 from src.discretisation.time import trajectory_to_incremets
 from src.discretisation.space import SpaceDiscretisation
 from src.algorithms.nonlinearities import S_tensor, S_tensor_sym, epsilon
 from src.algorithms.solver_configs import enable_monitoring, direct_solve_details, direct_solve 
+from src.algorithms.observation import Observation, ObservationPlan, ObservationRecorder
 
 ### abstract structure of a p-Stokes algorithm
 pStokesAlgorithm: TypeAlias = Callable[
-    [SpaceDiscretisation, list[float], list[float], Function, Function, Optional[float], Optional[float], Optional[dict[float,Function]], Optional[float]],
-    tuple[dict[float,Function],dict[float,Function],dict[float,Function],dict[float,Function]]
+    [SpaceDiscretisation, list[float], list[float], Function, Function, Optional[float], Optional[float], Optional[dict[float,Function]], Optional[float], Optional[ObservationPlan]],
+    dict[Observation,dict[float,Any]]
 ]
 
 ### converter that maps a string representation of the algorithm to its implementation   
@@ -35,10 +35,11 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDi
                            p_value: float = 2.0,
                            kappa_value: float = 0.1,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function],dict[float,Function],dict[float,Function],dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -73,17 +74,14 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDi
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(uold)
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -118,20 +116,22 @@ def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDi
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        time_to_velocity[time] = deepcopy(velocity)
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
+    return recorder.observation_to_time_to_value
 
 ### CAREFUL: lid driven solver additionally gets boundary conditions as input
 def lid_driven_cavity_solver(space_disc: SpaceDiscretisation,
@@ -144,10 +144,11 @@ def lid_driven_cavity_solver(space_disc: SpaceDiscretisation,
                            p_value: float = 2.0,
                            kappa_value: float = 0.1,
                            time_to_det_forcing: dict[float,Function] | None = None, 
-                           Reynolds_number: float = 1) -> tuple[dict[float,Function],dict[float,Function],dict[float,Function],dict[float,Function]]:
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
     """Solve p-Stokes system with kappa regularisation and mixed finite elements. The viscous stress is given by S(A) = (kappa + |A|^2)^((p-2)/2)A.
     
-    Return 'time -> velocity' and 'time -> pressure' dictionaries. """
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
     # initialise constants in variational form
     Re = Constant(Reynolds_number)
     tau = Constant(1.0)
@@ -185,17 +186,14 @@ def lid_driven_cavity_solver(space_disc: SpaceDiscretisation,
     initial_time, time_increments = trajectory_to_incremets(time_grid)
     time = initial_time
 
-    # initialise storage for solution output
-    time_to_velocity = dict()
-    time_to_pressure = dict()
-    time_to_velocity_midpoints = dict()
-    time_to_pressure_midpoints = dict()
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
     # store initialisation of time-stepping
-    time_to_velocity[time] = deepcopy(Function(space_disc.velocity_space))
-    time_to_velocity_midpoints[time] = deepcopy(det_forcing)
-    time_to_pressure[time] = deepcopy(pold)
-    time_to_pressure_midpoints[time] = deepcopy(pold)
+    recorder.record("velocity",time,Function(space_disc.velocity_space))
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
 
     #check if deterministic and random increments are iterables of the same length
     if not len(time_increments) == len(noise_steps):
@@ -230,21 +228,24 @@ def lid_driven_cavity_solver(space_disc: SpaceDiscretisation,
         pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
 
         #store solution
-        velocity_nodal = Function(space_disc.velocity_space)
-        velocity_nodal.dat.data[:] = velocity.dat.data + boundary_condition.dat.data
-        time_to_velocity[time] = deepcopy(velocity_nodal)
-
-        velocity_mid = Function(space_disc.velocity_space)
-        velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0 + boundary_condition.dat.data
-        time_to_velocity_midpoints[time] = deepcopy(velocity_mid)
-
-        time_to_pressure[time] = deepcopy(pressure)
-        pressure_mid = Function(space_disc.pressure_space)
-        pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
-        time_to_pressure_midpoints[time] = pressure_mid
+        if recorder.selects("velocity",time):
+            velocity_nodal = Function(space_disc.velocity_space)
+            velocity_nodal.dat.data[:] = velocity.dat.data + boundary_condition.dat.data
+            recorder.record("velocity",time,velocity_nodal)
+
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0 + boundary_condition.dat.data
+            recorder.record("velocity_midpoints",time,velocity_mid)
+
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
 
         #update uold to proceed time-steppping
         uold.assign(velocity)
         pold.assign(pressure)
 
-    return time_to_velocity, time_to_pressure, time_to_velocity_midpoints, time_to_pressure_midpoints
\ No newline at end of file
+    return recorder.observation_to_time_to_value
\ No newline at end of file
@@ -21,6 +21,15 @@ direct_solve = {'snes_max_it': 120,
            "mat_mumps_icntl_24": 1,
            }
 
+### linear problems, e.g., Stokes, are solved by one LU decomposition per step
+direct_linear_solve = {'ksp_type': 'preonly',
+           'pc_type': 'lu', 
+           'mat_type': 'aij',
+           'pc_factor_mat_solver_type': 'mumps',
+           "mat_mumps_icntl_14": 5000,
+           "mat_mumps_icntl_24": 1,
+           }
+
 direct_solve_details = {'snes_monitor': None,
            "snes_converged_reason": None,
            'snes_max_it': 120,
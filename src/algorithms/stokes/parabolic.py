@@ -1,11 +1,13 @@
 from firedrake import *
 from copy import deepcopy
 from tqdm import tqdm
-from typing import TypeAlias, Callable, Optional
+from typing import TypeAlias, Callable, Optional, Any
 
 from src.discretisation.time import trajectory_to_incremets
 from src.discretisation.space import SpaceDiscretisation
-from src.algorithms.solver_configs import enable_light_monitoring, direct_solve
+from src.algorithms.nonlinearities import epsilon
+from src.algorithms.solver_configs import enable_light_monitoring, direct_solve, direct_linear_solve
+from src.algorithms.observation import Observation, ObservationPlan, ObservationRecorder
 
 ### abstract structure of a Stokes algorithm
 StokesAlgorithm: TypeAlias = Callable[
@@ -30,6 +32,10 @@ def get_algorithm_by_name(algorithm_name: str) -> StokesAlgorithm:
             return impliciteEuler_mixedFEM_strato_transportNoise_asym
         case "Theta Scheme mixed FEM Stratonovich Transport Noise asymmetric":
             return ThetaScheme_mixedFEM_strato_transportNoise_asym
+        case "Crank Nicolson mixed FEM Stratonovich Transport Noise with anti-symmetrisation":
+            return CrankNicolson_mixedFEM_strato_transportNoise_withAntisym
+        case "lid-driven cavity solver":
+            return lid_driven_cavity_solver
         case other:
             print(f"The algorithm '{algorithm_name}' is not avaiable.")
             raise NotImplementedError
@@ -584,4 +590,221 @@ def ThetaScheme_mixedFEM_strato_transportNoise_asym(space_disc: SpaceDiscretisat
     return time_to_velocity, time_to_pressure
 
 
+### linear counterparts of the p-Stokes algorithms with the same interface, e.g., as control variates of p-Stokes samples
+### the stress is S(A) = A, hence every time step is a single linear solve instead of a Newton iteration
+def CrankNicolson_mixedFEM_strato_transportNoise_withAntisym(space_disc: SpaceDiscretisation,
+                           time_grid: list[float],
+                           noise_steps: list[float], 
+                           noise_coefficient: Function,
+                           initial_condition: Function,
+                           p_value: float = 2.0,
+                           kappa_value: float = 0.1,
+                           time_to_det_forcing: dict[float,Function] | None = None, 
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
+    """Solve Stokes system with mixed finite elements by the scheme of the p-Stokes algorithm with the same name. 'p_value' and 'kappa_value' are ignored.
+    
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
+    # initialise constants in variational form
+    Re = Constant(Reynolds_number)
+    tau = Constant(1.0)
+    dW = Constant(1.0)
+
+    # initialise function objects
+    u, p = TrialFunctions(space_disc.mixed_space)
+    v, q = TestFunctions(space_disc.mixed_space)
+
+    up = Function(space_disc.mixed_space)
+    velocity, pressure = up.subfunctions
+
+    upold = Function(space_disc.mixed_space)
+    uold, pold = upold.subfunctions
+
+    # initialise deterministic forcing by zero as default 
+    det_forcing, _ = Function(space_disc.mixed_space).subfunctions
+
+    # set initial condition to uold
+    uold.assign(initial_condition)
+
+    # build variational form, the operator is assembled anew in each step as it depends on the noise increment
+    VariationalForm = ( 
+        inner(u - uold,v) 
+        + tau*( 1.0/Re*inner( epsilon((grad(u) + grad(uold))/2.0), epsilon(grad(v))) - inner(p, div(v)) + inner(div(u), q) )
+        - tau*inner(det_forcing,v)
+        - dW/4.0*inner(dot(grad(u) + grad(uold), noise_coefficient), v)
+        + dW/4.0*inner(dot(grad(v), noise_coefficient), u + uold)
+        )*dx
+    problem = LinearVariationalProblem(lhs(VariationalForm), rhs(VariationalForm), up, bcs=space_disc.bcs_mixed)
+    solver = LinearVariationalSolver(problem, nullspace=space_disc.null, solver_parameters=direct_linear_solve)
+
+    # setup initial time and time increments
+    initial_time, time_increments = trajectory_to_incremets(time_grid)
+    time = initial_time
+
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
+
+    # store initialisation of time-stepping
+    recorder.record("velocity",time,uold)
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
+
+    #check if deterministic and random increments are iterables of the same length
+    if not len(time_increments) == len(noise_steps):
+        msg_error = "Time grid and noise grid are not of the same length.\n"
+        msg_error += f"Time grid length: \t {len(time_increments)}\n"
+        msg_error += f"Noise grid length: \t {len(noise_steps)}"
+        raise ValueError(msg_error)
+
+    for index in tqdm(range(len(time_increments))):
+        # update random and deterministc time step, and nodal time
+        dW.assign(noise_steps[index])
+        tau.assign(time_increments[index])
+        time += time_increments[index]
+        
+        # if provided change deterministic forcing to provided one
+        if time_to_det_forcing:
+            try:
+                det_forcing.assign(time_to_det_forcing[time])
+            except KeyError as k:
+                print(f"Deterministic forcing couldn't be set.\nRequested time:\t {time}\nAvailable times:\t {list(time_to_det_forcing.keys())}")
+                raise k
+        
+        solver.solve()
+
+        #correct mean-value of pressure
+        mean_p = Constant(assemble( inner(pressure,1)*dx ))
+        pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
+
+        #store solution
+        recorder.record("velocity",time,velocity)
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0
+            recorder.record("velocity_midpoints",time,velocity_mid)
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
+
+        #update uold to proceed time-steppping
+        uold.assign(velocity)
+        pold.assign(pressure)
+
+    return recorder.observation_to_time_to_value
+
+### CAREFUL: lid driven solver additionally gets boundary conditions as input
+def lid_driven_cavity_solver(space_disc: SpaceDiscretisation,
+                           time_grid: list[float],
+                           noise_steps: list[float], 
+                           noise_coefficient: Function,
+                           initial_velocity: Function,
+                           initial_pressure: Function,
+                           boundary_condition: Function,
+                           p_value: float = 2.0,
+                           kappa_value: float = 0.1,
+                           time_to_det_forcing: dict[float,Function] | None = None, 
+                           Reynolds_number: float = 1,
+                           observation_plan: ObservationPlan | None = None) -> dict[Observation,dict[float,Any]]:
+    """Solve Stokes system with mixed finite elements by the scheme of the p-Stokes lid-driven cavity solver. 'p_value' and 'kappa_value' are ignored.
+    
+    Return 'observation -> time -> observed value' dictionary. Only data of the observation plan is stored, by default the trajectories of all fields."""
+    # initialise constants in variational form
+    Re = Constant(Reynolds_number)
+    tau = Constant(1.0)
+    dW = Constant(1.0)
+
+    # initialise function objects
+    u, p = TrialFunctions(space_disc.mixed_space)
+    v, q = TestFunctions(space_disc.mixed_space)
+
+    up = Function(space_disc.mixed_space)
+    velocity, pressure = up.subfunctions
+
+    upold = Function(space_disc.mixed_space)
+    uold, pold = upold.subfunctions
+
+    # initialise deterministic forcing by zero as default 
+    det_forcing, _ = Function(space_disc.mixed_space).subfunctions
+
+    # set initial conditions
+    uold.assign(initial_velocity-boundary_condition)
+    pold.assign(initial_pressure)
+
+    # build variational form, the operator is assembled anew in each step as it depends on the noise increment
+    VariationalForm = ( 
+        inner(u - uold,v) 
+        + tau*( 1.0/Re*inner( epsilon((grad(u) + grad(uold))/2.0 + grad(boundary_condition)), epsilon(grad(v))) )
+        - inner(p - pold, div(v)) + inner(div(u) - div(boundary_condition), q)
+        - tau*inner(det_forcing,v)
+        - dW/4.0*inner(dot(grad(u) + grad(uold), noise_coefficient), v)
+        + dW/4.0*inner(dot(grad(v), noise_coefficient), u + uold)
+        - dW*inner(dot(grad(boundary_condition), noise_coefficient), v)
+        )*dx
+    problem = LinearVariationalProblem(lhs(VariationalForm), rhs(VariationalForm), up, bcs=space_disc.bcs_mixed)
+    solver = LinearVariationalSolver(problem, nullspace=space_disc.null, solver_parameters=direct_linear_solve)
+
+    # setup initial time and time increments
+    initial_time, time_increments = trajectory_to_incremets(time_grid)
+    time = initial_time
+
+    # initialise storage for solution output, only data of the observation plan is stored
+    recorder = ObservationRecorder(observation_plan)
 
+    # store initialisation of time-stepping
+    recorder.record("velocity",time,Function(space_disc.velocity_space))
+    recorder.record("velocity_midpoints",time,det_forcing)
+    recorder.record("pressure",time,pold)
+    recorder.record("pressure_midpoints",time,pold)
+
+    #check if deterministic and random increments are iterables of the same length
+    if not len(time_increments) == len(noise_steps):
+        msg_error = "Time grid and noise grid are not of the same length.\n"
+        msg_error += f"Time grid length: \t {len(time_increments)}\n"
+        msg_error += f"Noise grid length: \t {len(noise_steps)}"
+        raise ValueError(msg_error)
+
+    for index in tqdm(range(len(time_increments))):
+        # update random and deterministc time step, and nodal time
+        dW.assign(noise_steps[index])
+        tau.assign(time_increments[index])
+        time += time_increments[index]
+        
+        # if provided change deterministic forcing to provided one
+        if time_to_det_forcing:
+            try:
+                det_forcing.assign(time_to_det_forcing[time])
+            except KeyError as k:
+                print(f"Deterministic forcing couldn't be set.\nRequested time:\t {time}\nAvailable times:\t {list(time_to_det_forcing.keys())}")
+                raise k
+        
+        solver.solve()
+
+        #correct mean-value of pressure
+        mean_p = Constant(assemble( inner(pressure,1)*dx ))
+        pressure.dat.data[:] = pressure.dat.data - Function(space_disc.pressure_space).assign(mean_p).dat.data
+
+        #store solution
+        if recorder.selects("velocity",time):
+            velocity_nodal = Function(space_disc.velocity_space)
+            velocity_nodal.dat.data[:] = velocity.dat.data + boundary_condition.dat.data
+            recorder.record("velocity",time,velocity_nodal)
+
+        if recorder.selects("velocity_midpoints",time):
+            velocity_mid = Function(space_disc.velocity_space)
+            velocity_mid.dat.data[:] = (velocity.dat.data + uold.dat.data)/2.0 + boundary_condition.dat.data
+            recorder.record("velocity_midpoints",time,velocity_mid)
+
+        recorder.record("pressure",time,pressure)
+        if recorder.selects("pressure_midpoints",time):
+            pressure_mid = Function(space_disc.pressure_space)
+            pressure_mid.dat.data[:] = (pressure.dat.data + pold.dat.data)/2.0
+            recorder.record("pressure_midpoints",time,pressure_mid)
+
+        #update uold to proceed time-steppping
+        uold.assign(velocity)
+        pold.assign(pressure)
+
+    return recorder.observation_to_time_to_value
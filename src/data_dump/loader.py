@@ -1,10 +1,32 @@
 import csv
-from firedrake import MeshGeometry, CheckpointFile, Function
+import os
+from firedrake import MeshGeometry, CheckpointFile, Function, FunctionSpace
 from typing import Iterable
 import numpy as np
 
 from src.discretisation.space import SpaceDiscretisation
 from src.discretisation.time import TimeDiscretisation
+from src.data_dump.store import TrajectoryStore
+
+def _store(directory_name: str, field: str, refinement_level: int) -> TrajectoryStore | None:
+    """Return the trajectory store of the field on the refinement level. Dumps of one file per sample don't have a store."""
+    filename = directory_name + "/" + field + "/level_" + str(refinement_level) + ".hdf5"
+    if os.path.isfile(filename):
+        return TrajectoryStore(filename)
+    return None
+
+### DOF maps are loaded once per dump directory and mesh
+_DOF_MAP_CACHE: dict[tuple[str,str,MeshGeometry],np.ndarray] = dict()
+
+def get_dof_map(directory_name: str, field: str, mesh: MeshGeometry) -> np.ndarray:
+    """Return for each node of the loaded mesh the index of the node in the stored trajectories."""
+    key = (directory_name, field, mesh)
+    if key not in _DOF_MAP_CACHE.keys():
+        with CheckpointFile(directory_name + "/mesh.hdf5","r") as file:
+            dof_map = file.load_function(mesh,field + "_dof_map")
+        values = dof_map.dat.data_ro.reshape(len(dof_map.dat.data_ro),-1)[:,0]
+        _DOF_MAP_CACHE[key] = np.rint(values).astype(int)
+    return _DOF_MAP_CACHE[key]
 
 def load_seeds(directory_name: str) -> list[int] | list[None]:
     """Return a list of stored seeds."""
@@ -39,6 +61,9 @@ def get_mc_samples(directory_name: str) -> int:
     return len(load_seeds(directory_name))
 
 def get_ref_to_time_to_velocity(directory_name: str, seed_Id: int, space_disc: SpaceDiscretisation, time_disc: TimeDiscretisation) -> dict[int,dict[float,Function]]:
+    if _store(directory_name,"velocity",time_disc.refinement_levels[0]) is not None:
+        return {level: _get_time_to_function_from_store(directory_name,"velocity",seed_Id,level,space_disc.velocity_space)
+                for level in time_disc.refinement_levels}
     return {level: _get_time_to_function(filename=directory_name + "/velocity/level_" + str(level) + "/" + str(seed_Id) + ".hdf5",
                                         function_name="velocity",
                                         time_to_id=time_disc.ref_to_time_to_id[level],
@@ -46,6 +71,9 @@ def get_ref_to_time_to_velocity(directory_name: str, seed_Id: int, space_disc: S
                                         for level in time_disc.refinement_levels}
 
 def get_ref_to_time_to_pressure(directory_name: str, seed_Id: int, space_disc: SpaceDiscretisation, time_disc: TimeDiscretisation) -> dict[int,dict[float,Function]]:
+    if _store(directory_name,"pressure",time_disc.refinement_levels[0]) is not None:
+        return {level: _get_time_to_function_from_store(directory_name,"pressure",seed_Id,level,space_disc.pressure_space)
+                for level in time_disc.refinement_levels}
     return {level: _get_time_to_function(filename=directory_name + "/pressure/level_" + str(level) + "/" + str(seed_Id) + ".hdf5",
                                         function_name="pressure",
                                         time_to_id=time_disc.ref_to_time_to_id[level],
@@ -57,21 +85,45 @@ def get_ref_to_noise_increments(directory_name: str, seed_Id: int, refinement_le
 
 
 def get_velocity(directory_name: str, seed_Id: int, refinement_level: int, time_Id: int, space_disc: SpaceDiscretisation) -> Function:
+    store = _store(directory_name,"velocity",refinement_level)
+    if store is not None:
+        dof_map = get_dof_map(directory_name,"velocity",space_disc.mesh)
+        return _function_from_dofs(space_disc.velocity_space,store.load_time(time_Id,[seed_Id])[0][dof_map])
     filename = directory_name + "/velocity/level_" + str(refinement_level) + "/" + str(seed_Id) + ".hdf5"
     with CheckpointFile(filename,"r") as file:
         velocity = file.load_function(mesh=space_disc.mesh,name="velocity",idx=time_Id)
     return velocity
 
 def get_seed_to_velocity(directory_name: str, seeds: Iterable[int], refinement_level: int, time_Id: int, space_disc: SpaceDiscretisation) -> dict[int,Function]:
+    store = _store(directory_name,"velocity",refinement_level)
+    if store is not None:
+        seeds = list(seeds)
+        dof_map = get_dof_map(directory_name,"velocity",space_disc.mesh)
+        values = store.load_time(time_Id,seeds)
+        return {seed: _function_from_dofs(space_disc.velocity_space,values[k][dof_map]) for k, seed in enumerate(seeds)}
     return {seed: get_velocity(directory_name,seed,refinement_level,time_Id,space_disc) for seed in seeds}
 
 ### generic
+def _function_from_dofs(function_space: FunctionSpace, dofs: np.ndarray) -> Function:
+    function = Function(function_space)
+    function.dat.data[:] = dofs
+    return function
+
+def _get_time_to_function_from_store(directory_name: str, field: str, seed_Id: int, refinement_level: int, function_space: FunctionSpace) -> dict[float,Function]:
+    store = _store(directory_name,field,refinement_level)
+    dof_map = get_dof_map(directory_name,field,function_space.mesh())
+    trajectory = store.load_sample(seed_Id)
+    return {float(time): _function_from_dofs(function_space,dofs[dof_map]) for time, dofs in zip(store.times(),trajectory)}
+
 def _get_time_to_function(filename: str, function_name: str, time_to_id: dict[float,int], mesh: MeshGeometry) -> dict[float,Function]:
     with CheckpointFile(filename,"r") as file:
         time_to_function = {time: file.load_function(mesh,function_name,time_to_id[time]) for time in time_to_id.keys()}
     return time_to_function
 
 def _get_noise_increments(directory_name: str, seed_Id: int, refinement_level: int) -> np.ndarray:
+    store = _store(directory_name,"noise_increments",refinement_level)
+    if store is not None:
+        return store.load_sample(seed_Id)
     with open(directory_name + "/noise_increments/level_" + str(refinement_level) + "/" + str(seed_Id) + ".csv","r") as file:
         reader = csv.reader(file)
         data = [float(row[0]) for row in reader]
@@ -1,29 +1,55 @@
-from firedrake import Function, CheckpointFile, MeshGeometry
+from firedrake import Function, CheckpointFile, MeshGeometry, FunctionSpace
 import csv
 import logging
 from typing import Iterable
 from numpy import ndarray
+import numpy as np
 import os
+import glob
 
 from src.discretisation.space import SpaceDiscretisation
 from src.discretisation.time import TimeDiscretisation
+from src.data_dump.store import TrajectoryStore
+
+def is_legacy_dump(directory_name: str) -> bool:
+    """Check whether the dump directory stores one .hdf5 file per sample, i.e., directories 'velocity/level_<level>/'."""
+    return any(os.path.isdir(path) for field in ["velocity", "pressure", "noise_increments"] 
+               for path in glob.glob(directory_name + "/" + field + "/level_*"))
+
+def _check_store_layout(directory_name: str) -> None:
+    if is_legacy_dump(directory_name):
+        msg = f"The dump directory '{directory_name}' stores one file per sample."
+        msg += "\nSamples can't be added to it, use a new dump directory."
+        raise ValueError(msg)
+
+def trajectory_store(directory_name: str, field: str, refinement_level: int) -> TrajectoryStore:
+    """Return the store that holds all samples of the field on the refinement level."""
+    return TrajectoryStore(directory_name + "/" + field + "/level_" + str(refinement_level) + ".hdf5")
 
 def dump_sample(directory_name: str,
                 seed_Id: int,
                 ref_to_time_to_velocity: dict[int,dict[float,Function]],
                 ref_to_time_to_pressure: dict[int,dict[float,Function]]
                 ) -> None:
-    """Save the sample with seed_Id into a dump directory."""
+    """Append the sample with seed_Id to the trajectory stores of the dump directory."""
+    _check_store_layout(directory_name)
     logging.info(f"Store solution with seed_Id: \t {seed_Id}")
     for level in ref_to_time_to_velocity.keys():
-        _dump_function(directory_name + "/velocity/level_" + str(level) + "/" + str(seed_Id),"velocity",ref_to_time_to_velocity[level])
+        _dump_trajectory(trajectory_store(directory_name,"velocity",level),seed_Id,ref_to_time_to_velocity[level])
 
     for level in ref_to_time_to_pressure.keys():
-        _dump_function(directory_name + "/pressure/level_" + str(level) + "/" + str(seed_Id),"pressure",ref_to_time_to_pressure[level])
+        _dump_trajectory(trajectory_store(directory_name,"pressure",level),seed_Id,ref_to_time_to_pressure[level])
 
 def dump_mesh(directory_name: str, mesh: MeshGeometry) -> None:
     _dump_mesh(directory_name + "/mesh",mesh)
 
+def dump_dof_maps(directory_name: str, space_disc: SpaceDiscretisation) -> None:
+    """Save the numbering of the velocity and pressure DOFs next to the mesh.
+    
+    The numbering of a mesh loaded from the checkpoint may differ, the stored DOF maps translate the stored trajectories."""
+    _dump_dof_map(directory_name + "/mesh","velocity",space_disc.velocity_space)
+    _dump_dof_map(directory_name + "/mesh","pressure",space_disc.pressure_space)
+
 def dump_seeds(directory_name: str, seeds: Iterable[int]) -> None:
     with open(directory_name + "/seeds.csv","a",newline="") as file:
         writer = csv.writer(file)
@@ -33,15 +59,10 @@ def dump_noise(directory_name: str,
                 seed_Id: int,
                 ref_to_noise_increments: dict[int,ndarray]
                 ) -> None:
-    if not os.path.isdir(directory_name):
-            os.makedirs(directory_name)
-
+    """Append the noise increments of the sample with seed_Id to the noise stores of the dump directory."""
+    _check_store_layout(directory_name)
     for level in ref_to_noise_increments.keys():
-        if not os.path.isdir(directory_name + "/noise_increments/level_" + str(level) + "/"):
-            os.makedirs(directory_name + "/noise_increments/level_" + str(level) + "/")
-        with open(directory_name + "/noise_increments/level_" + str(level) + "/" + str(seed_Id) + ".csv","w",newline="") as file:
-            writer = csv.writer(file)
-            writer.writerows([[noise_step] for noise_step in ref_to_noise_increments[level]])
+        trajectory_store(directory_name,"noise_increments",level).append(seed_Id,np.asarray(ref_to_noise_increments[level],dtype=float))
 
 
 def dump_header(directory_name: str,
@@ -75,11 +96,17 @@ def dump_header(directory_name: str,
 
 
 ### generic functions    
-def _dump_function(filename: str, function_name: str, time_to_function: dict[float,Function]) -> None:
-    """Dumps the dictoniary 'time -> function' into a .hdf5 file"""
-    with CheckpointFile(filename=filename + ".hdf5",mode="w") as file:
-        for id, time in enumerate(time_to_function.keys()):
-            file.save_function(f=time_to_function[time],idx=id,name=function_name)
+def _dump_trajectory(store: TrajectoryStore, seed_Id: int, time_to_function: dict[float,Function]) -> None:
+    """Append the dictionary 'time -> function' as one trajectory to the store."""
+    times = list(time_to_function.keys())
+    store.append(seed_Id,np.stack([time_to_function[time].dat.data_ro for time in times]),times)
+
+def _dump_dof_map(filename: str, name: str, function_space: FunctionSpace) -> None:
+    """Saves a function whose values are the indices of the nodes into the .hdf5 file of the mesh."""
+    dof_map = Function(function_space)
+    dof_map.dat.data[:] = np.arange(len(dof_map.dat.data_ro)).reshape((-1,) + (1,)*(dof_map.dat.data_ro.ndim - 1))
+    with CheckpointFile(filename=filename + ".hdf5",mode="a") as file:
+        file.save_function(f=dof_map,name=name + "_dof_map")
 
 def _dump_mesh(filename: str, mesh: MeshGeometry) -> None:
     """Dumps the mesh into a .hdf5 file."""
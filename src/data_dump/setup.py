@@ -2,7 +2,7 @@ import os
 import logging
 
 from src.string_formatting import format_header
-from src.data_dump.saver import dump_mesh, dump_header
+from src.data_dump.saver import dump_mesh, dump_dof_maps, dump_header
 from src.data_dump.loader import get_header, get_mesh
 from src.discretisation.space import SpaceDiscretisation
 from src.discretisation.time import TimeDiscretisation
@@ -24,12 +24,6 @@ def create_dump_structure_root(directory_name: str) -> None:
         _create_dir_if_not_exists(directory_name + "/velocity/")
         _create_dir_if_not_exists(directory_name + "/pressure/")
 
-def create_dump_structure_refinement(directory_name: str, list_of_ref: list[int]) -> None:
-    """Create directory structure for refinement level data dump."""
-    for level in list_of_ref:
-        _create_dir_if_not_exists(directory_name + "/velocity/level_" + str(level) + "/")
-        _create_dir_if_not_exists(directory_name + "/pressure/level_" + str(level) + "/")
-
 def update_logfile(directory_name: str, name_logfile: str) -> None:
     """Checks if data has already been generated. If no data can be found, the log file is deleted."""
     if not os.path.isdir(directory_name):
@@ -44,12 +38,12 @@ def setup_data_dump(directory_name: str,
                       model_name: str,
                       algorithm_name: str) -> None:
     """Checks if a storage directory is avaiable. If no directory can be found,
-    create the directory and initialise header, and mesh file, and refinement dirs."""
+    create the directory and initialise header, and mesh file including the DOF maps."""
     if not os.path.isdir(directory_name):
         os.makedirs(directory_name)
         dump_header(directory_name,space_disc,time_disc,initial_condition_name,noise_coefficient_name,model_name,algorithm_name)
-        create_dump_structure_refinement(directory_name,list(time_disc.ref_to_time_grid.keys()))
         dump_mesh(directory_name,space_disc.mesh)
+        dump_dof_maps(directory_name,space_disc)
         msg_parameter = format_header("PARAMETER")
         msg_parameter += f"\nInitial condition:\t {initial_condition_name}"
         msg_parameter += f"\nNoise coefficient:\t {noise_coefficient_name}"
@@ -0,0 +1,102 @@
+"""Defines the consolidated storage of trajectories of many samples in a single .hdf5 file."""
+import os
+import h5py
+import numpy as np
+
+### target size of a chunk in bytes, a chunk holds several time steps of one sample
+CHUNK_BYTES = 2**20
+COMPRESSION_LEVEL = 4
+
+class TrajectoryStore:
+    """Class that stores the trajectories of all samples of one field and refinement level.
+
+    The dataset 'trajectories' has shape (seeds, times) + shape of the DOFs and grows along the seed axis.
+    Chunks span one sample and several time steps, such that a single sample or a single time across all samples is read without decompressing the whole file."""
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+    def _open(self, mode: str) -> h5py.File:
+        """Open the file and check that every stored trajectory has a seed. The seed of a trajectory is written last."""
+        file = h5py.File(self.filename,mode)
+        if "trajectories" in file and file["trajectories"].shape[0] != file["seeds"].shape[0]:
+            samples, seeds = file["trajectories"].shape[0], file["seeds"].shape[0]
+            file.close()
+            msg = f"The store '{self.filename}' is inconsistent, e.g., due to an interrupted append."
+            msg += f"\nStored trajectories:\t {samples}"
+            msg += f"\nStored seeds:\t {seeds}"
+            raise ValueError(msg)
+        return file
+
+    def _create(self, file: h5py.File, trajectory: np.ndarray, times: np.ndarray | None) -> None:
+        bytes_per_time = max(trajectory[0].nbytes,1)
+        time_chunk = int(min(len(trajectory),max(1,CHUNK_BYTES // bytes_per_time)))
+        file.create_dataset("trajectories",shape=(0,) + trajectory.shape,maxshape=(None,) + trajectory.shape,
+                            dtype=trajectory.dtype,chunks=(1,time_chunk) + trajectory.shape[1:],
+                            compression="gzip",compression_opts=COMPRESSION_LEVEL,shuffle=True)
+        file.create_dataset("seeds",shape=(0,),maxshape=(None,),dtype=np.int64)
+        if times is not None:
+            file.create_dataset("times",data=np.asarray(times,dtype=float))
+
+    def append(self, seed_Id: int, trajectory: np.ndarray, times: np.ndarray | list[float] | None = None) -> None:
+        """Append the trajectory of shape (times,) + shape of the DOFs of a new sample."""
+        trajectory = np.asarray(trajectory)
+        directory_name = os.path.dirname(self.filename)
+        if directory_name != "" and not os.path.isdir(directory_name):
+            os.makedirs(directory_name)
+        with self._open("a") as file:
+            if "trajectories" not in file:
+                self._create(file,trajectory,times)
+            dataset = file["trajectories"]
+            if dataset.shape[1:] != trajectory.shape:
+                msg = f"The trajectory doesn't fit into the store '{self.filename}'."
+                msg += f"\nShape of stored trajectories:\t {dataset.shape[1:]}"
+                msg += f"\nProvided:\t {trajectory.shape}"
+                raise ValueError(msg)
+            stored_times = file["times"][:] if "times" in file else None
+            provided_times = np.asarray(times,dtype=float) if times is not None else None
+            if (stored_times is None) != (provided_times is None) or (stored_times is not None and not np.array_equal(stored_times,provided_times)):
+                msg = f"The times of the trajectory don't match the times of the store '{self.filename}'."
+                msg += f"\nStored times:\t {stored_times}"
+                msg += f"\nProvided:\t {provided_times}"
+                raise ValueError(msg)
+            if seed_Id in file["seeds"][:]:
+                msg = f"The seed {seed_Id} is already contained in the store '{self.filename}'."
+                raise ValueError(msg)
+
+            #the seed is written last, such that an interrupted append is detected
+            samples = dataset.shape[0]
+            dataset.resize(samples + 1,axis=0)
+            dataset[samples] = trajectory
+            file["seeds"].resize(samples + 1,axis=0)
+            file["seeds"][samples] = seed_Id
+
+    def seeds(self) -> list[int]:
+        """Return the stored seeds in the order of the store."""
+        if not os.path.isfile(self.filename):
+            return []
+        with self._open("r") as file:
+            return [int(seed) for seed in file["seeds"][:]]
+
+    def times(self) -> np.ndarray:
+        with self._open("r") as file:
+            return file["times"][:]
+
+    def _index(self, file: h5py.File, seed_Id: int) -> int:
+        indices = np.flatnonzero(file["seeds"][:] == seed_Id)
+        if len(indices) == 0:
+            msg = f"The seed {seed_Id} is not contained in the store '{self.filename}'."
+            raise ValueError(msg)
+        return int(indices[0])
+
+    def load_sample(self, seed_Id: int) -> np.ndarray:
+        """Return the trajectory of a sample as array of shape (times,) + shape of the DOFs."""
+        with self._open("r") as file:
+            return file["trajectories"][self._index(file,seed_Id)]
+
+    def load_time(self, time_Id: int, seeds: list[int] | None = None) -> np.ndarray:
+        """Return the values at a time of the given (default: all) samples as array of shape (seeds,) + shape of the DOFs."""
+        with self._open("r") as file:
+            if seeds is None:
+                return file["trajectories"][:,time_Id]
+            indices = [self._index(file,seed_Id) for seed_Id in seeds]
+            return np.stack([file["trajectories"][index,time_Id] for index in indices])
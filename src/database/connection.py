@@ -0,0 +1,89 @@
+"""Defines the database connections that are kept open for the lifetime of the process."""
+import os
+import atexit
+import sqlite3
+from contextlib import contextmanager
+
+### pragmas applied once per connection, they don't change the database file
+PRAGMAS = {"synchronous": "NORMAL",
+           "cache_size": -64000,          #in KiB
+           "mmap_size": 268435456,        #in bytes
+           "foreign_keys": "ON"}
+BUSY_TIMEOUT = 30                         #in seconds
+### WAL journaling lets readers, e.g., plotting scripts, read while a sample is written
+### it persists in the database file and doesn't work on network file systems, disable it there
+WRITE_AHEAD_LOG = True
+
+class DatabaseSession:
+    """Class that holds the connection to a database.
+
+    Transactions can be nested, only the outermost transaction commits. On an error the outermost transaction is rolled back."""
+    def __init__(self, name_database: str) -> None:
+        self.name_database = name_database
+        self.connection = sqlite3.connect(name_database,timeout=BUSY_TIMEOUT,isolation_level=None,check_same_thread=False)
+        for pragma, value in PRAGMAS.items():
+            self.connection.execute(f"PRAGMA {pragma} = {value}")
+        self.depth = 0
+        self.write_ahead_log = False
+
+    def use_write_ahead_log(self) -> None:
+        """Switch the database to WAL journaling before it is written. The journal mode can't be changed within a transaction."""
+        if not WRITE_AHEAD_LOG or self.write_ahead_log or self.depth > 0:
+            return
+        self.connection.execute("PRAGMA main.journal_mode = WAL")
+        self.write_ahead_log = True
+
+    @contextmanager
+    def transaction(self):
+        cursor = self.connection.cursor()
+        if self.depth == 0:
+            cursor.execute("BEGIN")
+        self.depth += 1
+        try:
+            yield cursor
+        except BaseException:
+            self.depth -= 1
+            if self.depth == 0:
+                self.connection.rollback()
+            raise
+        self.depth -= 1
+        if self.depth == 0:
+            self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+### one session per process and database, connections are not shared with forked processes
+_SESSIONS: dict[tuple[int,str],DatabaseSession] = dict()
+
+def get_session(name_database: str) -> DatabaseSession:
+    """Return the session of the database and open it if necessary."""
+    key = (os.getpid(), os.path.abspath(name_database))
+    if key not in _SESSIONS.keys():
+        _SESSIONS[key] = DatabaseSession(name_database)
+    return _SESSIONS[key]
+
+def close_session(name_database: str) -> None:
+    """Close the session of the database, e.g., before the file is moved or removed."""
+    session = _SESSIONS.pop((os.getpid(), os.path.abspath(name_database)),None)
+    if session is not None:
+        session.close()
+
+@atexit.register
+def close_all_sessions() -> None:
+    for key in [key for key in _SESSIONS.keys() if key[0] == os.getpid()]:
+        _SESSIONS.pop(key).close()
+
+@contextmanager
+def transaction(name_database: str):
+    """Run all statements in the context in one transaction of the database session. Yield a cursor."""
+    with get_session(name_database).transaction() as cursor:
+        yield cursor
+
+@contextmanager
+def write_transaction(name_database: str):
+    """Transaction of a writer. The database is switched to WAL journaling first, such that readers don't block it."""
+    session = get_session(name_database)
+    session.use_write_ahead_log()
+    with session.transaction() as cursor:
+        yield cursor
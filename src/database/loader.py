@@ -1,24 +1,18 @@
-import sqlite3
-from firedrake import Function
-from copy import deepcopy
-from contextlib import contextmanager
+import numpy as np
+from firedrake import Function, FunctionSpace
 
 from src.discretisation.mesh import MeshObject
 from src.discretisation.velocity import VelocityDiscretisation
 from src.discretisation.pressure import PressureDiscretisation
 from src.discretisation.space import SpaceDiscretisation
 from src.discretisation.time import TimeDiscretisation
+from src.database.schema import get_schema_version, decode_array
+from src.database.connection import transaction
 
-####################### context manager that opens and closes the database connection
-@contextmanager
+####################### context manager that provides a cursor of the database session
 def open_db(name_database: str):
-    connection = sqlite3.connect(name_database)
-    try:
-        cursor = connection.cursor()
-        yield cursor
-    finally:
-        connection.commit()
-        connection.close()
+    """Return a transaction of the database session. The connection is kept open and reused by later calls."""
+    return transaction(name_database)
 
 ####################### generic function
 def get_columns_of_table(name_database: str, tablename: str, *columnnames: str) -> tuple:
@@ -38,15 +32,15 @@ def get_columns_of_table(name_database: str, tablename: str, *columnnames: str)
 ####################### internal functions that select various objects from the database
 def _velocity_dofs(cursor) -> int:
     """Return number of velocity DOFs."""
-    query = "SELECT nodal_Id FROM velocity_numbering"
+    query = "SELECT COUNT(*) FROM velocity_numbering"
     cursor.execute(query)
-    return len(cursor.fetchall())
+    return cursor.fetchone()[0]
 
 def _pressure_dofs(cursor) -> int:
     """Return number of pressure DOFs."""
-    query = "SELECT nodal_Id FROM pressure_numbering"
+    query = "SELECT COUNT(*) FROM pressure_numbering"
     cursor.execute(query)
-    return len(cursor.fetchall())
+    return cursor.fetchone()[0]
 
 def _initial_time(cursor) -> float:
     """Return inital time."""
@@ -108,6 +102,64 @@ def _noise_coefficient(cursor) -> str:
     return cursor.fetchone()[0]
 
 
+### value columns of the trajectory tables of schema version 1
+_VALUE_COLUMNS = {"velocity": ["velocity_nodal_xvalue", "velocity_nodal_yvalue"],
+                  "pressure": ["pressure_nodal_value"]}
+
+def _trajectory_v1(cursor, tablename: str, seed_Id: int, refinement_level: int, schema: str = "main") -> tuple[np.ndarray,np.ndarray]:
+    """Return nodal times and trajectory of shape (times,) + shape of the DOFs stored in a table of schema version 1.
+
+    The rows are sorted by (time, DOF) in the query and reshaped at once."""
+    match tablename:
+        case "velocity":
+            dofs = _velocity_dofs(cursor)
+        case "pressure":
+            dofs = _pressure_dofs(cursor)
+        case other:
+            print(f"The trajectory table '{tablename}' is not available.")
+            raise NotImplementedError
+    value_columns = _VALUE_COLUMNS[tablename]
+
+    query = f"SELECT nodal_time, {tablename}_nodal_Id, {', '.join(value_columns)} "
+    query += f"FROM {schema}.{tablename} "
+    query += "WHERE seed_Id=? AND refinement_level=? "
+    query += f"ORDER BY nodal_time, {tablename}_nodal_Id"
+    cursor.execute(query,(seed_Id,refinement_level))
+    rows = np.array(cursor.fetchall(),dtype=float).reshape(-1,2+len(value_columns))
+
+    if len(rows) % dofs != 0 or np.any(rows[:,1].reshape(-1,dofs) != np.arange(dofs)):
+        msg = f"Table '{tablename}' doesn't contain all DOFs of each time."
+        msg += f"\nSeed:\t {seed_Id}"
+        msg += f"\nRefinement level:\t {refinement_level}"
+        raise ValueError(msg)
+    times = rows[::dofs,0]
+    trajectory = rows[:,2:].reshape(len(times),dofs,len(value_columns))
+    if tablename == "pressure":
+        trajectory = trajectory[:,:,0]
+    return times, trajectory
+
+def _trajectory_v2(cursor, tablename: str, seed_Id: int, refinement_level: int) -> tuple[np.ndarray,np.ndarray]:
+    """Return nodal times and trajectory of shape (times,) + shape of the DOFs stored in a table of schema version 2."""
+    query = "SELECT nodal_times, dtype, shape, trajectory "
+    query += f"FROM {tablename} "
+    query += "WHERE seed_Id=? AND refinement_level=?"
+    cursor.execute(query,(seed_Id,refinement_level))
+    row = cursor.fetchone()
+    if row is None:
+        return np.zeros(0), np.zeros(0)
+    nodal_times, dtype, shape, trajectory = row
+    return np.frombuffer(nodal_times,dtype=float), decode_array(dtype,shape,trajectory)
+
+def _time_to_function(times: np.ndarray, trajectory: np.ndarray, function_space: FunctionSpace) -> dict[float,Function]:
+    """Return 'time -> function' dictionary of a trajectory."""
+    time_to_function = dict()
+    for time, dofs in zip(times,trajectory):
+        function = Function(function_space)
+        function.dat.data[:] = dofs
+        time_to_function[float(time)] = function
+    return time_to_function
+
+
 ####################### internal functions that check if requested data is contained in database
 def _validate_seed(seed_Id: int, cursor) -> None:
     seeds = _seeds(cursor)
@@ -187,53 +239,29 @@ def get_next_seed(name_database: str) -> int:
         return get_columns_of_table(name_database,"random_seeds","seed_Id")[-1][0] +1
     
 
-###################### loader for dictionaries that map time to various objects
-def get_time_to_velocity(name_database: str, seed_Id: int, refinement_level: int, space_disc: SpaceDiscretisation) -> dict[float,Function]:
-    """Return 'time -> velocity' dictionary for specified seed_Id and refinement_level."""
+###################### loader for trajectories
+def get_trajectory(name_database: str, tablename: str, seed_Id: int, refinement_level: int) -> tuple[np.ndarray,np.ndarray]:
+    """Return nodal times and the trajectory of the table 'velocity' or 'pressure' as array of shape (times,) + shape of the DOFs."""
     with open_db(name_database) as cursor:
-        
+
         _validate_seed(seed_Id,cursor)
         _validate_refinement_level(refinement_level,cursor)
-        
-        query = "SELECT nodal_time, velocity_nodal_Id, velocity_nodal_xvalue, velocity_nodal_yvalue "
-        query += "FROM velocity "
-        query += "WHERE seed_Id=? AND refinement_level=? "
-        query += "ORDER BY nodal_time"
 
-        cursor.execute(query,(seed_Id,refinement_level))
+        if get_schema_version(cursor) >= 2:
+            return _trajectory_v2(cursor,tablename,seed_Id,refinement_level)
+        return _trajectory_v1(cursor,tablename,seed_Id,refinement_level)
 
-        u = Function(space_disc.velocity_space)
-        time_to_velocity = dict()
 
-        for time, id, xvalue, yvalue in cursor.fetchall():            
-            u.dat.data[id,0] = xvalue
-            u.dat.data[id,1] = yvalue
-            if id == space_disc.velocity_dofs-1:
-                time_to_velocity[time] = deepcopy(u)            
-    return time_to_velocity
+###################### loader for dictionaries that map time to various objects
+def get_time_to_velocity(name_database: str, seed_Id: int, refinement_level: int, space_disc: SpaceDiscretisation) -> dict[float,Function]:
+    """Return 'time -> velocity' dictionary for specified seed_Id and refinement_level."""
+    times, trajectory = get_trajectory(name_database,"velocity",seed_Id,refinement_level)
+    return _time_to_function(times,trajectory,space_disc.velocity_space)
 
 def get_time_to_pressure(name_database: str, seed_Id: int, refinement_level: int, space_disc: SpaceDiscretisation) -> dict[float,Function]:
     """Return 'time -> pressure' dictionary for specified seed_Id and refinement_level."""
-    with open_db(name_database) as cursor:
-        
-        _validate_seed(seed_Id,cursor)
-        _validate_refinement_level(refinement_level,cursor)
-
-        query = "SELECT nodal_time, pressure_nodal_Id, pressure_nodal_value "
-        query += "FROM pressure "
-        query += "WHERE seed_Id=? AND refinement_level=? "
-        query += "ORDER BY nodal_time"
-
-        cursor.execute(query,(seed_Id,refinement_level))
-
-        p = Function(space_disc.pressure_space)
-        time_to_pressure = dict()
-
-        for time, id, value in cursor.fetchall():            
-            p.dat.data[id] = value
-            if id == space_disc.pressure_dofs-1:
-                time_to_pressure[time] = deepcopy(p)
-    return time_to_pressure
+    times, trajectory = get_trajectory(name_database,"pressure",seed_Id,refinement_level)
+    return _time_to_function(times,trajectory,space_disc.pressure_space)
 
 def get_time_to_solution(name_database: str, seed_Id: int, refinement_level: int, 
                          space_disc: SpaceDiscretisation) -> dict[float,tuple[Function,Function]]:
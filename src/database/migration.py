@@ -0,0 +1,57 @@
+"""Migrates databases of schema version 1 to version 2.
+
+Usage: python -m src.database.migration <database v1> <database v2>"""
+import os
+import sys
+import logging
+
+from src.database.loader import open_db, _seeds, _refinement_levels, _trajectory_v1
+from src.database.connection import get_session
+from src.database.schema import get_schema_version, encode_array
+from src.database.setup import create_database
+
+### tables that are identical in both versions
+_INDEX_TABLES = ["refinement", "time_grid", "random_seeds", "velocity_numbering", "pressure_numbering",
+                 "noise", "space_parameter", "parameter"]
+
+def _copy_v1_to_v2(session) -> None:
+    with session.transaction() as cursor:
+        for tablename in _INDEX_TABLES:
+            cursor.execute(f"INSERT INTO main.{tablename} SELECT * FROM v1.{tablename}")
+
+        for seed_Id in _seeds(cursor):
+            logging.info(f"Migrate solution with seed_Id: \t {seed_Id}")
+            for level in _refinement_levels(cursor):
+                times, velocity = _trajectory_v1(cursor,"velocity",seed_Id,level,schema="v1")
+                if len(times) > 0:
+                    cursor.execute("INSERT INTO main.velocity VALUES(?,?,?,?,?,?)",(seed_Id,level,times.tobytes(),*encode_array(velocity)))
+
+                times, pressure = _trajectory_v1(cursor,"pressure",seed_Id,level,schema="v1")
+                if len(times) > 0:
+                    cursor.execute("INSERT INTO main.pressure VALUES(?,?,?,?,?,?)",(seed_Id,level,times.tobytes(),*encode_array(pressure)))
+
+def migrate_v1_to_v2(name_database_v1: str, name_database_v2: str) -> None:
+    """Copy the database of schema version 1 into a new database of schema version 2."""
+    if not os.path.isfile(name_database_v1):
+        msg = f"The database '{name_database_v1}' doesn't exist."
+        raise ValueError(msg)
+    if os.path.isfile(name_database_v2):
+        msg = f"The database '{name_database_v2}' already exists."
+        raise ValueError(msg)
+    with open_db(name_database_v1) as cursor:
+        if get_schema_version(cursor) != 1:
+            msg = f"The database '{name_database_v1}' is not of schema version 1."
+            msg += f"\nProvided version:\t {get_schema_version(cursor)}"
+            raise ValueError(msg)
+
+    create_database(name_database_v2,schema_version=2)
+    #databases can't be attached within a transaction
+    session = get_session(name_database_v2)
+    session.connection.execute("ATTACH DATABASE ? AS v1",(name_database_v1,))
+    try:
+        _copy_v1_to_v2(session)
+    finally:
+        session.connection.execute("DETACH DATABASE v1")
+
+if __name__ == "__main__":
+    migrate_v1_to_v2(sys.argv[1],sys.argv[2])
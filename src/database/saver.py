@@ -1,7 +1,10 @@
 from firedrake import Function
 import logging
+import numpy as np
 
 from src.database.loader import open_db
+from src.database.connection import write_transaction
+from src.database.schema import get_schema_version, encode_array
 from src.discretisation.space import SpaceDiscretisation
 from src.discretisation.time import TimeDiscretisation, increments_to_trajectory
 
@@ -9,8 +12,6 @@ from src.discretisation.time import TimeDiscretisation, increments_to_trajectory
 def save_data_to_table(name_database: str, tablename: str, *data) -> None:
     """Save a single data tuple in specified table. """
     with open_db(name_database) as cursor:
-        cursor.execute("PRAGMA foreign_keys = ON")
-
         query = f"INSERT INTO {tablename} VALUES("
         for _ in data:
             query += "?,"
@@ -22,8 +23,6 @@ def save_data_to_table(name_database: str, tablename: str, *data) -> None:
 def save_much_data_to_table(name_database: str, tablename: str, data: list[tuple]) -> None:
     """Save a list of data tuples in specified table."""
     with open_db(name_database) as cursor:
-        cursor.execute("PRAGMA foreign_keys = ON")
-
         query = f"INSERT INTO {tablename} VALUES("
         for _ in data[0]:
             query += "?,"
@@ -32,9 +31,23 @@ def save_much_data_to_table(name_database: str, tablename: str, data: list[tuple
         cursor.executemany(query, data)
         #sqliteConnection.commit()  
     
+def save_trajectory(name_database: str, tablename: str, seed_Id: int, refinement_level: int, time_to_function: dict[float,Function]) -> None:
+    """Save 'time -> function' dictionary as one compressed trajectory of shape (times,) + shape of the DOFs."""
+    times = list(time_to_function.keys())
+    dtype, shape, trajectory = encode_array(np.stack([time_to_function[time].dat.data_ro for time in times]))
+    nodal_times = np.asarray(times,dtype=float).tobytes()
+    save_data_to_table(name_database,tablename,seed_Id,refinement_level,nodal_times,dtype,shape,trajectory)
+
+def _schema_version(name_database: str) -> int:
+    with open_db(name_database) as cursor:
+        return get_schema_version(cursor)
+
 ############# specific functions for insertions into the database
 def save_time_to_velocity(name_database: str, seed_Id: int, refinement_level: int, velocity_dofs: int, time_to_velocity: dict[float,Function]) -> None:
     """Save 'time -> velocity' dictionary to database."""
+    if _schema_version(name_database) >= 2:
+        save_trajectory(name_database,"velocity",seed_Id,refinement_level,time_to_velocity)
+        return
     data = []
     for time in time_to_velocity:
         for dof_Id in range(velocity_dofs):
@@ -44,6 +57,9 @@ def save_time_to_velocity(name_database: str, seed_Id: int, refinement_level: in
 
 def save_time_to_pressure(name_database: str, seed_Id: int, refinement_level: int, pressure_dofs: int, time_to_pressure: list) -> None:
     """Save 'time -> pressure' dictionary to databse."""
+    if _schema_version(name_database) >= 2:
+        save_trajectory(name_database,"pressure",seed_Id,refinement_level,time_to_pressure)
+        return
     data = []
     for time in time_to_pressure:
         for dof_Id in range(pressure_dofs):
@@ -70,9 +86,10 @@ def save_data_to_database(name_database: str,
                           ref_to_time_to_velocity: dict[int,dict[float,Function]], 
                           ref_to_time_to_pressure: dict[int,dict[float,Function]],
                           ref_to_noise_increments: dict[int,list[float]]):
-    """Saves the data to the database."""
+    """Saves the data to the database. All insertions of the sample are committed in one transaction."""
     logging.info(f"Store solution with seed_Id: \t {seed}")
-    for level in time_disc.refinement_levels:
-        save_time_to_velocity(name_database, seed, level, space_disc.velocity_dofs, ref_to_time_to_velocity[level])
-        save_time_to_pressure(name_database, seed, level, space_disc.pressure_dofs, ref_to_time_to_pressure[level])
-        save_noise(name_database,seed, level, time_disc.ref_to_time_grid[level],increments_to_trajectory(0,ref_to_noise_increments[level]))
+    with write_transaction(name_database):
+        for level in time_disc.refinement_levels:
+            save_time_to_velocity(name_database, seed, level, space_disc.velocity_dofs, ref_to_time_to_velocity[level])
+            save_time_to_pressure(name_database, seed, level, space_disc.pressure_dofs, ref_to_time_to_pressure[level])
+            save_noise(name_database,seed, level, time_disc.ref_to_time_grid[level],increments_to_trajectory(0,ref_to_noise_increments[level]))
@@ -0,0 +1,27 @@
+"""Defines the schema versions of the database and the encoding of trajectories as binary blobs."""
+import zlib
+import numpy as np
+
+### version 1: one row per (seed, refinement level, time, DOF)
+### version 2: one row per (seed, refinement level) holding the compressed trajectory
+SCHEMA_VERSION = 2
+COMPRESSION_LEVEL = 6
+
+def get_schema_version(cursor) -> int:
+    """Return the schema version of the database. Databases without version are of version 1."""
+    cursor.execute("PRAGMA user_version")
+    return max(cursor.fetchone()[0],1)
+
+def set_schema_version(cursor, schema_version: int) -> None:
+    cursor.execute(f"PRAGMA user_version = {int(schema_version)}")
+
+def encode_array(array: np.ndarray) -> tuple[str,str,bytes]:
+    """Return dtype, shape and compressed data of the array."""
+    array = np.ascontiguousarray(array)
+    shape = ",".join(str(length) for length in array.shape)
+    return array.dtype.str, shape, zlib.compress(array.tobytes(),COMPRESSION_LEVEL)
+
+def decode_array(dtype: str, shape: str, blob: bytes) -> np.ndarray:
+    """Return the array stored by 'encode_array'."""
+    shape = tuple(int(length) for length in shape.split(",") if length != "")
+    return np.frombuffer(zlib.decompress(blob),dtype=np.dtype(dtype)).reshape(shape)
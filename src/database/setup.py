@@ -1,17 +1,70 @@
-import sqlite3
 import logging
 import os
 
 from src.database.saver import save_data_to_table, save_much_data_to_table
+from src.database.connection import write_transaction
+from src.database.schema import SCHEMA_VERSION, set_schema_version
 from src.discretisation.space import SpaceDiscretisation
 from src.discretisation.time import TimeDiscretisation
 from src.utils import logstring_to_logger
 from src.string_formatting import format_header
 
-def create_database(name_database: str) -> None:
-    """Create database."""
-    with sqlite3.connect(name_database) as sqliteConnection: 
-        cursor = sqliteConnection.cursor()
+def _create_trajectory_tables_v1(cursor) -> None:
+    """Create tables with one row per (seed, refinement level, time, DOF)."""
+    cursor.execute("""CREATE TABLE IF NOT EXISTS velocity (
+            seed_Id INTEGER NOT NULL,
+            refinement_level INTEGER NOT NULL,
+            nodal_time REAL NOT NULL,
+            velocity_nodal_Id INTEGER NOT NULL,
+            velocity_nodal_xvalue REAL NOT NULL,
+            velocity_nodal_yvalue REAL NOT NULL,
+            FOREIGN KEY(seed_Id) REFERENCES random_seeds(seed_Id),
+            FOREIGN KEY(refinement_level, nodal_time) REFERENCES time_grid(refinement_level, nodal_time),
+            FOREIGN KEY(velocity_nodal_Id) REFERENCES velocity_numbering(nodal_Id),
+            PRIMARY KEY(seed_Id, refinement_level, nodal_time, velocity_nodal_Id)
+        )""")
+    
+    cursor.execute("""CREATE TABLE IF NOT EXISTS pressure (
+            seed_Id INTEGER NOT NULL,
+            refinement_level INTEGER NOT NULL,
+            nodal_time REAL NOT NULL,
+            pressure_nodal_Id INTEGER NOT NULL,
+            pressure_nodal_value REAL NOT NULL,
+            FOREIGN KEY(seed_Id) REFERENCES random_seeds(seed_Id),
+            FOREIGN KEY(refinement_level, nodal_time) REFERENCES time_grid(refinement_level, nodal_time),
+            FOREIGN KEY(pressure_nodal_Id) REFERENCES pressure_numbering(nodal_Id),
+            PRIMARY KEY(seed_Id, refinement_level, nodal_time, pressure_nodal_Id)
+        )""")
+
+def _create_trajectory_tables_v2(cursor) -> None:
+    """Create tables with one row per (seed, refinement level) that hold the compressed trajectory and its time grid."""
+    cursor.execute("""CREATE TABLE IF NOT EXISTS velocity (
+            seed_Id INTEGER NOT NULL,
+            refinement_level INTEGER NOT NULL,
+            nodal_times BLOB NOT NULL,
+            dtype TEXT NOT NULL,
+            shape TEXT NOT NULL,
+            trajectory BLOB NOT NULL,
+            FOREIGN KEY(seed_Id) REFERENCES random_seeds(seed_Id),
+            FOREIGN KEY(refinement_level) REFERENCES refinement(refinement_level),
+            PRIMARY KEY(seed_Id, refinement_level)
+        )""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS pressure (
+            seed_Id INTEGER NOT NULL,
+            refinement_level INTEGER NOT NULL,
+            nodal_times BLOB NOT NULL,
+            dtype TEXT NOT NULL,
+            shape TEXT NOT NULL,
+            trajectory BLOB NOT NULL,
+            FOREIGN KEY(seed_Id) REFERENCES random_seeds(seed_Id),
+            FOREIGN KEY(refinement_level) REFERENCES refinement(refinement_level),
+            PRIMARY KEY(seed_Id, refinement_level)
+        )""")
+
+def create_database(name_database: str, schema_version: int = SCHEMA_VERSION) -> None:
+    """Create database with the trajectory tables of the given schema version."""
+    with write_transaction(name_database) as cursor:
 
         cursor.execute("""CREATE TABLE IF NOT EXISTS refinement (
                 refinement_level INTEGER PRIMARY KEY NOT NULL
@@ -46,31 +99,6 @@ def create_database(name_database: str) -> None:
                 PRIMARY KEY(seed_Id, refinement_level, nodal_time)
             )""")
 
-        cursor.execute( """CREATE TABLE IF NOT EXISTS velocity (
-                seed_Id INTEGER NOT NULL,
-                refinement_level INTEGER NOT NULL,
-                nodal_time REAL NOT NULL,
-                velocity_nodal_Id INTEGER NOT NULL,
-                velocity_nodal_xvalue REAL NOT NULL,
-                velocity_nodal_yvalue REAL NOT NULL,
-                FOREIGN KEY(seed_Id) REFERENCES random_seeds(seed_Id),
-                FOREIGN KEY(refinement_level, nodal_time) REFERENCES time_grid(refinement_level, nodal_time),
-                FOREIGN KEY(velocity_nodal_Id) REFERENCES velocity_numbering(nodal_Id),
-                PRIMARY KEY(seed_Id, refinement_level, nodal_time, velocity_nodal_Id)
-            )""")
-        
-        cursor.execute("""CREATE TABLE IF NOT EXISTS pressure (
-                seed_Id INTEGER NOT NULL,
-                refinement_level INTEGER NOT NULL,
-                nodal_time REAL NOT NULL,
-                pressure_nodal_Id INTEGER NOT NULL,
-                pressure_nodal_value REAL NOT NULL,
-                FOREIGN KEY(seed_Id) REFERENCES random_seeds(seed_Id),
-                FOREIGN KEY(refinement_level, nodal_time) REFERENCES time_grid(refinement_level, nodal_time),
-                FOREIGN KEY(pressure_nodal_Id) REFERENCES pressure_numbering(nodal_Id),
-                PRIMARY KEY(seed_Id, refinement_level, nodal_time, pressure_nodal_Id)
-            )""")
-        
         cursor.execute("""CREATE TABLE IF NOT EXISTS space_parameter (
                 mesh_name TEXT,
                 mesh_space_points INTEGER,
@@ -86,6 +114,16 @@ def create_database(name_database: str) -> None:
                 initial_condition TEXT
             )""")
 
+        match schema_version:
+            case 1:
+                _create_trajectory_tables_v1(cursor)
+            case 2:
+                _create_trajectory_tables_v2(cursor)
+            case other:
+                print(f"The schema version {schema_version} is not available.")
+                raise NotImplementedError
+        set_schema_version(cursor,schema_version)
+
 def initialise_indextables(name_database: str, ref_to_time_grid: dict[int,list[float]], dof_velocity: int, dof_pressure: int) -> None:
     """Initialise index tables based on CONFIGs."""
     for level in ref_to_time_grid:
@@ -115,9 +153,10 @@ def initialise_index_and_header_tables(name_database: str,
                        name_initial_condition: str,
                        name_noise_coefficient: str) -> None:
     """Initialise the index tables."""
-    initialise_indextables(name_database,time_disc.ref_to_time_grid,space_disc.velocity_dofs,space_disc.pressure_dofs)
-    write_space_parameter(name_database,space_disc)
-    write_parameter(name_database,name_noise_coefficient,name_initial_condition)
+    with write_transaction(name_database):
+        initialise_indextables(name_database,time_disc.ref_to_time_grid,space_disc.velocity_dofs,space_disc.pressure_dofs)
+        write_space_parameter(name_database,space_disc)
+        write_parameter(name_database,name_noise_coefficient,name_initial_condition)
     msg_parameter = format_header("PARAMETER")
     msg_parameter += f"\nInitial condition:\t {name_initial_condition}"
     msg_parameter += f"\nNoise coefficient:\t {name_noise_coefficient}"
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from functools import cached_property
+import numpy as np
 
 from src.string_formatting import format_header
 
@@ -15,6 +16,31 @@ def _time_grid(initial_time: float, end_time: float, time_steps: int) -> list[fl
     """Return time grid based on time parameter."""
     return [initial_time + k*(end_time - initial_time)/time_steps for k in range(time_steps +1)]
 
+@dataclass(frozen=True)
+class TimeAlignment:
+    """Store the union of two time grids and, for each union node, the indices of the biggest nodes not bigger than it in both sorted grids."""
+    time_grid1: tuple[float,...]
+    time_grid2: tuple[float,...]
+    union_grid: np.ndarray
+    indices1: np.ndarray
+    indices2: np.ndarray
+
+def _left_indices(sorted_grid: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Return the index of the biggest node in the sorted grid that is not bigger than the requested node."""
+    indices = np.searchsorted(sorted_grid,nodes,side="right") - 1
+    if np.any(indices < 0):
+        raise ValueError("Requested time is not in the time_grid.")
+    return indices
+
+def align_time_grids(time_grid1, time_grid2) -> TimeAlignment:
+    """Return the alignment of two time grids. Alignments of refinement levels are precomputed by 'TimeDiscretisation'."""
+    sorted_grid1 = tuple(sorted(time_grid1))
+    sorted_grid2 = tuple(sorted(time_grid2))
+    grid1 = np.asarray(sorted_grid1)
+    grid2 = np.asarray(sorted_grid2)
+    union_grid = np.union1d(grid1,grid2)
+    return TimeAlignment(sorted_grid1,sorted_grid2,union_grid,_left_indices(grid1,union_grid),_left_indices(grid2,union_grid))
+
 @dataclass
 class TimeDiscretisation:
     """Store time parameter."""
@@ -38,6 +64,29 @@ class TimeDiscretisation:
     def ref_to_time_to_id(self) -> dict[int,dict[float,int]]:
         return {level: {time: index for index, time in enumerate(self.ref_to_time_grid[level])} for level in self.refinement_levels}
 
+    @cached_property
+    def ref_pair_to_alignment(self) -> dict[tuple[int,int],TimeAlignment]:
+        """Return '(coarse level, fine level) -> alignment of their time grids' for all pairs of refinement levels."""
+        return {(coarse_level, fine_level): align_time_grids(self.ref_to_time_grid[coarse_level],self.ref_to_time_grid[fine_level]) 
+                for coarse_level in self.refinement_levels for fine_level in self.refinement_levels if coarse_level <= fine_level}
+
+    def get_alignment(self, coarse_level: int, fine_level: int) -> TimeAlignment:
+        """Return the precomputed alignment of the time grids of two refinement levels."""
+        return self.ref_pair_to_alignment[(coarse_level, fine_level)]
+
+    def select_times(self, selection: str) -> tuple[float,...] | None:
+        """Return the times an observation is restricted to. 
+        
+        'all' keeps all nodal times of each level (None), 'coarse' the times of the coarsest time grid, which are nodal times of all levels."""
+        match selection:
+            case "all":
+                return None
+            case "coarse":
+                return tuple(self.ref_to_time_grid[min(self.refinement_levels)])
+            case other:
+                print(f"The time selection '{selection}' is not available.")
+                raise NotImplementedError
+
     
     def __str__(self) -> str:
         out = format_header("TIME PARAMETER")
@@ -1,11 +1,16 @@
 """Defines Bochner time distances."""
+import numpy as np
 from numpy import sqrt
-from typing import Callable, TypeAlias
+from bisect import bisect_right
+from typing import Callable, TypeAlias, Iterable
 from firedrake import Function
 
-from src.math.distances.space import SpaceDistance
-from src.math.norms.Bochner_time import nikolskii_half_X_norm
+from src.math.distances.space import SpaceDistance, batched_space_distance
+from src.math.norms.Bochner_time import nikolskii_half_X_norm, cached_integrate_in_time
 from src.math.norms.space import SpaceNorm
+from src.math.operators import operator_space, is_discrete, dof_matrix, dof_arrays_from_matrix
+from src.discretisation.time import TimeAlignment, align_time_grids
+from src.utils import ComputationCache
 
 #############################           BOCHNER TIME DISTANCE
 #abstract concept
@@ -15,44 +20,51 @@ BochnerTimeDistance: TypeAlias = Callable[[dict[float,Function],dict[float,Funct
 def project_left(time: float, time_grid: list[float]) -> float:
     """Return the biggest nodal time in the time grid that is not bigger than the requested time."""
     sorted_time = sorted(time_grid)
-    if time < sorted_time[0]:
+    index = bisect_right(sorted_time,time) - 1
+    if index < 0:
         raise ValueError("Requested time is not in the time_grid.")
-    for node in sorted_time:
-        if node > time:
-            return projected_time
-        projected_time = node
-    return projected_time
+    return sorted_time[index]
 
-def integrate_in_time(time_to_function: dict[float, Function]) -> dict[float, Function]:
-    sorted_time = sorted(list(time_to_function.keys()))
-    time_to_int_function = dict()
-    time_to_int_function[sorted_time[0]] = time_to_function[sorted_time[0]]
-    for k in range(1,len(sorted_time)):
-        time_to_int_function[sorted_time[k]] = time_to_function[sorted_time[k]]*(sorted_time[k] - sorted_time[k-1])
-    return time_to_int_function
+def aligned_functions(time_to_function1: dict[float, Function], 
+                      time_to_function2: dict[float,Function], 
+                      alignment: TimeAlignment | None = None) -> tuple[np.ndarray,list[Function],list[Function]]:
+    """Return the unified time grid and the functions of both dictionaries at the biggest nodal times below each unified nodal time.
+    
+    The alignment of the time grids, e.g., of two refinement levels by 'TimeDiscretisation.get_alignment', is computed if it isn't provided."""
+    if alignment is None:
+        alignment = align_time_grids(time_to_function1.keys(),time_to_function2.keys())
+    functions1 = [time_to_function1[alignment.time_grid1[index]] for index in alignment.indices1]
+    functions2 = [time_to_function2[alignment.time_grid2[index]] for index in alignment.indices2]
+    return alignment.union_grid, functions1, functions2
+
+def _aligned_distances(time_to_function1: dict[float, Function], 
+                       time_to_function2: dict[float,Function], 
+                       distance_X: SpaceDistance,
+                       cache: ComputationCache | None = None,
+                       alignment: TimeAlignment | None = None) -> tuple[np.ndarray,np.ndarray]:
+    """Return the unified time grid and the local errors on it. The result is shared via the cache if provided."""
+    def compute() -> tuple[np.ndarray,np.ndarray]:
+        union_time, functions1, functions2 = aligned_functions(time_to_function1,time_to_function2,alignment)
+        return union_time, batched_space_distance(distance_X,functions1,functions2)
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(cache.key("aligned_distances",time_to_function1,time_to_function2,distance_X),compute)
 
 
 #implementation
-def linf_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance) -> float:
+### all distances accept an optional cache that shares local errors and time integrals between distances of the same data
+### and an optional precomputed alignment of both time grids
+def linf_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance, cache: ComputationCache | None = None, alignment: TimeAlignment | None = None) -> float:
     """Computes the Linf in time and 'X' in space distance of 'time -> function1' and 'time -> function2' dictionaries. 
     
     In more detail: The time grids of function 1 and function 2 are used to generate a unified time grid.
     Local errors on the unified time grid are computed by comparing the distance of function 1 
     and function 2 measured in 'X' at time points that are the biggest nodal times below the unified nodal time
     in time grid 1 and time grid 2, respectively. The biggest local error is returned."""
-    time_grid1 = set(time_to_function1.keys())
-    time_grid2 = set(time_to_function2.keys())
-    union_time = time_grid1.union(time_grid2)
-
-    #compute local errors and store them in a dictionary indexed by the time
-    error = []
-    for time in union_time:
-        time_projected_grid1 = project_left(time,time_grid1)
-        time_projected_grid2 = project_left(time,time_grid2)
-        error.append(distance_X(time_to_function1[time_projected_grid1], time_to_function2[time_projected_grid2]))
-    return max(error)
-
-def l2_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance) -> float:
+    _, error = _aligned_distances(time_to_function1,time_to_function2,distance_X,cache,alignment)
+    return float(np.max(error))
+
+def l2_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance, cache: ComputationCache | None = None, alignment: TimeAlignment | None = None) -> float:
     """Computes the L2 in time and 'X' in space distance of 'time -> function1' and 'time -> function2' dictionaries. 
     
     In more detail: The time grids of function 1 and function 2 are used to generate a unified time grid.
@@ -61,27 +73,14 @@ def l2_X_distance(time_to_function1: dict[float, Function], time_to_function2: d
     in time grid 1 and time grid 2, respectively. 
     Afterwards the square of the local errors are weighted by increments of the unified time grid and summed up.
     Finally its square root is returned."""
-
-    time_grid1 = set(time_to_function1.keys())
-    time_grid2 = set(time_to_function2.keys())
-    union_time = time_grid1.union(time_grid2)
-
-    #compute local errors and store them in a dictionary indexed by the time
-    error_grid = dict()
-    for time in union_time:
-        time_projected_grid1 = project_left(time,time_grid1)
-        time_projected_grid2 = project_left(time,time_grid2)
-        error_grid[time] = distance_X(time_to_function1[time_projected_grid1], time_to_function2[time_projected_grid2])
+    #compute local errors at once ordered by the unified time grid
+    union_time, error_grid = _aligned_distances(time_to_function1,time_to_function2,distance_X,cache,alignment)
 
     #sum up the local error contributions weighted by the size of the local time steps
-    sorted_union_time = sorted(list(union_time))
-    error = 0
-    for k, time in enumerate(sorted_union_time[1:]):
-        error += error_grid[time]**2*(sorted_union_time[k+1] - sorted_union_time[k])
-    return sqrt(error)
-
-def end_time_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance) -> float:
-    """Computes the 'X' distance in space of 'time -> function1' and 'time -> function2' dictionaries at the endtime. """
+    return sqrt(np.sum(error_grid[1:]**2*np.diff(union_time)))
+
+def end_time_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance, cache: ComputationCache | None = None, alignment: TimeAlignment | None = None) -> float:
+    """Computes the 'X' distance in space of 'time -> function1' and 'time -> function2' dictionaries at the endtime. The alignment isn't needed."""
     end_time1 = sorted(list(time_to_function1.keys()))[-1]
     end_time2 = sorted(list(time_to_function2.keys()))[-1]
     if not end_time1 == end_time2:
@@ -89,9 +88,14 @@ def end_time_X_distance(time_to_function1: dict[float, Function], time_to_functi
         msg_error += f"First end time: \t {end_time1}\n"
         msg_error += f"Second end time: \t {end_time2}"
         raise ValueError(msg_error)
+    #reuse the local error at the end time if it is already available
+    if cache is not None:
+        aligned_distances = cache.lookup(cache.key("aligned_distances",time_to_function1,time_to_function2,distance_X))
+        if aligned_distances is not None:
+            return float(aligned_distances[1][-1])
     return distance_X(time_to_function1[end_time1],time_to_function2[end_time2])
 
-def h_minus1_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance) -> float:
+def h_minus1_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance, cache: ComputationCache | None = None, alignment: TimeAlignment | None = None) -> float:
     """Computes the H-1 in time and 'X' in space distance of 'time -> function1' and 'time -> function2' dictionaries. 
     
     In more detail: The time grids of function 1 and function 2 are used to generate a unified time grid.
@@ -102,21 +106,26 @@ def h_minus1_X_distance(time_to_function1: dict[float, Function], time_to_functi
     Finally its square root is returned."""
 
     #integrate input functions in time:
-    time_to_int_function1 = integrate_in_time(time_to_function1)
-    time_to_int_function2 = integrate_in_time(time_to_function2)
+    time_to_int_function1 = cached_integrate_in_time(time_to_function1,cache)
+    time_to_int_function2 = cached_integrate_in_time(time_to_function2,cache)
 
-    return l2_X_distance(time_to_int_function1, time_to_int_function2, distance_X)
+    return l2_X_distance(time_to_int_function1, time_to_int_function2, distance_X, cache, alignment)
 
-def w_minus1_inf_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance) -> float:
+def w_minus1_inf_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], distance_X: SpaceDistance, cache: ComputationCache | None = None, alignment: TimeAlignment | None = None) -> float:
     """Computes the W{-1,inf} in time and 'X' in space distance of 'time -> function1' and 'time -> function2' dictionaries. """
     
     #integrate input functions in time:
-    time_to_int_function1 = integrate_in_time(time_to_function1)
-    time_to_int_function2 = integrate_in_time(time_to_function2)
+    time_to_int_function1 = cached_integrate_in_time(time_to_function1,cache)
+    time_to_int_function2 = cached_integrate_in_time(time_to_function2,cache)
 
-    return linf_X_distance(time_to_int_function1, time_to_int_function2, distance_X)
+    return linf_X_distance(time_to_int_function1, time_to_int_function2, distance_X, cache, alignment)
 
-def nikolskii_minushalf_X_distance(time_to_function1: dict[float, Function], time_to_function2: dict[float,Function], norm_X: SpaceNorm) -> float:
+def nikolskii_minushalf_X_distance(time_to_function1: dict[float, Function], 
+                                   time_to_function2: dict[float,Function], 
+                                   norm_X: SpaceNorm, 
+                                   cache: ComputationCache | None = None, 
+                                   shifts: Iterable[int] | None = None,
+                                   alignment: TimeAlignment | None = None) -> float:
     """Computes the N{-1/2,2} in time and 'X' in space distance of 'time -> function1' and 'time -> function2' dictionaries. 
     
     In more detail: The time grids of function 1 and function 2 are used to generate a unified time grid.
@@ -127,19 +136,17 @@ def nikolskii_minushalf_X_distance(time_to_function1: dict[float, Function], tim
     Finally its square root is returned."""
 
     #integrate input functions in time:
-    time_to_int_function1 = integrate_in_time(time_to_function1)
-    time_to_int_function2 = integrate_in_time(time_to_function2)
-
-    #generate joint time grid
-    time_grid1 = set(time_to_int_function1.keys())
-    time_grid2 = set(time_to_int_function2.keys())
-    union_time = time_grid1.union(time_grid2)
-
-    #define difference function
-    time_to_function_dif = dict()
-    for time in union_time:
-        time_to_function_dif[time] = time_to_int_function1[project_left(time,time_grid1)] - time_to_int_function2[project_left(time,time_grid2)]
-
-    return nikolskii_half_X_norm(time_to_function_dif,norm_X)
+    time_to_int_function1 = cached_integrate_in_time(time_to_function1,cache)
+    time_to_int_function2 = cached_integrate_in_time(time_to_function2,cache)
+
+    #define difference function on joint time grid
+    union_time, functions1, functions2 = aligned_functions(time_to_int_function1,time_to_int_function2,alignment)
+    if is_discrete(*functions1,*functions2):
+        functions_dif = dof_arrays_from_matrix(operator_space(functions1[0]),dof_matrix(functions1) - dof_matrix(functions2))
+    else:
+        functions_dif = [function1 - function2 for function1, function2 in zip(functions1,functions2)]
+    time_to_function_dif = dict(zip(union_time.tolist(),functions_dif))
+
+    return nikolskii_half_X_norm(time_to_function_dif,norm_X,shifts=shifts)
 
     
\ No newline at end of file
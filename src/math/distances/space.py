@@ -1,32 +1,101 @@
 """Defines space distances."""
+import numpy as np
 from numpy import sqrt
 from firedrake import assemble, inner, dx, Function, grad
 from typing import Callable, TypeAlias
+from functools import partial
 from src.algorithms.nonlinearities import V_tensor, V_tensor_sym
+from src.math.operators import operator_space, is_discrete, dof_vector, dof_matrix, quadratic_form, batched_quadratic_form
+from src.math.quadrature import get_gradient_tabulation
 
 #############################           SPACE DISTANCE
 #abstract concept
 SpaceDistance: TypeAlias = Callable[[Function,Function],float]
 
 #implementation
+### Functions of the same space are evaluated by cached operators, general UFL expressions are assembled
 def l2_distance(function1: Function, function2: Function) -> float:
     """Compute the L2 distance of two functions."""
+    if is_discrete(function1,function2):
+        return sqrt(quadratic_form(operator_space(function1),"mass",dof_vector(function1) - dof_vector(function2)))
     return sqrt(assemble(inner(function1 - function2, function1 - function2)*dx))
 
 def h1_distance(function1: Function, function2: Function) -> float:
     """Compute the H1 distance of two functions."""
+    if is_discrete(function1,function2):
+        return sqrt(quadratic_form(operator_space(function1),"stiffness",dof_vector(function1) - dof_vector(function2)))
     return l2_distance(grad(function1),grad(function2))
 
 ##### CARE: V distances do not follow abstract concept of distance as they require info of kappa and p
 ##### in application first use partial application (insert the value of p and kappa) to define V distance that follows abstract distanc concept
 def V_distance(function1: Function, function2: Function, kappa_value: float, p_value: float) -> float:
     """Compute the gradient V distance of two functions."""
+    if is_discrete(function1,function2):
+        return float(batched_V_distance([function1],[function2],kappa_value,p_value)[0])
     V1 = V_tensor(grad(function1),p_value=p_value,kappa_value=kappa_value)
     V2 = V_tensor(grad(function2),p_value=p_value,kappa_value=kappa_value)
     return l2_distance(V1,V2)
 
 def V_sym_distance(function1: Function, function2: Function, kappa_value: float, p_value: float) -> float:
     """Compute the symmetric gradient V distance of two functions."""
+    if is_discrete(function1,function2):
+        return float(batched_V_distance([function1],[function2],kappa_value,p_value,symmetric=True)[0])
     V1_sym = V_tensor_sym(grad(function1),p_value=p_value,kappa_value=kappa_value)
     V2_sym = V_tensor_sym(grad(function2),p_value=p_value,kappa_value=kappa_value)
-    return l2_distance(V1_sym,V2_sym)
\ No newline at end of file
+    return l2_distance(V1_sym,V2_sym)
+
+#############################           BATCHED EVALUATION
+### V distances evaluated at quadrature points
+def _V_tensor_at_points(grads: np.ndarray, kappa_value: float, p_value: float, symmetric: bool) -> np.ndarray:
+    """Apply A -> (kappa + |A|^2)^((p-2)/4) A to gradients at quadrature points. The gradient indices are the last two axes."""
+    if symmetric:
+        grads = 0.5*(grads + np.swapaxes(grads,-1,-2))
+    square = np.einsum("...ij,...ij->...",grads,grads)
+    return np.power(kappa_value + square,(p_value - 2.0)/4.0)[...,None,None]*grads
+
+def batched_V_distance(functions1: list[Function], 
+                       functions2: list[Function], 
+                       kappa_value: float, 
+                       p_value: float, 
+                       symmetric: bool = False) -> np.ndarray:
+    """Compute the (symmetric) gradient V distance of each pair of functions. 
+    
+    Gradients are evaluated at the quadrature points of all functions at once and the nonlinearity is applied pointwise."""
+    tabulation = get_gradient_tabulation(operator_space(functions1[0]))
+    V1 = _V_tensor_at_points(tabulation.gradients(dof_matrix(functions1)),kappa_value,p_value,symmetric)
+    V2 = _V_tensor_at_points(tabulation.gradients(dof_matrix(functions2)),kappa_value,p_value,symmetric)
+    difference = V1 - V2
+    return sqrt(np.maximum(tabulation.integrate(np.einsum("...ij,...ij->...",difference,difference)),0.0))
+
+def _as_batched_V_distance(space_distance: SpaceDistance):
+    """Return the batched V distance if 'space_distance' is a partial application of a V distance, otherwise None."""
+    if not isinstance(space_distance,partial) or space_distance.func not in (V_distance,V_sym_distance) or space_distance.args:
+        return None
+    return partial(batched_V_distance,symmetric=space_distance.func is V_sym_distance,**space_distance.keywords)
+
+### space distances that are quadratic forms of a cached operator
+DISTANCE_TO_OPERATOR: dict[SpaceDistance,str] = {l2_distance: "mass", h1_distance: "stiffness"}
+
+def batched_space_distance(space_distance: SpaceDistance, functions1: list[Function], functions2: list[Function]) -> np.ndarray:
+    """Compute the distance of each pair of functions. 
+    
+    Quadratic distances and partially applied V distances of Functions in one space are evaluated at once, otherwise the distance is evaluated pair by pair."""
+    if not len(functions1) == len(functions2):
+        msg = "Number of functions do not match."
+        msg += f"\nFirst list:\t {len(functions1)}"
+        msg += f"\nSecond list:\t {len(functions2)}"
+        raise ValueError(msg)
+    if len(functions1) > 0 and space_distance in DISTANCE_TO_OPERATOR.keys() and is_discrete(*functions1,*functions2):
+        difference = dof_matrix(functions1) - dof_matrix(functions2)
+        return sqrt(batched_quadratic_form(operator_space(functions1[0]),DISTANCE_TO_OPERATOR[space_distance],difference))
+    batched_V = _as_batched_V_distance(space_distance)
+    if len(functions1) > 0 and batched_V is not None and is_discrete(*functions1,*functions2):
+        return batched_V(functions1,functions2)
+    return np.array([space_distance(function1,function2) for function1, function2 in zip(functions1,functions2)])
+
+def batched_consecutive_distance(space_distance: SpaceDistance, functions: list[Function]) -> np.ndarray:
+    """Compute the distance of each function to its predecessor. The degrees of freedom are stacked once."""
+    if len(functions) > 1 and space_distance in DISTANCE_TO_OPERATOR.keys() and is_discrete(*functions):
+        difference = np.diff(dof_matrix(functions),axis=0)
+        return sqrt(batched_quadratic_form(operator_space(functions[0]),DISTANCE_TO_OPERATOR[space_distance],difference))
+    return batched_space_distance(space_distance,functions[1:],functions[:-1])
@@ -2,27 +2,56 @@
 from firedrake import Function
 from typing import Callable, TypeAlias
 
-from src.math.norms.space import l2_space, h1_space
+from src.math.norms.space import SpaceNorm, l2_space, h1_space, batched_space_norm
+from src.utils import ComputationCache
 
 #############################           ENERGIES 
 #abstract concept
+### energies may accept an optional keyword 'cache' that shares space norms with other diagnostics of the same sample
 Energy_function: TypeAlias = Callable[[dict[float,Function]],dict[float,float]]
 
-#implementation
-def kinetic_energy(time_to_function: dict[float,Function]) -> dict[float,float]:
-    """Compute the kinetic energy of a function."""
-    return  {time: l2_space(time_to_function[time])**2/2.0 for time in time_to_function.keys()}
+#helpers that turn 'time -> space norm' into 'time -> energy'
+def _time_to_norm(space_norm: SpaceNorm, time_to_function: dict[float,Function], cache: ComputationCache | None = None) -> dict[float,float]:
+    times = list(time_to_function.keys())
+    norms = batched_space_norm(space_norm,[time_to_function[time] for time in times],cache)
+    return dict(zip(times,norms.tolist()))
 
-def potential_energy(time_to_function: dict[float,Function]) -> dict[float,float]:
-    """Compute the potential energy of the function"""
-    return {time: h1_space(time_to_function[time])**2 for time in time_to_function.keys()}
+def _kinetic_from_norms(time_to_norm: dict[float,float]) -> dict[float,float]:
+    return {time: norm**2/2.0 for time, norm in time_to_norm.items()}
 
-def accumulated_potential_energy(time_to_function: dict[float,Function]) -> dict[float,float]:
-    """Compute the accumulated time-weighted potential energy of the function"""
-    local_energy = potential_energy(time_to_function)
+def _potential_from_norms(time_to_norm: dict[float,float]) -> dict[float,float]:
+    return {time: norm**2 for time, norm in time_to_norm.items()}
+
+def _accumulated_potential_from_norms(time_to_norm: dict[float,float]) -> dict[float,float]:
+    local_energy = _potential_from_norms(time_to_norm)
     #sum up the local error contributions weighted by the size of the local time steps
-    sorted_time = sorted(list(time_to_function.keys()))
+    sorted_time = sorted(list(time_to_norm.keys()))
     accumulated_energy = {sorted_time[0]: 0}
     for k, time in enumerate(sorted_time[1:]):
         accumulated_energy[time] = accumulated_energy[sorted_time[k]] + local_energy[time]*(sorted_time[k+1] - sorted_time[k])
-    return accumulated_energy
\ No newline at end of file
+    return accumulated_energy
+
+#implementation
+def kinetic_energy(time_to_function: dict[float,Function], cache: ComputationCache | None = None) -> dict[float,float]:
+    """Compute the kinetic energy of a function."""
+    return _kinetic_from_norms(_time_to_norm(l2_space,time_to_function,cache))
+
+def potential_energy(time_to_function: dict[float,Function], cache: ComputationCache | None = None) -> dict[float,float]:
+    """Compute the potential energy of the function"""
+    return _potential_from_norms(_time_to_norm(h1_space,time_to_function,cache))
+
+def accumulated_potential_energy(time_to_function: dict[float,Function], cache: ComputationCache | None = None) -> dict[float,float]:
+    """Compute the accumulated time-weighted potential energy of the function"""
+    return _accumulated_potential_from_norms(_time_to_norm(h1_space,time_to_function,cache))
+
+### energies that only depend on a space norm of the function, they are evaluated from observed norms without storing the trajectory
+ENERGY_TO_NORM: dict[Energy_function,SpaceNorm] = {kinetic_energy: l2_space, potential_energy: h1_space, accumulated_potential_energy: h1_space}
+_ENERGY_TO_CONVERSION = {kinetic_energy: _kinetic_from_norms, potential_energy: _potential_from_norms, accumulated_potential_energy: _accumulated_potential_from_norms}
+
+def energy_from_norms(energy_function: Energy_function, time_to_norm: dict[float,float]) -> dict[float,float]:
+    """Return 'time -> energy' dictionary of the energy given 'time -> space norm' of its norm in 'ENERGY_TO_NORM'."""
+    if energy_function not in _ENERGY_TO_CONVERSION.keys():
+        msg = f"The energy '{getattr(energy_function,'__name__',energy_function)}' can't be evaluated from space norms."
+        msg += f"\nAvailable energies:\t {[energy.__name__ for energy in _ENERGY_TO_CONVERSION.keys()]}"
+        raise ValueError(msg)
+    return _ENERGY_TO_CONVERSION[energy_function](time_to_norm)
@@ -1,9 +1,12 @@
 """Defines Bochner time norms."""
+import numpy as np
 from numpy import sqrt
 from firedrake import Function
-from typing import Callable, TypeAlias
+from typing import Callable, TypeAlias, Iterable
 
-from src.math.norms.space import SpaceNorm
+from src.math.norms.space import SpaceNorm, batched_space_norm, NORM_TO_OPERATOR
+from src.math.operators import operator_space, is_discrete, dof_matrix, dof_arrays_from_matrix, gram_matrix
+from src.utils import ComputationCache
 
 #############################           BOCHNER TIME NORMS
 #abstract concept
@@ -11,46 +14,90 @@ BochnerTimeNorm: TypeAlias = Callable[[dict[float, Function],SpaceNorm],float]
 
 #utility
 def integrate_in_time(time_to_function: dict[float, Function]) -> dict[float, Function]:
+    """Return the antiderivative in time, i.e., 'time -> integral of the function from the initial time to time'. 
+    
+    The function is piecewise constant in time and takes the value at the right end of each time step.
+    Functions are integrated by a cumulative sum of their degrees of freedom into DofArrays, otherwise the sum is built symbolically."""
     sorted_time = sorted(list(time_to_function.keys()))
+    functions = [time_to_function[time] for time in sorted_time]
+    weights = np.concatenate([[0.0],np.diff(sorted_time)])
+
+    if is_discrete(*functions):
+        int_dofs = np.cumsum(weights[:,np.newaxis]*dof_matrix(functions),axis=0)
+        return dict(zip(sorted_time,dof_arrays_from_matrix(operator_space(functions[0]),int_dofs)))
+
     time_to_int_function = dict()
-    time_to_int_function[sorted_time[0]] = time_to_function[sorted_time[0]]
+    time_to_int_function[sorted_time[0]] = 0*functions[0]
     for k in range(1,len(sorted_time)):
-        time_to_int_function[sorted_time[k]] = time_to_function[sorted_time[k]]*(sorted_time[k] - sorted_time[k-1])
+        time_to_int_function[sorted_time[k]] = time_to_int_function[sorted_time[k-1]] + functions[k]*weights[k]
     return time_to_int_function
 
+def cached_integrate_in_time(time_to_function: dict[float, Function], cache: ComputationCache | None = None) -> dict[float, Function]:
+    """Integrate in time. The result is shared via the cache if provided."""
+    if cache is None:
+        return integrate_in_time(time_to_function)
+    return cache.get_or_compute(cache.key("integrate_in_time",time_to_function),lambda: integrate_in_time(time_to_function))
+
 #implementation
-def linf_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm) -> float:
+### all norms accept an optional cache that shares space norms and time integrals with other diagnostics of the same sample
+def linf_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm, cache: ComputationCache | None = None) -> float:
     """Computes the Linf in time and 'X' in space norm of 'time -> function1' dictionary."""
-    return max([norm_X(time_to_function[time]) for time in time_to_function.keys()])
+    return float(np.max(batched_space_norm(norm_X,list(time_to_function.values()),cache)))
 
-def l2_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm) -> float:
+def l2_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm, cache: ComputationCache | None = None) -> float:
     """Computes the L2 in time and 'X' in space norm of 'time -> function1' dictionary."""
-    norm_grid = {time: norm_X(time_to_function[time]) for time in time_to_function.keys()}
-    #sum up the local error contributions weighted by the size of the local time steps
     sorted_time = sorted(list(time_to_function.keys()))
-    norm = 0
-    for k, time in enumerate(sorted_time[1:]):
-        norm += norm_grid[time]**2*(sorted_time[k+1] - sorted_time[k])
-    return sqrt(norm)
+    norm_grid = batched_space_norm(norm_X,[time_to_function[time] for time in sorted_time],cache)
+    #sum up the local error contributions weighted by the size of the local time steps
+    return sqrt(np.sum(norm_grid[1:]**2*np.diff(sorted_time)))
 
-def end_time_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm) -> float:
+def end_time_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm, cache: ComputationCache | None = None) -> float:
     """Computes the 'X' norm in space of 'time -> function1' dictionary at the endtime."""
     end_time = sorted(list(time_to_function.keys()))[-1]
+    if cache is not None:
+        return float(batched_space_norm(norm_X,[time_to_function[end_time]],cache)[0])
     return norm_X(time_to_function[end_time])
 
-def h_minus1_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm) -> float:
+def h_minus1_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm, cache: ComputationCache | None = None) -> float:
     """Computes the H-1 in time and 'X' in space norm of 'time -> function1' dictionary."""
-    time_to_int_function = integrate_in_time(time_to_function)
-    return l2_X_norm(time_to_int_function,norm_X)
+    time_to_int_function = cached_integrate_in_time(time_to_function,cache)
+    return l2_X_norm(time_to_int_function,norm_X,cache)
 
-def nikolskii_half_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm) -> float:
-    """Computes the N{1/2,2} in time and 'X' in space norm of 'time -> function' dictionary."""
-    error = 0
+def w_minus1_inf_X_norm(time_to_function: dict[float, Function], norm_X: SpaceNorm, cache: ComputationCache | None = None) -> float:
+    """Computes the W{-1,inf} in time and 'X' in space norm of 'time -> function1' dictionary."""
+    time_to_int_function = cached_integrate_in_time(time_to_function,cache)
+    return linf_X_norm(time_to_int_function,norm_X,cache)
+
+def _shifted_difference_norms_squared(gram: np.ndarray, shifts: list[int]) -> np.ndarray:
+    """Return sum_l |f_l - f_(l-k)|^2 for each shift k from the Gram matrix of the trajectory.
+
+    The sum expands to two partial sums of the diagonal and the k-th off-diagonal of the Gram matrix."""
+    diagonal_sum = np.concatenate([[0.0],np.cumsum(np.diag(gram))])
+    n = len(gram)
+    return np.array([(diagonal_sum[n] - diagonal_sum[k]) + diagonal_sum[n-k] - 2*np.trace(gram,offset=k) for k in shifts])
+
+def nikolskii_half_X_norm(time_to_function: dict[float, Function], 
+                          norm_X: SpaceNorm, 
+                          cache: ComputationCache | None = None, 
+                          shifts: Iterable[int] | None = None) -> float:
+    """Computes the N{1/2,2} in time and 'X' in space norm of 'time -> function' dictionary. 
+    
+    The maximum is taken over all shifts of the time grid or over the given subset of shifts.
+    Quadratic norms of Functions are evaluated by the Gram matrix of the trajectory."""
     sorted_time = sorted(list(time_to_function.keys()))
-    for k in range(len(sorted_time)):
-        local_error = 0
-        for l in range(k,len(sorted_time)):
-            local_error += norm_X(time_to_function[sorted_time[l]] -time_to_function[sorted_time[l-k]])**2
+    functions = [time_to_function[time] for time in sorted_time]
+    shifts = list(range(len(sorted_time))) if shifts is None else [k for k in shifts if 0 <= k < len(sorted_time)]
+    if len(shifts) == 0:
+        return 0.0
+
+    if norm_X in NORM_TO_OPERATOR.keys() and is_discrete(*functions):
+        gram = gram_matrix(operator_space(functions[0]),NORM_TO_OPERATOR[norm_X],dof_matrix(functions))
+        error = np.max(_shifted_difference_norms_squared(gram,shifts))
+        return sqrt(max(float(error),0.0))
+
+    error = 0
+    for k in shifts:
+        local_error = np.sum(batched_space_norm(norm_X,[functions[l] - functions[l-k] for l in range(k,len(functions))])**2)
         if local_error > error:
             error = local_error
     return sqrt(error)
\ No newline at end of file
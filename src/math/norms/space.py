@@ -1,21 +1,52 @@
 """Defines space norms."""
+import numpy as np
 from numpy import sqrt
 from firedrake import assemble, inner, dx, Function, grad, div
 from typing import Callable, TypeAlias
 
+from src.math.operators import operator_space, is_discrete, dof_vector, dof_matrix, quadratic_form, batched_quadratic_form
+from src.utils import ComputationCache
+
 #############################           SPACE NORMS
 #abstract concept
 SpaceNorm: TypeAlias = Callable[[Function],float]
 
 #implementation
+### Functions are evaluated by cached operators, general UFL expressions are assembled
 def l2_space(function: Function) -> float:
     """Compute the L2 norm of a function."""
+    if is_discrete(function):
+        return sqrt(quadratic_form(operator_space(function),"mass",dof_vector(function)))
     return sqrt(assemble(inner(function,function)*dx))
 
 def h1_space(function: Function) -> float:
     """Compute the H1 norm of a function."""
+    if is_discrete(function):
+        return sqrt(quadratic_form(operator_space(function),"stiffness",dof_vector(function)))
     return sqrt(assemble(inner(grad(function),grad(function))*dx))
 
 def hdiv_space(function: Function) -> float:
     """Compute the L2 norm of the divergence of a vector field."""
-    return sqrt(assemble(inner(div(function),div(function))*dx))
\ No newline at end of file
+    if is_discrete(function):
+        return sqrt(quadratic_form(operator_space(function),"divdiv",dof_vector(function)))
+    return sqrt(assemble(inner(div(function),div(function))*dx))
+
+#############################           BATCHED EVALUATION
+### space norms that are quadratic forms of a cached operator
+NORM_TO_OPERATOR: dict[SpaceNorm,str] = {l2_space: "mass", h1_space: "stiffness", hdiv_space: "divdiv"}
+
+def batched_space_norm(space_norm: SpaceNorm, functions: list[Function], cache: ComputationCache | None = None) -> np.ndarray:
+    """Compute the norm of each function. 
+    
+    Quadratic norms of Functions in one space are evaluated at once, otherwise the norm is evaluated one by one.
+    If a cache is provided, the norm of each function is computed once and shared with all later requests."""
+    if cache is not None:
+        keys = [cache.key("space_norm",space_norm,function) for function in functions]
+        norms = [cache.lookup(key) for key in keys]
+        missing = [index for index, norm in enumerate(norms) if norm is None]
+        for index, norm in zip(missing,batched_space_norm(space_norm,[functions[index] for index in missing]).tolist()):
+            norms[index] = cache.store(keys[index],norm)
+        return np.array(norms,dtype=float)
+    if len(functions) > 0 and space_norm in NORM_TO_OPERATOR.keys() and is_discrete(*functions):
+        return sqrt(batched_quadratic_form(operator_space(functions[0]),NORM_TO_OPERATOR[space_norm],dof_matrix(functions)))
+    return np.array([space_norm(function) for function in functions])
@@ -1,21 +1,27 @@
 """Defines stochastic norms."""
-from numpy import sqrt, absolute
-from firedrake import assemble, inner, dx, Function, grad, div
+import numpy as np
 from typing import Callable, TypeAlias, Iterable
 
 #############################           STOCHASTIC NORMS
 #abstract concept
 StochasticNorm: TypeAlias = Callable[[Iterable[float]],float]
 
+#helper
+def as_sample_array(iter_of_float: Iterable[float] | np.ndarray) -> np.ndarray:
+    """Return samples as array. The first axis enumerates the samples."""
+    if isinstance(iter_of_float,np.ndarray):
+        return iter_of_float
+    return np.fromiter(iter_of_float,dtype=float)
+
 #implementation
-def l2_stochastic(iter_of_float: Iterable[float]) -> float:
+def l2_stochastic(iter_of_float: Iterable[float] | np.ndarray, axis: int = 0) -> float | np.ndarray:
     """Compute the l2 norm."""
-    return sqrt(sum([number**2 for number in iter_of_float])/(len(iter_of_float)))
+    return np.sqrt(np.mean(np.square(as_sample_array(iter_of_float)),axis=axis))
 
-def l1_stochastic(iter_of_float: Iterable[float]) -> float:
+def l1_stochastic(iter_of_float: Iterable[float] | np.ndarray, axis: int = 0) -> float | np.ndarray:
     """Compute the l1 norm."""
-    return sum([absolute(number) for number in iter_of_float])/(len(iter_of_float))
+    return np.mean(np.absolute(as_sample_array(iter_of_float)),axis=axis)
 
-def linf_stochastic(iter_of_float: Iterable[float]) -> float:
+def linf_stochastic(iter_of_float: Iterable[float] | np.ndarray, axis: int = 0) -> float | np.ndarray:
     """Compute the linf norm."""
-    return max([absolute(number) for number in iter_of_float])
+    return np.max(np.absolute(as_sample_array(iter_of_float)),axis=axis)
@@ -0,0 +1,119 @@
+"""Defines cached finite element operators."""
+import threading
+import numpy as np
+from typing import Iterable
+from scipy.sparse import csr_matrix
+from firedrake import assemble, inner, dx, grad, div, Function, FunctionSpace, TrialFunction, TestFunction
+
+#############################           OPERATORS
+### bilinear forms that define the quadratic norms
+def _bilinear_form(name: str, function_space: FunctionSpace):
+    u = TrialFunction(function_space)
+    v = TestFunction(function_space)
+    match name:
+        case "mass":
+            return inner(u,v)*dx
+        case "stiffness":
+            return inner(grad(u),grad(v))*dx
+        case "divdiv":
+            return inner(div(u),div(v))*dx
+        case other:
+            print(f"The operator '{name}' is not available.")
+            raise NotImplementedError
+
+### operators are assembled once per function space and reused afterwards
+_OPERATOR_CACHE: dict[tuple[FunctionSpace,str],csr_matrix] = dict()
+
+def check_main_thread(name: str) -> None:
+    """Raise an error if a cached Firedrake object is built outside of the main thread. Firedrake and PETSc are not thread-safe."""
+    if threading.current_thread() is not threading.main_thread():
+        msg = f"The {name} is built on the thread '{threading.current_thread().name}'."
+        msg += "\nCached Firedrake objects must be built on the main thread, e.g., by postprocessing a first sample there."
+        raise RuntimeError(msg)
+
+class DofArray:
+    """Class that holds a copy of the degrees of freedom of a Function together with its collapsed function space.
+
+    The cached operators apply to it as to a Function, hence norms, distances and point values of copies are evaluated without Firedrake.
+    The function space is only used as key of the caches."""
+    def __init__(self, function_space: FunctionSpace, values: np.ndarray) -> None:
+        self._function_space = function_space
+        self.values = values
+
+    @classmethod
+    def from_function(cls, function: "Function | DofArray") -> "DofArray":
+        """Copy the degrees of freedom of a Function."""
+        return cls(operator_space(function),dof_values(function).copy())
+
+    def function_space(self) -> FunctionSpace:
+        return self._function_space
+
+def operator_space(function: Function | DofArray) -> FunctionSpace:
+    """Return the function space of a function. Subspaces of mixed spaces are collapsed, e.g., for the velocity of a mixed solution."""
+    function_space = function.function_space()
+    if getattr(function_space,"index",None) is not None:
+        return function_space.collapse()
+    return function_space
+
+def value_shape(function_space: FunctionSpace) -> tuple[int,...]:
+    """Return the value shape of the functions in the space. Older Firedrake versions only provide it through the legacy UFL element."""
+    shape = getattr(function_space,"value_shape",None)
+    if shape is None:
+        return tuple(function_space.ufl_element().value_shape())
+    return tuple(shape)
+
+def get_operator(function_space: FunctionSpace, name: str) -> csr_matrix:
+    """Return the assembled operator 'mass', 'stiffness' or 'divdiv' as sparse matrix acting on the degrees of freedom."""
+    key = (function_space, name)
+    if key not in _OPERATOR_CACHE.keys():
+        check_main_thread(f"operator '{name}'")
+        petsc_matrix = assemble(_bilinear_form(name,function_space),mat_type="aij").petscmat
+        indptr, indices, data = petsc_matrix.getValuesCSR()
+        _OPERATOR_CACHE[key] = csr_matrix((data,indices,indptr),shape=petsc_matrix.getSize())
+    return _OPERATOR_CACHE[key]
+
+### utilities
+def dof_values(function: Function | DofArray) -> np.ndarray:
+    """Return the degrees of freedom of a function in the shape of its data, e.g., (nodes, components) for vector fields."""
+    if isinstance(function,DofArray):
+        return function.values
+    return function.dat.data_ro
+
+def dof_vector(function: Function | DofArray) -> np.ndarray:
+    """Return the degrees of freedom of a function as flat vector."""
+    return dof_values(function).reshape(-1)
+
+def dof_matrix(functions: list[Function | DofArray]) -> np.ndarray:
+    """Return the degrees of freedom of a list of functions as array of shape (functions, degrees of freedom)."""
+    return np.stack([dof_vector(function) for function in functions])
+
+def trajectory_to_array(time_to_function: dict[float,Function | DofArray], times: Iterable[float] | None = None) -> np.ndarray:
+    """Stack the degrees of freedom of 'time -> function' into one array whose first axis is time. 
+    
+    The times are sorted unless they are given explicitly."""
+    if times is None:
+        times = sorted(time_to_function.keys())
+    return np.stack([dof_values(time_to_function[time]) for time in times])
+
+def dof_arrays_from_matrix(function_space: FunctionSpace, matrix: np.ndarray) -> list[DofArray]:
+    """Return a DofArray of the space for each row of the matrix of degrees of freedom."""
+    return [DofArray(function_space,row) for row in matrix]
+
+def is_discrete(*functions) -> bool:
+    """Check whether all arguments are Functions or DofArrays of the same function space, i.e., the cached operators apply."""
+    if not all(isinstance(function,(Function,DofArray)) for function in functions):
+        return False
+    return all(operator_space(function) == operator_space(functions[0]) for function in functions)
+
+def quadratic_form(function_space: FunctionSpace, name: str, vector: np.ndarray) -> float:
+    """Evaluate vector^T A vector for the operator A. Round-off below zero is truncated."""
+    return max(float(vector @ (get_operator(function_space,name) @ vector)),0.0)
+
+def batched_quadratic_form(function_space: FunctionSpace, name: str, matrix: np.ndarray) -> np.ndarray:
+    """Evaluate the quadratic form for each row of the matrix by one sparse-dense product and a row-wise dot product."""
+    product = (get_operator(function_space,name) @ matrix.T).T
+    return np.maximum(np.einsum("ij,ij->i",matrix,product),0.0)
+
+def gram_matrix(function_space: FunctionSpace, name: str, matrix: np.ndarray) -> np.ndarray:
+    """Return the matrix of inner products of the rows of the matrix with respect to the operator."""
+    return matrix @ (get_operator(function_space,name) @ matrix.T)
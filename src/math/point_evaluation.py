@@ -0,0 +1,92 @@
+"""Defines the evaluation of functions at points."""
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.spatial import cKDTree
+from firedrake import FunctionSpace, VectorFunctionSpace, TensorFunctionSpace, VertexOnlyMesh, TestFunction, Interpolator, Function
+from src.math.operators import value_shape, check_main_thread
+
+#############################           POINT EVALUATION
+class PointEvaluation:
+    """Class that tabulates the basis functions of a function space at a set of points.
+
+    The cells containing the points are located once, values of a batch of functions at all points are then obtained by one sparse-dense product.
+    The vertices of the vertex-only mesh don't follow the order of the input points, hence the rows of the tabulation are permuted into the input order.
+    Points outside of the domain raise an error, the evaluation is checked against 'Function.at' once."""
+    def __init__(self, function_space: FunctionSpace, points: np.ndarray) -> None:
+        self.points = np.atleast_2d(np.asarray(points,dtype=float))
+        self.value_shape = value_shape(function_space)
+        point_mesh = VertexOnlyMesh(function_space.mesh(),self.points,missing_points_behaviour="error")
+
+        match len(self.value_shape):
+            case 0:
+                point_space = FunctionSpace(point_mesh,"DG",0)
+            case 1:
+                point_space = VectorFunctionSpace(point_mesh,"DG",0,dim=self.value_shape[0])
+            case 2:
+                point_space = TensorFunctionSpace(point_mesh,"DG",0,shape=self.value_shape)
+            case other:
+                print(f"Point evaluation of functions with value shape {self.value_shape} is not available.")
+                raise NotImplementedError
+
+        #interpolation of the basis functions into the point space
+        petsc_matrix = Interpolator(TestFunction(function_space),point_space).callable().handle
+        indptr, indices, data = petsc_matrix.getValuesCSR()
+        matrix = csr_matrix((data,indices,indptr),shape=petsc_matrix.getSize())
+
+        #rows of each vertex in the order of the input points, the coordinates of the vertex-only mesh share the ordering of its DG0 spaces
+        vertex_Ids = self._input_to_vertex(point_mesh.coordinates.dat.data_ro.reshape(-1,self.points.shape[1]))
+        components = int(np.prod(self.value_shape,dtype=int))
+        self.matrix = matrix[(vertex_Ids[:,np.newaxis]*components + np.arange(components)).reshape(-1)]
+        self._check(function_space)
+
+    def _input_to_vertex(self, vertices: np.ndarray) -> np.ndarray:
+        """Return the index of the vertex of the vertex-only mesh at each input point."""
+        scale = max(float(np.max(np.abs(self.points))),1.0)
+        if len(vertices) == 0:
+            distances, vertex_Ids = np.full(len(self.points),np.inf), np.zeros(len(self.points),dtype=int)
+        else:
+            distances, vertex_Ids = cKDTree(vertices).query(self.points)
+        missing = np.flatnonzero(distances > 1e-10*scale)
+        if len(missing) > 0:
+            msg = "Points are not located in the local part of the mesh."
+            msg += f"\nMissing points:\t {self.points[missing].tolist()}"
+            msg += f"\nLocated points:\t {len(vertices)} of {len(self.points)}"
+            raise ValueError(msg)
+        return vertex_Ids
+
+    def _check(self, function_space: FunctionSpace) -> None:
+        """Compare the evaluation of a function with random degrees of freedom to 'Function.at'."""
+        function = Function(function_space)
+        function.dat.data[:] = np.random.default_rng(0).standard_normal(function.dat.data_ro.shape)
+        values = self.evaluate(function.dat.data_ro.reshape(1,-1))[0]
+        expected = np.reshape(function.at(self.points.tolist()),values.shape)
+        if not np.allclose(values,expected,rtol=1e-8,atol=1e-10):
+            msg = "Point evaluation doesn't match 'Function.at'."
+            msg += f"\nMaximal deviation:\t {np.max(np.abs(values - expected))}"
+            raise ValueError(msg)
+
+    def evaluate(self, dof_matrix: np.ndarray) -> np.ndarray:
+        """Return the values of the functions given as rows of 'dof_matrix' as array of shape (functions, points) + value shape."""
+        values = (self.matrix @ dof_matrix.T).T
+        return values.reshape((dof_matrix.shape[0],len(self.points)) + self.value_shape)
+
+def line_of_points(start: list[float], end: list[float], number: int) -> np.ndarray:
+    """Return 'number' equidistant points on the line from start to end as array of shape (points, dimension)."""
+    return np.linspace(np.asarray(start,dtype=float),np.asarray(end,dtype=float),number)
+
+def grid_of_points(lower_corner: list[float], upper_corner: list[float], number: list[int]) -> np.ndarray:
+    """Return a tensor grid of points in the box spanned by the corners with 'number[i]' points in direction i."""
+    axes = [np.linspace(lower,upper,n) for lower, upper, n in zip(lower_corner,upper_corner,number)]
+    return np.stack([coordinate.reshape(-1) for coordinate in np.meshgrid(*axes,indexing="ij")],axis=1)
+
+### evaluations are computed once per function space and set of points
+_EVALUATION_CACHE: dict[tuple[FunctionSpace,tuple],PointEvaluation] = dict()
+
+def get_point_evaluation(function_space: FunctionSpace, points: np.ndarray | list[float] | list[list[float]]) -> PointEvaluation:
+    """Return the cached point evaluation. A single point may be given as flat list of coordinates."""
+    points = np.atleast_2d(np.asarray(points,dtype=float))
+    key = (function_space, tuple(map(tuple,points.tolist())))
+    if key not in _EVALUATION_CACHE.keys():
+        check_main_thread("point evaluation")
+        _EVALUATION_CACHE[key] = PointEvaluation(function_space,points)
+    return _EVALUATION_CACHE[key]
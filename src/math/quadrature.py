@@ -0,0 +1,55 @@
+"""Defines the evaluation of gradients at quadrature points."""
+import numpy as np
+from scipy.sparse import csr_matrix
+from firedrake import FunctionSpace, FiniteElement, TensorElement, TestFunction, Interpolator, assemble, grad, dx
+from src.math.operators import value_shape, check_main_thread
+
+#############################           QUADRATURE TABULATION
+class GradientTabulation:
+    """Class that tabulates the gradients of the basis functions of a function space at the quadrature points of its mesh.
+
+    Gradients of a batch of functions at all quadrature points are then obtained by one sparse-dense product."""
+    def __init__(self, function_space: FunctionSpace, degree: int) -> None:
+        mesh = function_space.mesh()
+        self.degree = degree
+        self.value_shape = value_shape(function_space) + (mesh.geometric_dimension(),)
+
+        scalar_element = FiniteElement("Quadrature",mesh.ufl_cell(),degree,quad_scheme="default")
+        tensor_space = FunctionSpace(mesh,TensorElement(scalar_element,shape=self.value_shape))
+        scalar_space = FunctionSpace(mesh,scalar_element)
+
+        #interpolation of the basis gradients into the quadrature space
+        petsc_matrix = Interpolator(grad(TestFunction(function_space)),tensor_space).callable().handle
+        indptr, indices, data = petsc_matrix.getValuesCSR()
+        self.matrix = csr_matrix((data,indices,indptr),shape=petsc_matrix.getSize())
+
+        #quadrature weights including the cell volumes
+        self.weights = assemble(TestFunction(scalar_space)*dx(degree=degree)).dat.data_ro.copy()
+
+    def gradients(self, dof_matrix: np.ndarray) -> np.ndarray:
+        """Return the gradients of the functions given as rows of 'dof_matrix' as array of shape (functions, quadrature points) + gradient shape."""
+        values = (self.matrix @ dof_matrix.T).T
+        return values.reshape((dof_matrix.shape[0],len(self.weights)) + self.value_shape)
+
+    def integrate(self, values: np.ndarray) -> np.ndarray:
+        """Integrate values of shape (functions, quadrature points) over the domain."""
+        return values @ self.weights
+
+### tabulations are computed once per function space and quadrature degree
+_TABULATION_CACHE: dict[tuple[FunctionSpace,int],GradientTabulation] = dict()
+
+def estimated_V_degree(function_space: FunctionSpace) -> int:
+    """Return the quadrature degree UFL estimates for the squared V distance of functions of polynomial degree k on affine meshes.
+
+    The gradient has degree k-1, UFL adds 2 for the non-integer power, i.e., V has degree 3(k-1) + 2 and its square 6(k-1) + 4."""
+    return 6*(function_space.ufl_element().degree() - 1) + 4
+
+def get_gradient_tabulation(function_space: FunctionSpace, degree: int | None = None) -> GradientTabulation:
+    """Return the cached gradient tabulation. The quadrature degree defaults to the UFL estimate of the assembled V distance."""
+    if degree is None:
+        degree = estimated_V_degree(function_space)
+    key = (function_space, degree)
+    if key not in _TABULATION_CACHE.keys():
+        check_main_thread("gradient tabulation")
+        _TABULATION_CACHE[key] = GradientTabulation(function_space,degree)
+    return _TABULATION_CACHE[key]
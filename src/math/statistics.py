@@ -1,19 +1,20 @@
 """Define statistics."""
+import numpy as np
 from typing import Iterable, TypeAlias, Callable
 
-from src.math.norms.stochastic import l2_stochastic
+from src.math.norms.stochastic import l2_stochastic, as_sample_array
 
-#############################           STATISTICS 
+#############################           STATISTICS
 #abstract concept
 Statistic: TypeAlias = Callable[[Iterable[float]],float]
 
 #implementation
-def mean_value(iter_of_float: Iterable[float]) -> float:
+def mean_value(iter_of_float: Iterable[float] | np.ndarray, axis: int = 0) -> float | np.ndarray:
     """Compute the mean value."""
-    return sum(iter_of_float)/len(iter_of_float)
+    return np.mean(as_sample_array(iter_of_float),axis=axis)
 
-def standard_deviation(iter_of_float: Iterable[float]) -> float:
+def standard_deviation(iter_of_float: Iterable[float] | np.ndarray, axis: int = 0) -> float | np.ndarray:
     """Compute the standard deviation."""
-    mean = mean_value(iter_of_float)
-    recentered_list = [number - mean for number in iter_of_float]
-    return l2_stochastic(recentered_list)
\ No newline at end of file
+    samples = as_sample_array(iter_of_float)
+    mean = mean_value(samples,axis=axis)
+    return l2_stochastic(samples - np.expand_dims(mean,axis),axis=axis)
@@ -1,35 +1,51 @@
 """Tools for generation and modification of Gaussian increments"""
 import numpy as np
 import logging
+from scipy.stats import qmc, norm
+from functools import partial
 
 from typing import TypeAlias, Callable
 from src.string_formatting import format_header
 
 ### abstract sampling strategy
 SamplingStrategy: TypeAlias = Callable[[list[int],float,float],dict[int, np.ndarray]]
+### source of randomness, the module 'np.random' (global stream) provides the same interface as an instance
+RandomState: TypeAlias = np.random.RandomState
 
 ### select implementation of sampling strategy by name
-def select_sampling(noise_increments: str) -> SamplingStrategy:
-    """Return requested sampling strategy."""
+def select_sampling(noise_increments: str, random_state: RandomState = np.random) -> SamplingStrategy:
+    """Return requested sampling strategy. It draws from 'random_state', a separately seeded RandomState yields samples that are independent of other strategies."""
     msg = format_header("SAMPLING STRATEGY")
     msg += f"\n\t{noise_increments}"
     logging.info(msg)
     match noise_increments:
         case "classical":
-            return get_WienerIncrements_on_ref_level
+            return partial(get_WienerIncrements_on_ref_level,random_state=random_state)
         case "average":
-            return get_averagedWienerIncrements_on_ref_level
+            return partial(get_averagedWienerIncrements_on_ref_level,random_state=random_state)
+        case "brownian bridge":
+            return partial(get_BrownianBridgeIncrements_on_ref_level,random_state=random_state)
+        case "antithetic":
+            return AntitheticSampling(partial(get_WienerIncrements_on_ref_level,random_state=random_state))
+        case "antithetic average":
+            return AntitheticSampling(partial(get_averagedWienerIncrements_on_ref_level,random_state=random_state))
+        case "sobol":
+            return SobolSampling(random_state=random_state)
         case other:
             print(f"The sampling strategy '{noise_increments}' is not available.")
             raise NotImplementedError
 
+def get_group_size(sampling_strategy: SamplingStrategy) -> int:
+    """Return the number of consecutive samples that are correlated by the sampling strategy."""
+    return getattr(sampling_strategy, "group_size", 1)
+
 ####################################################### Utilities #######################################
 ####################################################### GENERATE #######################################
 #function that generates Wiener increments on a uniform time grid with size tau
-def get_WienerIncrements(N: int, tau: float) -> np.ndarray:
+def get_WienerIncrements(N: int, tau: float, random_state: RandomState = np.random) -> np.ndarray:
     '''Input: time stepsize tau, Number of intervals N 
        Output: Vector of Wiener increments'''
-    return np.concatenate( np.sqrt(tau)*np.random.randn(N,1), axis = 0)
+    return np.concatenate( np.sqrt(tau)*random_state.randn(N,1), axis = 0)
 
 #function that generates averaged increments on a uniform time grid with size tau
 def get_WienerIncrementsAveraged(N: int, tau: float) -> np.ndarray:
@@ -54,11 +70,11 @@ def get_WienerIncrementsAveraged(N: int, tau: float) -> np.ndarray:
     return Y
     
 #joint sampling of averaged increments and classical ones
-def get_JointWienerIncrements(N: int, tau: float) -> tuple[np.ndarray, np.ndarray]:
+def get_JointWienerIncrements(N: int, tau: float, random_state: RandomState = np.random) -> tuple[np.ndarray, np.ndarray]:
     '''Input: time stepsize tau, Number of intervals N 
        Output: Vector of Wiener increments, Vector of averaged Wiener increments'''
-    dW = np.sqrt(tau)*np.random.randn(N,1)
-    z = np.sqrt(tau)*np.random.randn(N,1)
+    dW = np.sqrt(tau)*random_state.randn(N,1)
+    z = np.sqrt(tau)*random_state.randn(N,1)
     s12 = np.sqrt(12)
     adW = (dW + np.roll(dW,1))/2 + (z - np.roll(z,1))/s12
     adW[0] = dW[0]/2 + z[0]/s12
@@ -106,10 +122,10 @@ def coarsen_JointWienerIncrements(dWfine: np.ndarray, adWfine: np.ndarray, Ncoar
     
 
 ################################################### SAMPLING STRATEGIES #######################################
-def get_WienerIncrements_on_ref_level(refinement_levels: list[int], initial_time: float, end_time: float) -> dict[int, np.ndarray]:
+def get_WienerIncrements_on_ref_level(refinement_levels: list[int], initial_time: float, end_time: float, random_state: RandomState = np.random) -> dict[int, np.ndarray]:
     time_steps_fine = 2**refinement_levels[-1]
     tau_fine = (end_time - initial_time)/time_steps_fine
-    noise_fine = get_WienerIncrements(time_steps_fine,tau_fine)
+    noise_fine = get_WienerIncrements(time_steps_fine,tau_fine,random_state)
 
     noise_on_ref_level = {}
     for level in refinement_levels:
@@ -117,10 +133,10 @@ def get_WienerIncrements_on_ref_level(refinement_levels: list[int], initial_time
 
     return noise_on_ref_level
 
-def get_averagedWienerIncrements_on_ref_level(refinement_levels: list[int], initial_time: float, end_time: float) -> dict[int, np.ndarray]:
+def get_averagedWienerIncrements_on_ref_level(refinement_levels: list[int], initial_time: float, end_time: float, random_state: RandomState = np.random) -> dict[int, np.ndarray]:
     time_steps_fine = 2**refinement_levels[-1]
     tau_fine = (end_time - initial_time)/time_steps_fine
-    _, aver_noise_fine = get_JointWienerIncrements(time_steps_fine, tau_fine) 
+    _, aver_noise_fine = get_JointWienerIncrements(time_steps_fine, tau_fine, random_state) 
 
     aver_noise_on_ref_level = {}
     for level in refinement_levels:
@@ -128,8 +144,108 @@ def get_averagedWienerIncrements_on_ref_level(refinement_levels: list[int], init
 
     return aver_noise_on_ref_level
 
+def get_BrownianBridgeIncrements_on_ref_level(refinement_levels: list[int], initial_time: float, end_time: float, random_state: RandomState = np.random) -> dict[int, "BrownianBridgeIncrements"]:
+    bridge = BrownianBridge(refinement_levels[0], initial_time, end_time, random_state=random_state)
+    return {level: bridge.increments(level) for level in refinement_levels}
+
+
+####################################################### Brownian bridge ###################################
+#number of coarse intervals that are refined at once when streamed increments are requested
+BRIDGE_CHUNK_SIZE: int = 8
+
+def refine_WienerIncrements(dWcoarse: np.ndarray, zeta: np.ndarray, tau: float) -> np.ndarray:
+    '''Input: Array of Wiener increments on intervals of size tau (last axis), N(0,1) samples of the same shape, stepsize tau
+       Output: Array of Wiener increments on intervals of size tau/2 sampled from the Brownian bridge'''
+    dWleft = dWcoarse/2 + np.sqrt(tau)/2*zeta
+    dWright = dWcoarse - dWleft
+    return np.stack((dWleft, dWright), axis=-1).reshape(*dWcoarse.shape[:-1], -1)
+
+class BrownianBridge:
+    """Wiener path that is sampled on a coarse level and lazily refined by Brownian bridges.
+
+    Every coarse interval owns an independent random stream that is consumed level by level.
+    Hence, the increments are consistent across all levels, no matter which level or chunk is requested first,
+    and finer levels can be added later without redrawing the coarse noise."""
+    def __init__(self, coarse_level: int, initial_time: float, end_time: float, chunk_size: int = BRIDGE_CHUNK_SIZE, random_state: RandomState = np.random):
+        self.coarse_level = coarse_level
+        self.initial_time = initial_time
+        self.end_time = end_time
+        self.chunk_size = chunk_size
+        self.coarse_steps = 2**coarse_level
+        self.coarse_stepsize = (end_time - initial_time)/self.coarse_steps
+        self.coarse_increments = get_WienerIncrements(self.coarse_steps,self.coarse_stepsize,random_state)
+        self.entropy = random_state.randint(0, 2**32, size=4, dtype=np.uint64)
+        self.chunks = -(-self.coarse_steps//chunk_size)
+
+    def _normals(self, interval: int, number: int) -> np.ndarray:
+        """Return the first 'number' N(0,1) samples of the random stream owned by the coarse interval."""
+        generator = np.random.default_rng(np.random.SeedSequence(self.entropy, spawn_key=(interval,)))
+        return generator.standard_normal(number)
+
+    def refine_chunk(self, level: int, chunk: int) -> np.ndarray:
+        """Return the increments on the refinement level that belong to the coarse intervals of the chunk."""
+        depth = level - self.coarse_level
+        if depth < 0:
+            msg_error = "Brownian bridges can't coarsen the noise.\n"
+            msg_error += f"Requested level: \t {level}\n"
+            msg_error += f"Coarse level: \t {self.coarse_level}"
+            raise ValueError(msg_error)
+        start = chunk*self.chunk_size
+        stop = min(start + self.chunk_size, self.coarse_steps)
+        dW = self.coarse_increments[start:stop].reshape(-1,1)
+        if depth == 0:
+            return dW.reshape(-1)
+        zeta = np.stack([self._normals(interval, 2**depth - 1) for interval in range(start,stop)])
+        tau = self.coarse_stepsize
+        for k in range(depth):
+            dW = refine_WienerIncrements(dW, zeta[:,2**k - 1:2**(k+1) - 1], tau)
+            tau = tau/2
+        return dW.reshape(-1)
+
+    def increments(self, level: int) -> "BrownianBridgeIncrements":
+        """Return the streamed increments on the refinement level."""
+        return BrownianBridgeIncrements(self, level)
+
+class BrownianBridgeIncrements:
+    """Read-only sequence of Wiener increments on one refinement level.
+
+    Increments are generated chunk by chunk from the Brownian bridge and only the current chunk is kept in memory."""
+    def __init__(self, bridge: BrownianBridge, level: int):
+        if level < bridge.coarse_level:
+            msg_error = "Refinement level is coarser than the level of the Brownian bridge.\n"
+            msg_error += f"Requested level: \t {level}\n"
+            msg_error += f"Coarse level: \t {bridge.coarse_level}"
+            raise ValueError(msg_error)
+        self.bridge = bridge
+        self.level = level
+        self.chunk_length = bridge.chunk_size*2**(level - bridge.coarse_level)
+        self._chunk_Id = None
+        self._chunk = None
+
+    def __len__(self) -> int:
+        return 2**self.level
+
+    def __getitem__(self, index: int) -> float:
+        if isinstance(index, slice):
+            return np.array([self[k] for k in range(*index.indices(len(self)))])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Increment {index} is not available on refinement level {self.level}.")
+        chunk_Id, position = divmod(index, self.chunk_length)
+        if not chunk_Id == self._chunk_Id:
+            self._chunk = self.bridge.refine_chunk(self.level, chunk_Id)
+            self._chunk_Id = chunk_Id
+        return self._chunk[position]
+
+    def __iter__(self):
+        for chunk_Id in range(self.bridge.chunks):
+            yield from self.bridge.refine_chunk(self.level, chunk_Id)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.concatenate([self.bridge.refine_chunk(self.level, chunk_Id) for chunk_Id in range(self.bridge.chunks)]).astype(dtype or float)
+
 
-    
 ####################################################### Time - space Noise ###################################
 def get_JointTimeSpace(N: int, tau: float, Ndof: int) -> tuple[np.ndarray, np.ndarray]:
     '''Input: time stepsize tau, Number of intervals N, Ndof of the mesh
@@ -148,3 +264,65 @@ def coarsen_JointTimeSpace(dWfine: np.ndarray, adWfine: np.ndarray, Ncoarse: int
     for i in range(0,Ndof):
         dWcoarse[:,i], adWcoarse[:,i] = coarsen_JointWienerIncrements(dWfine[:,i],adWfine[:,i],Ncoarse)      
     return dWcoarse, adWcoarse
+
+
+####################################################### Variance reduction ###################################
+#number of samples that share one scrambling of the Sobol sequence (should be a power of 2)
+QMC_GROUP_SIZE: int = 16
+
+def get_WienerIncrements_from_BrownianBridge(zeta: np.ndarray, initial_time: float, end_time: float) -> np.ndarray:
+    '''Input: N(0,1) samples zeta of length N = 2**level, initial time, end time
+       Output: Vector of N Wiener increments, where zeta[0] determines the end point, zeta[1] the midpoint and so on'''
+    depth = int(np.log2(np.size(zeta)))
+    tau = end_time - initial_time
+    dW = np.sqrt(tau)*zeta[:1].reshape(1,1)
+    for k in range(depth):
+        dW = refine_WienerIncrements(dW, zeta[2**k:2**(k+1)].reshape(1,-1), tau)
+        tau = tau/2
+    return dW.reshape(-1)
+
+class AntitheticSampling:
+    """Sampling strategy that alternates between the increments of the underlying strategy and their negatives.
+
+    Consecutive samples (dW, -dW) form antithetic pairs."""
+    group_size: int = 2
+
+    def __init__(self, sampling_strategy: SamplingStrategy):
+        self.sampling_strategy = sampling_strategy
+        self.ref_to_noise_increments = None
+
+    def __call__(self, refinement_levels: list[int], initial_time: float, end_time: float) -> dict[int, np.ndarray]:
+        if self.ref_to_noise_increments is None:
+            self.ref_to_noise_increments = self.sampling_strategy(refinement_levels, initial_time, end_time)
+            return self.ref_to_noise_increments
+        ref_to_antithetic_increments = {level: -np.asarray(self.ref_to_noise_increments[level]) for level in refinement_levels}
+        self.ref_to_noise_increments = None
+        return ref_to_antithetic_increments
+
+class SobolSampling:
+    """Randomised quasi-Monte Carlo sampling strategy.
+
+    Points of a scrambled Sobol sequence are mapped to Gaussian increments by the Brownian bridge construction,
+    hence the leading and best equidistributed coordinates determine the coarsest time scales.
+    The sequence is scrambled anew after 'group_size' samples, such that groups are independent replicates."""
+    def __init__(self, group_size: int = QMC_GROUP_SIZE, random_state: RandomState = np.random):
+        self.group_size = group_size
+        self.random_state = random_state
+        self.samples = 0
+        self.points = None
+
+    def __call__(self, refinement_levels: list[int], initial_time: float, end_time: float) -> dict[int, np.ndarray]:
+        if self.samples % self.group_size == 0:
+            sobol = qmc.Sobol(d=2**refinement_levels[-1], scramble=True, seed=self.random_state.randint(0, 2**32))
+            self.points = sobol.random(self.group_size)
+        uniform = self.points[self.samples % self.group_size]
+        self.samples += 1
+
+        #scrambled points lie in the open unit cube almost surely, clipping only guards the inverse CDF
+        zeta = norm.ppf(np.clip(uniform, 1e-12, 1 - 1e-12))
+        noise_fine = get_WienerIncrements_from_BrownianBridge(zeta, initial_time, end_time)
+
+        noise_on_ref_level = {}
+        for level in refinement_levels:
+            noise_on_ref_level.update({level: coarsen_WienerIncrements(noise_fine,2**level)})
+        return noise_on_ref_level
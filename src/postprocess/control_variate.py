@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class ControlVariateEstimator:
+    """Class that estimates a mean value with a correlated control whose mean is known or cheap to estimate.
+
+    The estimate is given by mean(X) - beta*(mean(Y) - E[Y]), where the coefficient beta = Cov(X,Y)/Var(Y) is estimated online from the paired samples.
+    The control mean E[Y] is either known or estimated from all paired and additional control samples."""
+    def __init__(self, control_mean: np.ndarray | float | None = None):
+        self.known_control_mean = control_mean
+        self.samples = 0
+        self.control_samples = 0
+        self._mean = 0
+        self._paired_control_mean = 0
+        self._control_sum = 0
+        self._co_moment = 0
+        self._control_square = 0
+
+    def update(self, value: np.ndarray | float, control: np.ndarray | float) -> None:
+        """Add a pair of sample and control."""
+        self.samples += 1
+        delta_value = value - self._mean
+        delta_control = control - self._paired_control_mean
+        self._mean = self._mean + delta_value/self.samples
+        self._paired_control_mean = self._paired_control_mean + delta_control/self.samples
+        self._co_moment = self._co_moment + delta_control*(value - self._mean)
+        self._control_square = self._control_square + delta_control*(control - self._paired_control_mean)
+        self.update_control(control)
+
+    def update_control(self, control: np.ndarray | float) -> None:
+        """Add a sample of the control only. It improves the estimate of the control mean."""
+        self._control_sum = self._control_sum + control
+        self.control_samples += 1
+
+    @property
+    def control_mean(self) -> np.ndarray | float:
+        """Return the known or estimated mean of the control."""
+        if self.known_control_mean is not None:
+            return self.known_control_mean
+        return self._control_sum/self.control_samples
+
+    @property
+    def coefficient(self) -> np.ndarray | float:
+        """Return the estimated optimal coefficient. It is set to 0 where the control has no variance."""
+        control_square = np.asarray(self._control_square)
+        safe_square = np.where(control_square > 0, control_square, 1)
+        return np.where(control_square > 0, self._co_moment/safe_square, 0)
+
+    @property
+    def mean(self) -> np.ndarray | float:
+        """Return the variance-reduced estimate of the mean."""
+        return self._mean - self.coefficient*(self._paired_control_mean - self.control_mean)
+
+
+def check_control_mean_estimate(extra_samples: int, control_mean: np.ndarray | float | None = None) -> None:
+    """Raise if the control mean is neither known nor estimated from additional control samples.
+
+    The mean of the paired controls cancels in the estimate, which then coincides with the plain sample mean although the control is solved for every sample."""
+    if control_mean is None and extra_samples <= 0:
+        msg = "The control variate requires a known control mean or additional samples of the control."
+        msg += f"\nAdditional control samples:\t {extra_samples}"
+        raise ValueError(msg)
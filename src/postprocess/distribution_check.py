@@ -3,79 +3,104 @@ from firedrake import Function
 
 from src.string_formatting import format_header
 
-def compare_measures(measure1: dict[tuple[tuple],int], measure2: dict[tuple[tuple],int]) -> tuple[float,float,float]:
-    """Compare two empirical distributions. 
+CHUNK_SIZE = 256
+
+def hypercube_counts(sample_matrix: np.ndarray, measure_resolution: float) -> tuple[np.ndarray,np.ndarray]:
+    """Project the rows of the sample matrix to the vertices of hypercubes with side-length 'measure_resolution' and count them.
+
+    Return the integer coordinates of the vertices in lexicographic order and their counts."""
+    vertices = np.floor(sample_matrix/measure_resolution).astype(np.int64)
+    return np.unique(vertices,axis=0,return_counts=True)
+
+def _merge_counts(keys1: np.ndarray, counts1: np.ndarray, keys2: np.ndarray, counts2: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+    """Merge two sorted sets of vertices with counts. Counts of common vertices are added."""
+    keys, inverse = np.unique(np.concatenate([keys1,keys2]),axis=0,return_inverse=True)
+    counts = np.bincount(inverse.reshape(-1),weights=np.concatenate([counts1,counts2]),minlength=len(keys))
+    return keys, counts.astype(np.int64)
+
+def compare_measures(measure1: "MeasureOnDOFs", measure2: "MeasureOnDOFs") -> tuple[float,float,float]:
+    """Compare two empirical distributions by their total variation distance. 
     
     Returns: - distance of the empirical distributions
      - number of hypercubes that define the empirical distribution of measure1
      - number of hypercubes that define the empirical distribution of measure2 
     """
-    keys1 = set(measure1.keys())
-    keys2 = set(measure2.keys())
-    union_keys = keys1.union(keys2)
-    keys2_notin_keys1 = union_keys.difference(keys1)
-    keys1_notin_keys2 = union_keys.difference(keys2)
+    keys1, counts1 = measure1.keys, measure1.counts
+    keys2, counts2 = measure2.keys, measure2.counts
+    if not keys1.shape[1:] == keys2.shape[1:]:
+        msg = "Dimensions of the empirical distributions do not match."
+        msg += f"\nDimension measure1:\t {keys1.shape[1:]}"
+        msg += f"\nDimension measure2:\t {keys2.shape[1:]}"
+        raise ValueError(msg)
 
-    ##exctend measures to common keys 
-    for key in keys2_notin_keys1:
-        measure1[key] = 0
-    for key in keys1_notin_keys2:
-        measure2[key] = 0
-
-    compare_dinstance = 0
-    for key in union_keys:
-        compare_dinstance += abs(measure1[key] - measure2[key])
-    return compare_dinstance/(2*sum(measure1.values())), len(keys1), len(keys2)
+    #signed frequencies on the common vertices, vertices of only one measure contribute their full frequency
+    keys, inverse = np.unique(np.concatenate([keys1,keys2]),axis=0,return_inverse=True)
+    frequencies = np.concatenate([counts1/np.sum(counts1),-counts2/np.sum(counts2)])
+    difference = np.bincount(inverse.reshape(-1),weights=frequencies,minlength=len(keys))
+    return float(np.sum(np.abs(difference))/2), len(keys1), len(keys2)
 
 
 class MeasureOnDOFs:
-    """Class that contains utilities to compute an empirical distribution."""
-    def __init__(self, measure_resolution: float):
+    """Class that contains utilities to compute an empirical distribution. 
+    
+    Arrays are buffered and merged into the counts in chunks, such that arbitrary many samples can be streamed."""
+    def __init__(self, measure_resolution: float, chunk_size: int = CHUNK_SIZE):
         self.measure_resolution: float = measure_resolution
+        self.chunk_size = chunk_size
         self.list_of_arrays = []
+        self.keys = None
+        self.counts = np.zeros(0,dtype=np.int64)
 
     def append_list_of_arrays(self, array):
-        """Add an array to self.list_of_arrays."""
-        self.list_of_arrays.append(array)
+        """Add an array to self.list_of_arrays. Full chunks are merged into the counts."""
+        self.list_of_arrays.append(np.array(array,dtype=float).reshape(-1))
+        if len(self.list_of_arrays) >= self.chunk_size:
+            self.construct_measure()
 
     def construct_measure(self):
         """We split the high-dim euclidean space R^d into hypercubes with side-length 'measure_resolution'.
         Each vector in R^d is projected to the vertex with coordinates [measure_resolution*(k_1,...,k_d)] of the hypercube containing it. 
         We count how many vectors of 'self.list_of_arrays' are contained in the same hypercube. 
-        We store the pairing {vertex: #appearance in self.list_of_arrays} in the dictionary 'self.measure'.
+        The vertices are stored as rows of 'self.keys' and the number of appearances in 'self.counts'. Buffered arrays are released afterwards.
         """
-        self.measure = dict()
-        for array in self.list_of_arrays:
-            #compute location of vector in high-dim space
-            array_floor = np.floor(array/self.measure_resolution)
-            arr_key = tuple( tuple(arr) for arr in array_floor.tolist())
-            try:
-                prev_value = self.measure[arr_key]
-                self.measure[arr_key] = prev_value + 1
-            except KeyError:
-                self.measure[arr_key] = 1
+        if len(self.list_of_arrays) == 0:
+            return
+        keys, counts = hypercube_counts(np.stack(self.list_of_arrays),self.measure_resolution)
+        if self.keys is None:
+            self.keys, self.counts = keys, counts
+        else:
+            self.keys, self.counts = _merge_counts(self.keys,self.counts,keys,counts)
+        self.list_of_arrays = []
+
+    @property
+    def measure(self) -> dict[tuple,int]:
+        """Return the pairing {vertex: #appearance}."""
+        if self.keys is None:
+            return dict()
+        return dict(zip(map(tuple,self.keys.tolist()),self.counts.tolist()))
 
 
 class DistributionChecker:
     """Class ..."""
-    def __init__(self, measure_resolution: float, refinement_level: int):
+    def __init__(self, measure_resolution: float, refinement_level: int, chunk_size: int = CHUNK_SIZE):
         self.measure_resolution: float = measure_resolution
+        self.chunk_size = chunk_size
         self.refinement_level: int = refinement_level
         self.msg_measure = format_header(f"Measure resolution = {measure_resolution}")
         self.msg_measure += format_header(f"Refinement level = {refinement_level}")
         self.msg_measure += "\n|__dt__|\t|___VALUE__|\t|SPREAD_OLD|\t|SPREAD_NEW|"  
 
     def do_comparison(self,seed_to_velocity_old: dict[int,Function],seed_to_velocity_new: dict[int,Function], time: float):
-        old_measure = MeasureOnDOFs(self.measure_resolution)
-        new_measure = MeasureOnDOFs(self.measure_resolution)
-        ###add data
+        old_measure = MeasureOnDOFs(self.measure_resolution,self.chunk_size)
+        new_measure = MeasureOnDOFs(self.measure_resolution,self.chunk_size)
+        ###add data chunk-wise
         for seed in seed_to_velocity_new.keys():
-            old_measure.append_list_of_arrays(seed_to_velocity_old[seed].dat.data[:])
-            new_measure.append_list_of_arrays(seed_to_velocity_new[seed].dat.data[:])
-        ###construct measure
+            old_measure.append_list_of_arrays(seed_to_velocity_old[seed].dat.data_ro)
+            new_measure.append_list_of_arrays(seed_to_velocity_new[seed].dat.data_ro)
+        ###construct measure from the remaining chunk
         old_measure.construct_measure()
         new_measure.construct_measure()
-        value, spread_old, spread_new = compare_measures(old_measure.measure,new_measure.measure)
+        value, spread_old, spread_new = compare_measures(old_measure,new_measure)
         self.msg_measure += f"\n|{time:5.04f}|\t|{value:10.03e}|\t|{spread_old:10d}|\t|{spread_new:10d}|"
 
     def __str__(self) -> str:
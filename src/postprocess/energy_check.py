@@ -2,53 +2,132 @@ import csv
 from firedrake import Function
 import os
 from functools import cached_property
-from numpy import ndarray
+from numpy import ndarray, array, zeros, absolute, maximum, sqrt, hstack
+from numpy.random import default_rng
 
 from src.utils import swap_dictionary_keys
 from src.discretisation.time import TimeDiscretisation
-from src.math.norms.stochastic import l1_stochastic, l2_stochastic, linf_stochastic
-from src.math.energy import Energy_function
-from src.math.statistics import standard_deviation
+from src.math.energy import Energy_function, ENERGY_TO_NORM, energy_from_norms
+from src.math.norms.space import NORM_TO_OPERATOR
+from src.algorithms.observation import Observation
 from src.plotter import plot_ref_to_time_to_function, plot_seed_to_time_to_number, plot_seed_to_time_to_number_and_increments
 from src.postprocess.processmanager import ProcessObject
+from src.postprocess.statistics import GroupedMeanEstimator
+from src.postprocess.control_variate import ControlVariateEstimator
+from src.utils import ComputationCache, accepts_cache
 
-def _evaluate_energy(time_to_function: dict[float,Function], energy: Energy_function) -> dict[float,float]:
-    """Evaluate the energy. 
+def _evaluate_energy(time_to_function: dict[float,Function], energy: Energy_function, cache: ComputationCache | None = None) -> dict[float,float]:
+    """Evaluate the energy. The cache is only passed to energies that accept it.
 
     Return 'time -> energy' dictionary."""
+    if accepts_cache(energy):
+        return energy(time_to_function,cache=cache)
     return energy(time_to_function)
 
 class Energy(ProcessObject):
-    """Class that contains tools for computing the energy."""
+    """Class that contains tools for computing the energy. 
+    
+    The energy of each sample is evaluated once and streamed into running estimators of its L1, L2 and Linf norms and its standard deviation.
+    Trajectories and noise increments of 'individual_samples' seeds are kept in a reservoir, i.e., a uniform random subset of all samples.
+    The reservoir draws from its own random generator, such that the noise of the samples is not affected.
+    Energies of a space norm observe only this norm of the field, other energies observe its trajectory."""
     def __init__(self, 
                  time_disc: TimeDiscretisation,
                  energy_name: str, 
-                 energy_function: Energy_function) -> None:
-        self.seed_to_ref_to_time_to_energy = dict()
-        self.seed_Id = 0
+                 energy_function: Energy_function,
+                 group_size: int = 1,
+                 individual_samples: int = 0,
+                 field: str = "velocity") -> None:
         self.time_disc = time_disc
-        self.seed_to_ref_to_noise_increments = dict()
         self.energy_name = energy_name
         self.energy_function = energy_function
+        if energy_function in ENERGY_TO_NORM.keys():
+            self.observations = (Observation(field,reduction="norms",norms=(NORM_TO_OPERATOR[ENERGY_TO_NORM[energy_function]],)),)
+        else:
+            self.observations = (Observation(field),)
+        self.individual_samples = individual_samples
+        self.samples = 0
+        self.ref_to_sum_abs = {level: zeros(len(time_disc.ref_to_time_grid[level])) for level in time_disc.refinement_levels}
+        self.ref_to_sum_square = {level: zeros(len(time_disc.ref_to_time_grid[level])) for level in time_disc.refinement_levels}
+        self.ref_to_max_abs = {level: zeros(len(time_disc.ref_to_time_grid[level])) for level in time_disc.refinement_levels}
+        self.ref_to_mean = {level: zeros(len(time_disc.ref_to_time_grid[level])) for level in time_disc.refinement_levels}
+        self.ref_to_square = {level: zeros(len(time_disc.ref_to_time_grid[level])) for level in time_disc.refinement_levels}
+        self.ref_to_estimator = {level: GroupedMeanEstimator(group_size) for level in time_disc.refinement_levels}
+        self.ref_to_control_estimator = dict()
+        self.seed_to_ref_to_energy = dict()
+        self.seed_to_ref_to_noise_increments = dict()
+        self._reservoir_rng = default_rng()
+
+    @property
+    def seed_Id(self) -> int:
+        return self.samples
 
-    def update(self, ref_to_time_to_function: dict[int,dict[float,Function]], ref_to_noise_increments: list[int,ndarray],) -> None:
-        """Add an entry to the 'seed -> refinement level -> time -> energy ' dictionary."""
-        self.seed_to_ref_to_time_to_energy[self.seed_Id] = {level: _evaluate_energy(ref_to_time_to_function[level],self.energy_function) 
-                                                       for level in ref_to_time_to_function.keys()}
-        self.seed_to_ref_to_noise_increments[self.seed_Id] = ref_to_noise_increments
-        self.seed_Id += 1
+    def _energy_array(self, level: int, time_to_value: dict[float,Function | ndarray], cache: ComputationCache | None = None) -> ndarray:
+        """Return the energy ordered by the time grid. Values are the functions or their observed norms."""
+        if all(isinstance(value,ndarray) for value in time_to_value.values()):
+            time_to_energy = energy_from_norms(self.energy_function,{time: float(value[0]) for time, value in time_to_value.items()})
+        else:
+            time_to_energy = _evaluate_energy(time_to_value,self.energy_function,cache)
+        return array([time_to_energy[time] for time in self.time_disc.ref_to_time_grid[level]])
 
-    @cached_property
-    def ref_to_seed_to_time_to_energy(self):
-        if len(self.seed_to_ref_to_time_to_energy) == 0:
+    def _update_estimators(self, level: int, energy: ndarray) -> None:
+        """Add the energy of a sample to the running estimators of the level. 'self.samples' counts the update."""
+        self.ref_to_sum_abs[level] += absolute(energy)
+        self.ref_to_sum_square[level] += energy**2
+        self.ref_to_max_abs[level] = maximum(self.ref_to_max_abs[level],absolute(energy))
+        delta = energy - self.ref_to_mean[level]
+        self.ref_to_mean[level] += delta/self.samples
+        self.ref_to_square[level] += delta*(energy - self.ref_to_mean[level])
+        self.ref_to_estimator[level].update(energy)
+
+    def update(self, 
+               ref_to_time_to_function: dict[int,dict[float,Function]], 
+               ref_to_noise_increments: list[int,ndarray],
+               ref_to_time_to_control: dict[int,dict[float,Function]] | None = None,
+               cache: ComputationCache | None = None) -> None:
+        """Add a sample of 'refinement level -> time -> energy' to the running estimators.
+
+        If a control is given, its energy is used as control variate for the mean energy. Space norms are shared with other diagnostics via the cache."""
+        ref_to_energy = {level: self._energy_array(level,ref_to_time_to_function[level],cache) for level in self.time_disc.refinement_levels}
+        self._update_reservoir(ref_to_energy,ref_to_noise_increments)
+        self.samples += 1
+        for level, energy in ref_to_energy.items():
+            self._update_estimators(level,energy)
+            if ref_to_time_to_control is not None:
+                if level not in self.ref_to_control_estimator.keys():
+                    self.ref_to_control_estimator[level] = ControlVariateEstimator()
+                self.ref_to_control_estimator[level].update(energy,self._energy_array(level,ref_to_time_to_control[level],cache))
+
+    def _update_reservoir(self, ref_to_energy: dict[int,ndarray], ref_to_noise_increments: list[int,ndarray]) -> None:
+        """Keep the sample with probability 'individual_samples/(samples + 1)' in place of a random kept sample (Algorithm R)."""
+        if self.samples >= self.individual_samples:
+            position = int(self._reservoir_rng.integers(0,self.samples + 1))
+            if position >= self.individual_samples:
+                return
+            replaced_seed = sorted(self.seed_to_ref_to_energy.keys())[position]
+            del self.seed_to_ref_to_energy[replaced_seed]
+            del self.seed_to_ref_to_noise_increments[replaced_seed]
+        self.seed_to_ref_to_energy[self.samples] = ref_to_energy
+        self.seed_to_ref_to_noise_increments[self.samples] = ref_to_noise_increments
+
+    def update_control(self, ref_to_time_to_control: dict[int,dict[float,Function]]) -> None:
+        """Add a sample of the control only."""
+        for level in self.ref_to_control_estimator.keys():
+            self.ref_to_control_estimator[level].update_control(self._energy_array(level,ref_to_time_to_control[level]))
+
+    def _to_time_dict(self, ref_to_array: dict[int,ndarray]) -> dict[int,dict[float,float]]:
+        """Return 'refinement level -> time -> value' dictionary of per level arrays ordered by the time grid."""
+        if self.samples == 0:
             return dict()
-        return swap_dictionary_keys(self.seed_to_ref_to_time_to_energy)
-    
-    @cached_property
-    def ref_to_time_to_seed_to_energy(self):
-        if len(self.seed_to_ref_to_time_to_energy) == 0:
+        return {level: dict(zip(list(self.time_disc.ref_to_time_grid[level]),ref_to_array[level].tolist())) for level in ref_to_array.keys()}
+
+    @property
+    def ref_to_seed_to_time_to_energy(self) -> dict[int,dict[int,dict[float,float]]]:
+        if len(self.seed_to_ref_to_energy) == 0:
             return dict()
-        return {level: swap_dictionary_keys(self.ref_to_seed_to_time_to_energy[level]) for level in self.ref_to_seed_to_time_to_energy}
+        return {level: {seed: dict(zip(list(self.time_disc.ref_to_time_grid[level]),self.seed_to_ref_to_energy[seed][level].tolist())) 
+                        for seed in self.seed_to_ref_to_energy.keys()} 
+                for level in self.time_disc.refinement_levels}
     
     @cached_property
     def ref_to_seed_to_noise_increments(self):
@@ -58,42 +137,49 @@ class Energy(ProcessObject):
     
     @property
     def ref_to_time_to_energy_l1(self) -> dict[int,dict[float,float]]:
-        ref_to_time_to_energy = {level: {time: l1_stochastic(self.ref_to_time_to_seed_to_energy[level][time].values()) 
-                                         for time in self.time_disc.ref_to_time_grid[level]} 
-                                for level in self.ref_to_seed_to_time_to_energy}
-        return ref_to_time_to_energy
+        return self._to_time_dict({level: value/max(self.samples,1) for level, value in self.ref_to_sum_abs.items()})
     
     @property
     def ref_to_time_to_energy_l2(self) -> dict[int,dict[float,float]]:
-        ref_to_time_to_energy = {level: {time: l2_stochastic(self.ref_to_time_to_seed_to_energy[level][time].values())
-                                         for time in self.time_disc.ref_to_time_grid[level]} 
-                                for level in self.ref_to_seed_to_time_to_energy}
-        return ref_to_time_to_energy
+        return self._to_time_dict({level: sqrt(value/max(self.samples,1)) for level, value in self.ref_to_sum_square.items()})
     
     @property
     def ref_to_time_to_energy_linf(self) -> dict[int,dict[float,float]]:
-        ref_to_time_to_energy = {level: {time: linf_stochastic(self.ref_to_time_to_seed_to_energy[level][time].values()) 
-                                         for time in self.time_disc.ref_to_time_grid[level]} 
-                                for level in self.ref_to_seed_to_time_to_energy}
-        return ref_to_time_to_energy
+        return self._to_time_dict(self.ref_to_max_abs)
     
     @property
     def ref_to_time_to_energy_deviation(self) -> dict[int,dict[float,float]]:
-        ref_to_time_to_energy = {level: {time: standard_deviation(self.ref_to_time_to_seed_to_energy[level][time].values()) 
-                                         for time in self.time_disc.ref_to_time_grid[level]} 
-                                for level in self.ref_to_seed_to_time_to_energy}
-        return ref_to_time_to_energy
+        return self._to_time_dict({level: sqrt(value/max(self.samples,1)) for level, value in self.ref_to_square.items()})
+    
+    @property
+    def ref_to_time_to_energy_standard_error(self) -> dict[int,dict[float,float]]:
+        """Return the standard error of the mean energy that takes the grouping of the sampling strategy into account."""
+        if self.seed_Id == 0:
+            return dict()
+        return {level: {time: error for time, error in zip(self.time_disc.ref_to_time_grid[level],self.ref_to_estimator[level].standard_error)}
+                for level in self.time_disc.refinement_levels}
+    
+    @property
+    def ref_to_time_to_energy_control_variate(self) -> dict[int,dict[float,float]]:
+        """Return the control variate estimate of the mean energy."""
+        return {level: {time: value for time, value in zip(self.time_disc.ref_to_time_grid[level],self.ref_to_control_estimator[level].mean)}
+                for level in self.ref_to_control_estimator}
     
     def save(self, name_directory: str) -> None:
         """Save 'time -> energy' in .csv files."""
-        header = ["time","L1","L2","Linf","Standard_Deviation"]
+        header = ["time","L1","L2","Linf","Standard_Deviation","Standard_Error"]
+        columns = [self.ref_to_time_to_energy_l1,
+                   self.ref_to_time_to_energy_l2,
+                   self.ref_to_time_to_energy_linf,
+                   self.ref_to_time_to_energy_deviation,
+                   self.ref_to_time_to_energy_standard_error]
+        #append control variate estimate if a control was used
+        if self.ref_to_control_estimator:
+            header.append("Control_Variate_Mean")
+            columns.append(self.ref_to_time_to_energy_control_variate)
         ref_to_data = {}
         for level in self.time_disc.refinement_levels:
-            ref_to_data[level] = [[time, 
-                                   self.ref_to_time_to_energy_l1[level][time],
-                                   self.ref_to_time_to_energy_l2[level][time],
-                                   self.ref_to_time_to_energy_linf[level][time],
-                                   self.ref_to_time_to_energy_deviation[level][time]] 
+            ref_to_data[level] = [[time] + [column[level][time] for column in columns]
                                    for time in self.time_disc.ref_to_time_grid[level]]
             
         if not os.path.isdir(name_directory):
@@ -110,6 +196,29 @@ class Energy(ProcessObject):
                 writer.writerow(header)
                 writer.writerows(ref_to_data[level])
 
+    def save_individual(self, name_directory: str, requested_samples: int | None = None) -> None:
+        """Save 'time -> energy' of all kept individual samples of a level in one .csv file 'ind_<energy name>/refinement_<level>.csv'. 
+
+        The first column is the time, every further column holds the absolute energy of one seed."""
+        seeds = sorted(self.seed_to_ref_to_energy.keys())
+        if requested_samples is not None:
+            seeds = seeds[:requested_samples]
+        header = ["time"] + [f"seed_{seed}" for seed in seeds]
+
+        new_dict_name = name_directory + "/ind_" + self.energy_name
+        if not os.path.isdir(new_dict_name):
+            os.makedirs(new_dict_name)
+
+        for level in self.time_disc.refinement_levels:
+            time_grid = array(self.time_disc.ref_to_time_grid[level],dtype=float)[:,None]
+            energies = [absolute(self.seed_to_ref_to_energy[seed][level])[:,None] for seed in seeds]
+            data = hstack([time_grid] + energies).tolist()
+            outfile = new_dict_name + "/refinement_" + str(level) + ".csv"
+            with open(outfile,"w",newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(header)
+                writer.writerows(data)
+
     def plot(self, name_directory: str) -> None:
         """Save 'time -> energy'."""
         if not os.path.isdir(name_directory):
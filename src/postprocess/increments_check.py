@@ -8,67 +8,73 @@ from matplotlib.lines import Line2D
 
 from src.utils import swap_dictionary_keys
 from src.math.norms.stochastic import l1_stochastic
-from src.math.distances.space import SpaceDistance
+from src.math.distances.space import SpaceDistance, DISTANCE_TO_OPERATOR, batched_consecutive_distance
 from src.math.statistics import standard_deviation
 from src.postprocess.eoc import get_ref_to_EOC
 from src.plotter import COLOR_LIST
 from src.postprocess.processmanager import ProcessObject
+from src.postprocess.sample_table import SampleTable
+from src.algorithms.observation import Observation
 
-def _evaluate_space_distance_of_increments(ref_to_time_to_function: dict[int,dict[float,Function]],
-                                           space_distance: SpaceDistance) -> dict[int,dict[int,float]]:
-    """Evaluate increments of the function with respect to 'space_distance'. 
-
-    Return 'refinement level -> time -> increment comparison' dictionary."""
-    ref_to_time_to_incrementValue = dict()
-    for level in ref_to_time_to_function.keys():
-        ###WARNING: list might be disordered (should be ordered with respect to time)
-        funcs = list(ref_to_time_to_function[level].values())
-        times = list(ref_to_time_to_function[level].keys())
-        increments = [space_distance(funcs[index+1],funcs[index])**2 
-                              for index in range(len(funcs) - 1)]
-        summed_increments = np.cumsum(increments)
-        rescaled_increments = [sInc/(index + 1) for index, sInc in enumerate(summed_increments)]
-        time_to_incrementValue = {time: rInc for time, rInc in zip(times[1:],rescaled_increments)}
-        ref_to_time_to_incrementValue[level] = time_to_incrementValue
-    return ref_to_time_to_incrementValue
+def _rescaled_increments(time_to_value: dict[float,Function | np.ndarray],
+                         time_grid: np.ndarray,
+                         space_distance: SpaceDistance) -> np.ndarray:
+    """Evaluate the squared increments of the trajectory with respect to 'space_distance' ordered by the time grid.
+    Values are the functions or the norms of the increments observed by the algorithm, which start at the second time.
+    
+    Return the cumulative sums of the squared increments divided by the number of increments, i.e., one value per time step."""
+    if all(isinstance(value,np.ndarray) for value in time_to_value.values()):
+        increments = np.array([time_to_value[time][0] for time in time_grid[1:].tolist()])**2
+    else:
+        functions = [time_to_value[time] for time in time_grid.tolist()]
+        increments = batched_consecutive_distance(space_distance,functions)**2
+    return np.cumsum(increments)/np.arange(1,len(increments) + 1)
 
 
 class IncrementCheck(ProcessObject):
-    """Class that contains tools for checking norm stablity."""
+    """Class that contains tools for checking norm stablity. 
+    
+    If the time grids are given and the distance is a quadratic form, only the norms of the increments are observed, otherwise the trajectory."""
     def __init__(self, ref_to_stepsize: dict[int,float],
                  coarse_timeMesh: list[float], 
                  distance_name: str, 
-                 space_distance: SpaceDistance) -> None:
-        self.seed_to_ref_to_time_to_incrementValue = dict()
-        self.seed_Id = 0
+                 space_distance: SpaceDistance,
+                 ref_to_time_grid: dict[int,list[float]] | None = None,
+                 field: str = "velocity") -> None:
+        self.sample_table = None
+        self.ref_to_time_grid = None if ref_to_time_grid is None else {level: np.asarray(ref_to_time_grid[level],dtype=float) 
+                                                                      for level in ref_to_time_grid.keys()}
         self.ref_to_stepsize = ref_to_stepsize
         self.distance_name = distance_name
         self.space_distance = space_distance
         self.coarse_timeMesh = coarse_timeMesh[1:]
+        if ref_to_time_grid is not None and space_distance in DISTANCE_TO_OPERATOR.keys():
+            self.observations = (Observation(field,reduction="increment_norms",norms=(DISTANCE_TO_OPERATOR[space_distance],)),)
+        else:
+            self.observations = (Observation(field),)
 
-    def update(self, ref_to_time_to_function: dict[int,dict[float,Function]]) -> None:
-        """Add an entry to the 'seed -> refinement level -> norm ' dictionary."""
-        self.seed_to_ref_to_time_to_incrementValue[self.seed_Id] = _evaluate_space_distance_of_increments(ref_to_time_to_function,self.space_distance)
-        self.seed_Id += 1
+    @property
+    def seed_Id(self) -> int:
+        if self.sample_table is None:
+            return 0
+        return self.sample_table.samples
 
-    @cached_property
-    def ref_to_seed_to_time_to_incrementValue(self):
-        if len(self.seed_to_ref_to_time_to_incrementValue) == 0:
-            return dict()
-        return swap_dictionary_keys(self.seed_to_ref_to_time_to_incrementValue)
-    
-    @cached_property
-    def ref_to_time_to_seed_to_incrementValue(self):
-        if len(self.ref_to_seed_to_time_to_incrementValue) == 0:
-            return dict()
-        return {level: swap_dictionary_keys(self.ref_to_seed_to_time_to_incrementValue[level])
-                for level in self.ref_to_seed_to_time_to_incrementValue.keys()}
+    def update(self, ref_to_time_to_function: dict[int,dict[float,Function]]) -> None:
+        """Add a sample of 'refinement level -> time -> increment' to the sample table. 
+        
+        The time ordering is given by the time grids, which default to the sorted times of the first sample."""
+        if self.ref_to_time_grid is None:
+            self.ref_to_time_grid = {level: np.array(sorted(ref_to_time_to_function[level].keys())) for level in ref_to_time_to_function.keys()}
+        if self.sample_table is None:
+            self.sample_table = SampleTable({level: time_grid[1:] for level, time_grid in self.ref_to_time_grid.items()})
+        self.sample_table.append({level: _rescaled_increments(ref_to_time_to_function[level],self.ref_to_time_grid[level],self.space_distance) 
+                                  for level in self.ref_to_time_grid.keys()})
     
     @cached_property
     def ref_to_time_to_norm_l1(self) -> dict[int,dict[int,float]]:
-        return {level: {time: l1_stochastic(self.ref_to_time_to_seed_to_incrementValue[level][time].values())
-                        for time in self.ref_to_time_to_seed_to_incrementValue[level].keys()}
-                for level in self.ref_to_time_to_seed_to_incrementValue.keys()}
+        if self.sample_table is None:
+            return dict()
+        return self.sample_table.reduce(l1_stochastic)
     
     @cached_property
     def time_to_ref_to_norm_l1(self) -> dict[int,dict[int,float]]:
@@ -78,9 +84,9 @@ class IncrementCheck(ProcessObject):
     
     @property
     def ref_to_time_to_norm_SD(self) -> dict[int,dict[int,float]]:
-        return {level: {time: standard_deviation(self.ref_to_time_to_seed_to_incrementValue[level][time].values())
-                        for time in self.ref_to_time_to_seed_to_incrementValue[level].keys()}
-                for level in self.ref_to_time_to_seed_to_incrementValue.keys()}
+        if self.sample_table is None:
+            return dict()
+        return self.sample_table.reduce(standard_deviation)
     
     @cached_property
     def time_to_ref_to_norm_SD(self) -> dict[int,dict[int,float]]:
@@ -146,11 +152,9 @@ class IncrementCheck(ProcessObject):
         
         plt.figure()
         #plot samples
-        for sample in self.seed_to_ref_to_time_to_incrementValue.keys():
-            for id, level in enumerate(self.seed_to_ref_to_time_to_incrementValue[sample].keys()):
-                times = list(self.seed_to_ref_to_time_to_incrementValue[sample][level].keys())
-                values = list(self.seed_to_ref_to_time_to_incrementValue[sample][level].values())
-                plt.plot(times,values,color=COLOR_LIST[id])
+        for sample in range(self.seed_Id):
+            for id, level in enumerate(self.sample_table.refinement_levels):
+                plt.plot(self.sample_table.ref_to_time_grid[level],self.sample_table[level][sample,:,0],color=COLOR_LIST[id])
         #plot mean
         legendMarkers = []
         legendEntries = []
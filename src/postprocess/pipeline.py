@@ -0,0 +1,123 @@
+"""Defines the pipeline that postprocesses finished samples while the next sample is solved."""
+import threading
+from queue import Queue
+from time import perf_counter_ns
+from typing import Any, Callable, TypeAlias
+from firedrake import Function
+
+from src.math.operators import DofArray
+
+#############################           POSTPROCESSING PIPELINE
+#abstract concept
+### stages only evaluate norms, distances and point values by the cached operators, hence they also work on the DofArray copies of a sample
+Stage: TypeAlias = Callable[[dict[str,Any]],None]
+
+def copy_sample(sample: Any, memo: dict[int,Any] | None = None) -> Any:
+    """Return the sample with every Function replaced by a DofArray copy of its degrees of freedom.
+
+    Dictionaries are copied recursively, other objects are passed on. Objects that are shared within the sample stay shared, e.g., for the computation cache."""
+    if memo is None:
+        memo = dict()
+    if id(sample) in memo.keys():
+        return memo[id(sample)]
+    if isinstance(sample,Function):
+        copy = DofArray.from_function(sample)
+    elif isinstance(sample,dict):
+        copy = {key: copy_sample(value,memo) for key, value in sample.items()}
+    else:
+        copy = sample
+    memo[id(sample)] = copy
+    return copy
+
+class PostprocessingPipeline:
+    """Class that runs the postprocessing stages of finished samples in the given order.
+
+    Firedrake and PETSc are not thread-safe. With a positive queue size the Functions of a sample are copied into DofArrays on the calling thread
+    and all stages process the copies on a background thread, such that they overlap with the solution of the next sample.
+    The first sample is processed on the calling thread, where it builds the cached operators, tabulations and point evaluations of all stages.
+    At most 'queue_size' samples wait for processing, further submissions block until the worker catches up.
+
+    Wall times are added to 'runtimes': '<stage>' is the time the stage computes and '<stage>-wait' the time from the submission of a sample until the stage starts on it.
+    With a background thread 'copy' is the time of copying samples and 'blocked' the time the calling thread waits for a free place in the queue or for the end of the processing.
+    Times that overlap with other run times are listed by 'overlapping'."""
+    def __init__(self, stages: dict[str,Stage], runtimes: dict[str,int], queue_size: int = 0) -> None:
+        self.stages = stages
+        self.runtimes = runtimes
+        self.queue_size = queue_size
+        for name in stages.keys():
+            runtimes.setdefault(name,0)
+            runtimes.setdefault(name + "-wait",0)
+        if queue_size > 0:
+            runtimes.setdefault("copy",0)
+            runtimes.setdefault("blocked",0)
+        self.submitted = 0
+        self._queue = None
+        self._worker = None
+        self._error = None
+        self._runtime_lock = threading.Lock()
+
+    @property
+    def overlapping(self) -> list[str]:
+        """Return the names of run times that overlap with others. Waits overlap with preceding stages, stages of the background thread with solving."""
+        names = [name + "-wait" for name in self.stages.keys()]
+        if self.queue_size > 0:
+            names += list(self.stages.keys())
+        return names
+
+    def _add_runtime(self, name: str, time_mark: int) -> None:
+        with self._runtime_lock:
+            self.runtimes[name] += perf_counter_ns() - time_mark
+
+    def _process(self, sample: dict[str,Any], submission_mark: int) -> None:
+        for name, stage in self.stages.items():
+            self._add_runtime(name + "-wait",submission_mark)
+            time_mark = perf_counter_ns()
+            stage(sample)
+            self._add_runtime(name,time_mark)
+
+    def _work(self) -> None:
+        """Process queued samples until the end marker 'None' arrives. After an error the remaining samples are discarded."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                try:
+                    self._process(*item)
+                except Exception as error:
+                    self._error = error
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            msg = "Postprocessing of a sample failed on the background thread."
+            msg += f"\nSubmitted samples:\t {self.submitted}"
+            raise RuntimeError(msg) from self._error
+
+    def submit(self, sample: dict[str,Any]) -> None:
+        """Hand a finished sample to the postprocessing."""
+        self._raise_error()
+        self.submitted += 1
+        submission_mark = perf_counter_ns()
+        if self.queue_size <= 0 or self.submitted == 1:
+            self._process(sample,submission_mark)
+            return
+
+        sample = copy_sample(sample)
+        self._add_runtime("copy",submission_mark)
+        if self._worker is None:
+            self._queue = Queue(maxsize=self.queue_size)
+            self._worker = threading.Thread(target=self._work,name="postprocessing",daemon=True)
+            self._worker.start()
+        time_mark = perf_counter_ns()
+        self._queue.put((sample,submission_mark))
+        self._add_runtime("blocked",time_mark)
+
+    def close(self) -> None:
+        """Wait until all submitted samples are postprocessed."""
+        if self._worker is not None:
+            time_mark = perf_counter_ns()
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+            self._add_runtime("blocked",time_mark)
+        self._raise_error()
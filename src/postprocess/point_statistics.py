@@ -2,62 +2,85 @@ import csv
 from firedrake import Function
 import os
 from functools import cached_property
-from numpy import ndarray
+from numpy import ndarray, array, hstack, zeros, sqrt, atleast_2d, savez_compressed
 
 from src.utils import swap_dictionary_keys
 from src.discretisation.time import TimeDiscretisation
 from src.math.norms.stochastic import l1_stochastic, l2_stochastic, linf_stochastic
 from src.math.statistics import standard_deviation, mean_value
+from src.math.operators import operator_space, is_discrete, dof_matrix
+from src.math.point_evaluation import get_point_evaluation
 from src.plotter import plot_ref_to_time_to_function, plot_seed_to_time_to_number, plot_seed_to_time_to_number_and_increments
 from src.postprocess.processmanager import ProcessObject
+from src.postprocess.control_variate import ControlVariateEstimator
+from src.postprocess.sample_table import SampleTable
+from src.algorithms.observation import Observation
 
-def _evaluate_funcAtpoint(time_to_function: dict[float,Function], point: list[float], func_dim: int) -> list[dict[float,float]]:
-    """Evaluate the dictionary "time -> function" at specified point. 
+def _evaluate_trajectory_at_points(functions: list[Function], points: ndarray, func_dim: int) -> ndarray:
+    """Evaluate a list of functions at specified points.
 
-    Return 'component -> time -> function value'."""
-    return {component: {time: time_to_function[time].at(point)[component] for time in time_to_function.keys()} for component in range(func_dim)}
+    Return array of shape (functions, point, component). Functions are evaluated by the cached point evaluation."""
+    points = atleast_2d(points)
+    if is_discrete(*functions):
+        values = get_point_evaluation(operator_space(functions[0]),points).evaluate(dof_matrix(functions))
+        return values.reshape((len(functions),len(points),func_dim))
+    return array([[function.at(point) for point in points.tolist()] for function in functions]).reshape((len(functions),len(points),func_dim))
+
+def _values_at_points(time_to_value: dict[float,Function | ndarray], times: list[float], points: ndarray, func_dim: int) -> ndarray:
+    """Return the values at the times as array of shape (time, point, component). 
+    
+    Values are the functions or their point values observed by the algorithm, functions are evaluated."""
+    points = atleast_2d(points)
+    values = [time_to_value[time] for time in times]
+    if all(isinstance(value,ndarray) for value in values):
+        return array(values).reshape((len(values),len(points),func_dim))
+    return _evaluate_trajectory_at_points(values,points,func_dim)
 
 class PointStatistics(ProcessObject):
-    """Class that contains tools for computing the energy."""
+    """Class that contains tools for computing the statistics of a field at a point. Only the point values of the field are observed."""
     def __init__(self, 
                  time_disc: TimeDiscretisation,
                  point_name: str, 
                  point: list[float],
-                 func_dim: int) -> None:
-        self.seed_to_ref_to_comp_to_time_to_value = dict()
-        self.seed_Id = 0
+                 func_dim: int,
+                 field: str = "velocity") -> None:
+        self.sample_table = SampleTable(time_disc.ref_to_time_grid,func_dim)
         self.time_disc = time_disc
         self.seed_to_ref_to_noise_increments = dict()
         self.point_name = point_name
         self.point = point
         self.func_dim = func_dim
+        self.observations = (Observation(field,reduction="points",points=(tuple(map(float,point)),)),)
+        self.ref_to_control_estimator = dict()
+
+    @property
+    def seed_Id(self) -> int:
+        return self.sample_table.samples
+
+    def _value_array(self, level: int, time_to_function: dict[float,Function]) -> ndarray:
+        """Return the point values as array of shape (time, component) ordered by the time grid."""
+        return _values_at_points(time_to_function,self.time_disc.ref_to_time_grid[level],self.point,self.func_dim)[:,0,:]
+
+    def update(self, 
+               ref_to_time_to_function: dict[int,dict[float,Function]], 
+               ref_to_noise_increments: list[int,ndarray],
+               ref_to_time_to_control: dict[int,dict[float,Function]] | None = None) -> None:
+        """Add a sample of 'refinement level -> time -> point value' to the sample table.
 
-    def update(self, ref_to_time_to_function: dict[int,dict[float,Function]], ref_to_noise_increments: list[int,ndarray],) -> None:
-        """Add an entry to the 'seed -> refinement level -> time -> energy ' dictionary."""
-        self.seed_to_ref_to_comp_to_time_to_value[self.seed_Id] = {level: _evaluate_funcAtpoint(ref_to_time_to_function[level],self.point,self.func_dim) 
-                                                       for level in ref_to_time_to_function.keys()}
+        If a control is given, its point values are used as control variate for the mean."""
         self.seed_to_ref_to_noise_increments[self.seed_Id] = ref_to_noise_increments
-        self.seed_Id += 1
+        ref_to_value = {level: self._value_array(level,ref_to_time_to_function[level]) for level in ref_to_time_to_function.keys()}
+        self.sample_table.append(ref_to_value)
+        if ref_to_time_to_control is not None:
+            for level, value in ref_to_value.items():
+                if level not in self.ref_to_control_estimator.keys():
+                    self.ref_to_control_estimator[level] = ControlVariateEstimator()
+                self.ref_to_control_estimator[level].update(value,self._value_array(level,ref_to_time_to_control[level]))
 
-    @cached_property
-    def ref_to_seed_to_comp_to_time_to_value(self):
-        if len(self.seed_to_ref_to_comp_to_time_to_value) == 0:
-            return dict()
-        return swap_dictionary_keys(self.seed_to_ref_to_comp_to_time_to_value)
-    
-    @cached_property
-    def ref_to_comp_to_seed_to_time_to_value(self):
-        if len(self.ref_to_seed_to_comp_to_time_to_value) == 0:
-            return dict()
-        return {level: swap_dictionary_keys(self.ref_to_seed_to_comp_to_time_to_value[level]) for level in self.ref_to_seed_to_comp_to_time_to_value}
-    
-    @cached_property
-    def ref_to_comp_to_time_to_seed_to_value(self):
-        if len(self.ref_to_comp_to_seed_to_time_to_value) == 0:
-            return dict()
-        return {level: {component: swap_dictionary_keys(self.ref_to_comp_to_seed_to_time_to_value[level][component]) 
-                        for component in self.ref_to_comp_to_seed_to_time_to_value[level]}  
-                        for level in self.ref_to_seed_to_comp_to_time_to_value}
+    def update_control(self, ref_to_time_to_control: dict[int,dict[float,Function]]) -> None:
+        """Add a sample of the control only."""
+        for level in self.ref_to_control_estimator.keys():
+            self.ref_to_control_estimator[level].update_control(self._value_array(level,ref_to_time_to_control[level]))
     
     @cached_property
     def ref_to_seed_to_noise_increments(self):
@@ -67,19 +90,13 @@ class PointStatistics(ProcessObject):
     
     @property
     def ref_to_comp_to_time_to_value_mean(self) -> dict[int,dict[int,dict[float,list[float]]]]:
-        ref_to_time_to_funcAtpoint = {level: {component: {time: mean_value(self.ref_to_comp_to_time_to_seed_to_value[level][component][time].values()) 
-                                                          for time in self.ref_to_comp_to_time_to_seed_to_value[level][component]} 
-                                              for component in self.ref_to_comp_to_time_to_seed_to_value[level]} 
-                                for level in self.ref_to_comp_to_time_to_seed_to_value}
-        return ref_to_time_to_funcAtpoint
+        ref_to_comp_to_time_to_value = {component: self.sample_table.reduce(mean_value,component) for component in range(self.func_dim)}
+        return swap_dictionary_keys(ref_to_comp_to_time_to_value)
     
     @property
     def ref_to_comp_to_time_to_value_SD(self) -> dict[int,dict[int,dict[float,list[float]]]]:
-        ref_to_time_to_funcAtpoint = {level: {component: {time: standard_deviation(self.ref_to_comp_to_time_to_seed_to_value[level][component][time].values()) 
-                                                          for time in self.ref_to_comp_to_time_to_seed_to_value[level][component]} 
-                                              for component in self.ref_to_comp_to_time_to_seed_to_value[level]} 
-                                for level in self.ref_to_comp_to_time_to_seed_to_value}
-        return ref_to_time_to_funcAtpoint
+        ref_to_comp_to_time_to_value = {component: self.sample_table.reduce(standard_deviation,component) for component in range(self.func_dim)}
+        return swap_dictionary_keys(ref_to_comp_to_time_to_value)
     
     def save(self, name_directory: str) -> None:
         """Save 'time -> funcAtpoint' in .csv files."""
@@ -87,18 +104,17 @@ class PointStatistics(ProcessObject):
         header = ["time"]
         header += [f"f_{component}-mean" for component in range(self.func_dim)]
         header += [f"f_{component}-SD" for component in range(self.func_dim)]
+        if self.ref_to_control_estimator:
+            header += [f"f_{component}-CV-mean" for component in range(self.func_dim)]
 
         ref_to_data = {}
         for level in self.time_disc.refinement_levels:
-            data = []
-            for time in self.time_disc.ref_to_time_grid[level]:
-                mean = []
-                sd = []
-                for component in range(self.func_dim):
-                    mean.append(self.ref_to_comp_to_time_to_value_mean[level][component][time])
-                    sd.append(self.ref_to_comp_to_time_to_value_SD[level][component][time])
-                data.append([time] + mean + sd)
-            ref_to_data[level] = data
+            columns = [self.sample_table.ref_to_time_grid[level][:,None],
+                       mean_value(self.sample_table[level]),
+                       standard_deviation(self.sample_table[level])]
+            if self.ref_to_control_estimator:
+                columns.append(self.ref_to_control_estimator[level].mean)
+            ref_to_data[level] = hstack(columns).tolist()
             
         if not os.path.isdir(name_directory):
             os.makedirs(name_directory)
@@ -120,20 +136,6 @@ class PointStatistics(ProcessObject):
         header = ["time"]
         header += [f"f_{component}" for component in range(self.func_dim)]
 
-        #construct data
-        seed_to_ref_to_data = dict()
-        for sample in range(min(requested_samples,self.seed_Id)):
-            ref_to_data = {}
-            for level in self.time_disc.refinement_levels:
-                data = []
-                for time in self.time_disc.ref_to_time_grid[level]:
-                    value = []
-                    for component in range(self.func_dim):
-                        value.append(self.ref_to_comp_to_time_to_seed_to_value[level][component][time][sample])
-                    data.append([time] + value)
-                ref_to_data[level] = data
-            seed_to_ref_to_data[sample] = ref_to_data
-        
         #check if directory is avaiable
         if not os.path.isdir(name_directory):
             os.makedirs(name_directory)
@@ -144,11 +146,12 @@ class PointStatistics(ProcessObject):
             if not os.path.isdir(new_dict_name):
                 os.makedirs(new_dict_name)
             for level in self.time_disc.refinement_levels:
+                data = hstack([self.sample_table.ref_to_time_grid[level][:,None],self.sample_table[level][sample]]).tolist()
                 outfile = new_dict_name + "/refinement_" + str(level) + ".csv"
                 with open(outfile,"w",newline="") as file:
                     writer = csv.writer(file)
                     writer.writerow(header)
-                    writer.writerows(seed_to_ref_to_data[sample][level])
+                    writer.writerows(data)
 
     def plot(self, name_directory: str) -> None:
         return
@@ -168,3 +171,87 @@ class PointStatistics(ProcessObject):
 
     def plot_individual(self, name_directory: str) -> None:
         return
+
+
+class ProbeStatistics(ProcessObject):
+    """Class that computes mean and standard deviation of functions at a set of probe points. 
+    
+    All probes are evaluated by one sparse point evaluation per trajectory. 
+    Mean and standard deviation are streamed, values of individual samples are kept for the first 'individual_samples' seeds.
+    If a control is given, its probe values are used as control variate for the mean. Only the probe values of the field are observed."""
+    def __init__(self, 
+                 time_disc: TimeDiscretisation,
+                 probe_name: str, 
+                 points: list[list[float]] | ndarray,
+                 func_dim: int,
+                 individual_samples: int = 0,
+                 field: str = "velocity") -> None:
+        self.time_disc = time_disc
+        self.probe_name = probe_name
+        self.points = atleast_2d(array(points,dtype=float))
+        self.observations = (Observation(field,reduction="points",points=tuple(map(tuple,self.points.tolist()))),)
+        self.func_dim = func_dim
+        self.individual_samples = individual_samples
+        self.samples = 0
+        shape = (len(self.points),func_dim)
+        self.ref_to_mean = {level: zeros((len(time_disc.ref_to_time_grid[level]),) + shape) for level in time_disc.refinement_levels}
+        self.ref_to_square = {level: zeros((len(time_disc.ref_to_time_grid[level]),) + shape) for level in time_disc.refinement_levels}
+        self.ref_to_individual = {level: [] for level in time_disc.refinement_levels}
+        self.ref_to_control_estimator = dict()
+
+    def _value_array(self, level: int, time_to_function: dict[float,Function]) -> ndarray:
+        """Return the probe values as array of shape (time, point, component) ordered by the time grid."""
+        return _values_at_points(time_to_function,self.time_disc.ref_to_time_grid[level],self.points,self.func_dim)
+
+    def update(self, 
+               ref_to_time_to_function: dict[int,dict[float,Function]], 
+               ref_to_noise_increments: dict[int,ndarray] | None = None,
+               ref_to_time_to_control: dict[int,dict[float,Function]] | None = None) -> None:
+        """Add a sample of 'refinement level -> time -> probe values' to the streamed mean and standard deviation."""
+        self.samples += 1
+        for level in self.time_disc.refinement_levels:
+            value = self._value_array(level,ref_to_time_to_function[level])
+            delta = value - self.ref_to_mean[level]
+            self.ref_to_mean[level] += delta/self.samples
+            self.ref_to_square[level] += delta*(value - self.ref_to_mean[level])
+            if self.samples <= self.individual_samples:
+                self.ref_to_individual[level].append(value)
+            if ref_to_time_to_control is not None:
+                if level not in self.ref_to_control_estimator.keys():
+                    self.ref_to_control_estimator[level] = ControlVariateEstimator()
+                self.ref_to_control_estimator[level].update(value,self._value_array(level,ref_to_time_to_control[level]))
+
+    def update_control(self, ref_to_time_to_control: dict[int,dict[float,Function]]) -> None:
+        """Add a sample of the control only."""
+        for level in self.ref_to_control_estimator.keys():
+            self.ref_to_control_estimator[level].update_control(self._value_array(level,ref_to_time_to_control[level]))
+
+    @property
+    def ref_to_deviation(self) -> dict[int,ndarray]:
+        return {level: sqrt(self.ref_to_square[level]/max(self.samples,1)) for level in self.ref_to_square.keys()}
+
+    def save(self, name_directory: str) -> None:
+        """Save points, time grids, mean, standard deviation, control variate mean and individual samples of all levels in one .npz file."""
+        if not os.path.isdir(name_directory):
+            os.makedirs(name_directory)
+
+        data = {"points": self.points}
+        ref_to_deviation = self.ref_to_deviation
+        for level in self.time_disc.refinement_levels:
+            data[f"time_{level}"] = array(self.time_disc.ref_to_time_grid[level],dtype=float)
+            data[f"mean_{level}"] = self.ref_to_mean[level]
+            data[f"SD_{level}"] = ref_to_deviation[level]
+            if level in self.ref_to_control_estimator.keys():
+                data[f"cv_mean_{level}"] = self.ref_to_control_estimator[level].mean
+            data[f"individual_{level}"] = array(self.ref_to_individual[level]).reshape((-1,) + self.ref_to_mean[level].shape)
+        savez_compressed(name_directory + "/" + self.probe_name + ".npz",**data)
+
+    def save_individual(self, name_directory: str, requested_samples: int) -> None:
+        """Individual samples are stored by 'save'."""
+        return
+
+    def plot(self, name_directory: str) -> None:
+        return
+
+    def plot_individual(self, name_directory: str) -> None:
+        return
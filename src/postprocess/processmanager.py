@@ -1,10 +1,20 @@
-from typing import Protocol
+from typing import Protocol, Iterable
+
+from src.utils import ComputationCache, accepts_cache
+from src.algorithms.observation import Observation
 
 class ProcessObject(Protocol):
+    ### data of the solution the process object needs besides those declared by its manager
+    observations: tuple[Observation,...] = ()
+
     def update(self,*args,**kwargs) -> None:
         print("update is not implemented.")
         return
     
+    def update_control(self,*args,**kwargs) -> None:
+        print("update control is not implemented.")
+        return
+    
     def save(self,*args,**kwargs) -> None:
         print("save is not implemented.")
         return
@@ -25,16 +35,46 @@ class ProcessObject(Protocol):
         return "__str__ is not implemented."
 
 class ProcessManager:
-    """Class that bundles routines for process objects."""
-    def __init__(self, list_of_process_objects: list[ProcessObject] = []) -> None:
+    """Class that bundles routines for process objects. 
+    
+    Process objects whose update accepts a 'cache' share one computation cache. 
+    It is created per update unless a cache is provided, e.g., one per sample that is shared between managers.
+    The manager or its process objects declare the observation the manager is updated with, the algorithm only stores observed data."""
+    def __init__(self, list_of_process_objects: list[ProcessObject] = [], observations: Iterable[Observation] = ()) -> None:
         self.list_of_process_objects = list_of_process_objects
+        self._observations = tuple(observations)
+
+    @property
+    def observations(self) -> tuple[Observation,...]:
+        """Return the observations of the manager and its process objects."""
+        return self._observations + tuple(observation for process_object in self.list_of_process_objects 
+                                          for observation in getattr(process_object,"observations",()))
+
+    @property
+    def observation(self) -> Observation:
+        """Return the observation the manager is updated with. The manager and all its process objects have to share it."""
+        observations = set(self.observations)
+        if not len(observations) == 1:
+            msg = "Process objects of a manager have to share one observation."
+            msg += f"\nObservations:\t {[str(observation) for observation in observations]}"
+            raise ValueError(msg)
+        return observations.pop()
 
     def add_process_object(self, process_object: ProcessObject) -> None:
         self.list_of_process_objects.append(process_object)
 
-    def update(self,*args,**kwargs) -> None:
+    def update(self,*args,cache: ComputationCache | None = None,**kwargs) -> None:
+        if cache is None:
+            cache = ComputationCache()
+        for process_object in self.list_of_process_objects:
+            if accepts_cache(process_object.update):
+                process_object.update(*args,cache=cache,**kwargs)
+            else:
+                process_object.update(*args,**kwargs)
+
+    def update_control(self,*args,**kwargs) -> None:
         for process_object in self.list_of_process_objects:
-            process_object.update(*args,**kwargs)
+            process_object.update_control(*args,**kwargs)
 
     def save(self,*args,**kwargs) -> None:
         for process_object in self.list_of_process_objects:
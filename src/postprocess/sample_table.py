@@ -0,0 +1,62 @@
+import numpy as np
+from typing import Iterable
+
+### initial number of samples, the capacity is doubled whenever it is exhausted
+CHUNK_SIZE = 64
+
+class SampleTable:
+    """Class that stores scalar sample data column-wise as dense arrays indexed by '[level][seed, time, component]'.
+
+    Storage starts with 'chunk_size' samples and doubles its capacity when full, such that appending is amortised constant and statistics reduce along the seed axis."""
+    def __init__(self, ref_to_time_grid: dict[int,Iterable[float]], components: int = 1, chunk_size: int = CHUNK_SIZE) -> None:
+        self.ref_to_time_grid = {level: np.asarray(list(ref_to_time_grid[level]),dtype=float) for level in ref_to_time_grid.keys()}
+        self.components = components
+        self.chunk_size = chunk_size
+        self.samples = 0
+        self._ref_to_data = {level: np.empty((chunk_size,len(self.ref_to_time_grid[level]),components))
+                             for level in self.ref_to_time_grid.keys()}
+
+    @property
+    def refinement_levels(self) -> list[int]:
+        return list(self.ref_to_time_grid.keys())
+
+    def _grow(self) -> None:
+        """Double the storage of all levels."""
+        for level in self._ref_to_data.keys():
+            data = self._ref_to_data[level]
+            self._ref_to_data[level] = np.concatenate([data,np.empty((max(len(data),self.chunk_size),) + data.shape[1:])],axis=0)
+
+    def append(self, ref_to_values: dict[int,np.ndarray]) -> None:
+        """Add a sample. Values of a level are given as array of shape (time, component) ordered by the time grid.
+
+        Arrays of shape (time,) are accepted for a single component."""
+        if not set(ref_to_values.keys()) == set(self._ref_to_data.keys()):
+            msg = "Refinement levels of sample and table do not match."
+            msg += f"\nLevels sample:\t {sorted(ref_to_values.keys())}"
+            msg += f"\nLevels table:\t {sorted(self._ref_to_data.keys())}"
+            raise ValueError(msg)
+        if self.samples == len(next(iter(self._ref_to_data.values()))):
+            self._grow()
+        for level, values in ref_to_values.items():
+            self._ref_to_data[level][self.samples] = np.reshape(values,self._ref_to_data[level].shape[1:])
+        self.samples += 1
+
+    def __getitem__(self, level: int) -> np.ndarray:
+        """Return the samples of a level as array of shape (seed, time, component)."""
+        return self._ref_to_data[level][:self.samples]
+
+    def __len__(self) -> int:
+        return self.samples
+
+    def reduce(self, statistic, component: int = 0) -> dict[int,dict[float,float]]:
+        """Apply the statistic along the seed axis.
+
+        Return 'refinement level -> time -> value' dictionary."""
+        if self.samples == 0:
+            return dict()
+        return {level: dict(zip(self.ref_to_time_grid[level].tolist(),statistic(self[level][:,:,component],axis=0).tolist()))
+                for level in self.ref_to_time_grid.keys()}
+
+    def time_to_value(self, level: int, seed: int, component: int = 0) -> dict[float,float]:
+        """Return the 'time -> value' dictionary of an individual sample."""
+        return dict(zip(self.ref_to_time_grid[level].tolist(),self[level][seed,:,component].tolist()))
@@ -1,25 +1,26 @@
 from firedrake import Function
 import csv
 import os
-from functools import cached_property
 
-from src.utils import swap_dictionary_keys
 from src.math.norms.stochastic import l1_stochastic, l2_stochastic, linf_stochastic
 from src.math.norms.Bochner_time import BochnerTimeNorm
 from src.math.norms.space import SpaceNorm
 from src.math.statistics import standard_deviation
 from src.postprocess.eoc import get_ref_to_EOC
 from src.postprocess.processmanager import ProcessObject
+from src.postprocess.sample_table import SampleTable
+from src.utils import ComputationCache
 
 def _evaluate_norm(ref_to_time_to_function: dict[int,dict[float,Function]],
                    bochner_time_norm: BochnerTimeNorm,
-                   space_norm: SpaceNorm) -> dict[int,float]:
+                   space_norm: SpaceNorm,
+                   cache: ComputationCache | None = None) -> dict[int,float]:
     """Evaluate the function with respect to the Bochner time norm and space norm. 
 
     Return 'refinement level -> norm' dictionary."""
     norm = dict()
     for level in ref_to_time_to_function.keys():
-        norm[level] = bochner_time_norm(ref_to_time_to_function[level],space_norm)
+        norm[level] = bochner_time_norm(ref_to_time_to_function[level],space_norm,cache=cache)
     return norm
 
 
@@ -29,39 +30,49 @@ class StabilityCheck(ProcessObject):
                  norm_name: str, 
                  bochner_time_norm: BochnerTimeNorm,
                  space_norm: SpaceNorm) -> None:
-        self.seed_to_ref_to_norm = dict()
-        self.seed_Id = 0
+        self.sample_table = None
         self.ref_to_stepsize = ref_to_stepsize
         self.norm_name = norm_name
         self.bochner_time_norm = bochner_time_norm
         self.space_norm = space_norm
 
-    def update(self, ref_to_time_to_function: dict[int,dict[float,Function]]) -> None:
-        """Add an entry to the 'seed -> refinement level -> norm ' dictionary."""
-        self.seed_to_ref_to_norm[self.seed_Id] = _evaluate_norm(ref_to_time_to_function,self.bochner_time_norm,self.space_norm)
-        self.seed_Id += 1
+    def update(self, ref_to_time_to_function: dict[int,dict[float,Function]], cache: ComputationCache | None = None) -> None:
+        """Add a sample of 'refinement level -> norm' to the sample table. Space norms are shared with other diagnostics via the cache."""
+        self._append(_evaluate_norm(ref_to_time_to_function,self.bochner_time_norm,self.space_norm,cache))
 
-    @cached_property
-    def ref_to_seed_to_norm(self):
-        if len(self.seed_to_ref_to_norm) == 0:
+    @property
+    def seed_Id(self) -> int:
+        if self.sample_table is None:
+            return 0
+        return self.sample_table.samples
+
+    def _append(self, ref_to_norm: dict[int,float]) -> None:
+        """Add a sample of 'refinement level -> norm' to the sample table."""
+        if self.sample_table is None:
+            self.sample_table = SampleTable({level: [0] for level in ref_to_norm.keys()})
+        self.sample_table.append(ref_to_norm)
+
+    def _reduce(self, statistic) -> dict[int,float]:
+        """Apply the statistic along the seed axis."""
+        if self.sample_table is None:
             return dict()
-        return swap_dictionary_keys(self.seed_to_ref_to_norm)
+        return {level: float(statistic(self.sample_table[level][:,0,0])) for level in self.sample_table.refinement_levels}
     
     @property
     def ref_to_norm_l1(self) -> dict[int,float]:
-        return {level: l1_stochastic(self.ref_to_seed_to_norm[level].values()) for level in self.ref_to_seed_to_norm.keys()}
+        return self._reduce(l1_stochastic)
     
     @property
     def ref_to_norm_l2(self) -> dict[int,float]:
-        return {level: l2_stochastic(self.ref_to_seed_to_norm[level].values()) for level in self.ref_to_seed_to_norm.keys()}
+        return self._reduce(l2_stochastic)
     
     @property
     def ref_to_norm_linf(self) -> dict[int,float]:
-        return {level: linf_stochastic(self.ref_to_seed_to_norm[level].values()) for level in self.ref_to_seed_to_norm.keys()}
+        return self._reduce(linf_stochastic)
     
     @property
     def ref_to_norm_deviation(self) -> dict[int,float]:
-        return {level: standard_deviation(self.ref_to_seed_to_norm[level].values()) for level in self.ref_to_seed_to_norm.keys()}
+        return self._reduce(standard_deviation)
     
     @property
     def ref_to_EOC_l1(self) -> dict[int,float]:
@@ -4,84 +4,281 @@ import shutil
 from firedrake import FunctionSpace, Function
 
 from src.vtk_saver import save_function_as_VTK
+from src.math.operators import trajectory_to_array
+from src.postprocess.control_variate import ControlVariateEstimator
+from src.algorithms.observation import Observation
 
 
-def _update_mean(samples: int, old_mean_matrix: np.ndarray, update_matrix: np.ndarray) -> np.ndarray:
-    """Update the mean value."""
-    if not old_mean_matrix.shape == update_matrix.shape:
+def _update_moments(samples: int, mean: np.ndarray, square: np.ndarray, cube: np.ndarray, quartic: np.ndarray, update: np.ndarray) -> None:
+    """Update mean and sums of second, third and fourth powers of deviations in place by the one-pass formulas of Pébay. 'samples' counts the update."""
+    if not mean.shape == update.shape:
         msg = "Shape of mean array und update array do not match."
-        msg += f"\nShape mean array:\t {old_mean_matrix.shape}"
-        msg += f"\nShape update array:\t {update_matrix.shape}"
+        msg += f"\nShape mean array:\t {mean.shape}"
+        msg += f"\nShape update array:\t {update.shape}"
         raise ValueError(msg)
-    return samples/(samples + 1)*old_mean_matrix + 1/(samples+1)*update_matrix
+    delta = update - mean
+    delta_n = delta/samples
+    delta_n2 = delta_n*delta_n
+    term = delta*delta_n*(samples - 1)
+    mean += delta_n
+    #higher moments are updated first since they depend on the old lower moments
+    quartic += term*delta_n2*(samples*samples - 3*samples + 3) + 6*delta_n2*square - 4*delta_n*cube
+    cube += term*delta_n*(samples - 2) - 3*delta_n*square
+    square += term
+
+
+class P2QuantileEstimator:
+    """Class that estimates a quantile of each entry of an array stream by the P² algorithm of Jain and Chlamtac.
+
+    Five markers per entry are stored, hence the memory does not grow with the number of samples."""
+    def __init__(self, probability: float, shape: tuple[int,...]):
+        if not 0 < probability < 1:
+            msg = "Probability of quantile must be in (0,1)."
+            msg += f"\nProvided:\t {probability}"
+            raise ValueError(msg)
+        self.probability = probability
+        self.samples = 0
+        self.heights = np.zeros((5,) + shape)
+        self.positions = np.tile(np.arange(1,6,dtype=np.int64).reshape((5,) + (1,)*len(shape)),(1,) + shape)
+        self._increments = np.array([0,probability/2,probability,(1 + probability)/2,1])
+
+    def update(self, value: np.ndarray) -> None:
+        """Add a sample."""
+        if self.samples < 5:
+            self.heights[self.samples] = value
+            self.samples += 1
+            if self.samples == 5:
+                self.heights.sort(axis=0)
+            return
+        self.samples += 1
+        q, n = self.heights, self.positions
+        #find cell of the new value and extend extreme markers
+        cell = np.sum(value >= q[1:4],axis=0)
+        np.minimum(q[0],value,out=q[0])
+        np.maximum(q[4],value,out=q[4])
+        n[1:] += np.arange(1,5).reshape((4,) + (1,)*value.ndim) > cell
+        #adjust inner markers
+        desired = 1 + (self.samples - 1)*self._increments
+        for i in range(1,4):
+            d = desired[i] - n[i]
+            move = ((d >= 1) & (n[i+1] - n[i] > 1)) | ((d <= -1) & (n[i-1] - n[i] < -1))
+            if not np.any(move):
+                continue
+            sign = np.where(d >= 0,1,-1)
+            parabolic = q[i] + sign/(n[i+1] - n[i-1])*((n[i] - n[i-1] + sign)*(q[i+1] - q[i])/(n[i+1] - n[i]) 
+                                                       + (n[i+1] - n[i] - sign)*(q[i] - q[i-1])/(n[i] - n[i-1]))
+            neighbour_q = np.where(sign > 0,q[i+1],q[i-1])
+            neighbour_n = np.where(sign > 0,n[i+1],n[i-1])
+            linear = q[i] + sign*(neighbour_q - q[i])/(neighbour_n - n[i])
+            new_height = np.where((q[i-1] < parabolic) & (parabolic < q[i+1]),parabolic,linear)
+            q[i] = np.where(move,new_height,q[i])
+            n[i] = np.where(move,n[i] + sign,n[i])
+
+    @property
+    def quantile(self) -> np.ndarray:
+        """Return the estimated quantile. It is exact as long as less than six samples are available."""
+        if self.samples == 0:
+            return np.zeros(self.heights.shape[1:])
+        if self.samples <= 5:
+            return np.quantile(self.heights[:self.samples],self.probability,axis=0)
+        return self.heights[2].copy()
 
-def _update_square(samples: int, old_square_matrix: np.ndarray, update_matrix: np.ndarray) -> np.ndarray:
-    """Update the normalised second moment."""
-    if not old_square_matrix.shape == update_matrix.shape:
-        msg = "Shape of mean array und update array do not match."
-        msg += f"\nShape mean array:\t {old_square_matrix.shape}"
-        msg += f"\nShape update array:\t {update_matrix.shape}"
-        raise ValueError(msg)
-    return samples/(samples + 1)*old_square_matrix + 1/(samples+1)*np.power(update_matrix,2)
+
+class GroupedMeanEstimator:
+    """Class that estimates the mean and its standard error from samples that are correlated within consecutive groups.
+
+    Antithetic pairs form groups of size 2 and randomised quasi-Monte Carlo replicates form groups of the size of the point set.
+    Group means are independent, hence the standard error is based on their spread. Samples of an incomplete group only enter the mean."""
+    def __init__(self, group_size: int = 1):
+        self.group_size = group_size
+        self.samples = 0
+        self.groups = 0
+        self._sum = 0
+        self._group_sum = 0
+        self._group_mean = 0
+        self._group_square = 0
+
+    def update(self, value: np.ndarray | float) -> None:
+        """Add a sample."""
+        self._sum = self._sum + value
+        self._group_sum = self._group_sum + value
+        self.samples += 1
+        if self.samples % self.group_size == 0:
+            group_mean = self._group_sum/self.group_size
+            self._group_sum = 0
+            self.groups += 1
+            delta = group_mean - self._group_mean
+            self._group_mean = self._group_mean + delta/self.groups
+            self._group_square = self._group_square + delta*(group_mean - self._group_mean)
+
+    @property
+    def mean(self) -> np.ndarray | float:
+        """Return the sample mean."""
+        return self._sum/self.samples
+
+    @property
+    def standard_error(self) -> np.ndarray | float:
+        """Return the standard error of the sample mean. It vanishes if less than two groups are complete."""
+        if self.groups < 2:
+            return 0*self.mean
+        return np.sqrt(self._group_square/(self.groups - 1)/self.groups)
 
 
 
 class StatisticsObject:
-    """Class that contains utilities for the computation of mean, second moment, and deviation of 'ref -> time -> function' dictionary."""
-    def __init__(self, name: str, ref_to_time_grid: dict[int,list[float]], function_space: FunctionSpace):
+    """Class that contains utilities for the computation of mean, deviation, skewness, kurtosis and quantiles of 'ref -> time -> function' dictionary.
+
+    The statistics of a refinement level are stored in arrays of shape (time, degrees of freedom). Quantiles are approximated by the P² algorithm.
+    The name is the observed field, e.g., 'velocity_midpoints'. If times are given, the statistics of all refinement levels are restricted to these times
+    and the algorithm only stores the field at the nodal times closest to them."""
+    def __init__(self, 
+                 name: str, 
+                 ref_to_time_grid: dict[int,list[float]], 
+                 function_space: FunctionSpace, 
+                 quantiles: list[float] | None = None,
+                 times: tuple[float,...] | None = None):
         self.name = name
+        self.observation = Observation(name,times=times)
+        self.observations = (self.observation,)
         self.function_space = function_space
+        if times is not None:
+            ref_to_time_grid = {level: list(times) for level in ref_to_time_grid.keys()}
         self.ref_to_time_grid = ref_to_time_grid
-        self.ref_to_time_to_function_mean = {level: {time: Function(function_space) for time in ref_to_time_grid[level]} for level in ref_to_time_grid.keys()}
-        self.ref_to_time_to_function_square = {level: {time: Function(function_space) for time in ref_to_time_grid[level]} for level in ref_to_time_grid.keys()}
+        dof_shape = Function(function_space).dat.data_ro.shape
+        self.ref_to_mean = {level: np.zeros((len(ref_to_time_grid[level]),) + dof_shape) for level in ref_to_time_grid.keys()}
+        self.ref_to_square = {level: np.zeros((len(ref_to_time_grid[level]),) + dof_shape) for level in ref_to_time_grid.keys()}
+        self.ref_to_cube = {level: np.zeros((len(ref_to_time_grid[level]),) + dof_shape) for level in ref_to_time_grid.keys()}
+        self.ref_to_quartic = {level: np.zeros((len(ref_to_time_grid[level]),) + dof_shape) for level in ref_to_time_grid.keys()}
+        self.quantiles = quantiles if quantiles is not None else []
+        self.ref_to_quantile_estimators = {level: [P2QuantileEstimator(probability,(len(ref_to_time_grid[level]),) + dof_shape) for probability in self.quantiles] 
+                                           for level in ref_to_time_grid.keys()}
         self.samples = 0
+        self.ref_to_control_estimator = dict()
+        self._ref_to_deviation = None
+
+    def to_arrays(self, ref_to_time_to_function) -> dict[int,np.ndarray] | None:
+        """Return the trajectories as arrays of shape (time, degrees of freedom). 'None' is passed through, e.g., for a missing control."""
+        if ref_to_time_to_function is None:
+            return None
+        return {level: trajectory_to_array(ref_to_time_to_function[level],self.ref_to_time_grid[level]) for level in self.ref_to_mean.keys()}
+
+    def update(self,ref_to_time_to_function, ref_to_time_to_control = None) -> None:
+        """Add a sample to mean and second moment. 
         
+        If a control is given, it is used as control variate for the mean."""
+        self.update_arrays(self.to_arrays(ref_to_time_to_function),self.to_arrays(ref_to_time_to_control))
 
-    def update(self,ref_to_time_to_function) -> None:
-        """Add a sample to mean and second moment."""
-        for level in self.ref_to_time_to_function_mean.keys():
-            for time in self.ref_to_time_to_function_mean[level].keys():
-                #update mean
-                self.ref_to_time_to_function_mean[level][time].dat.data[:] = _update_mean(self.samples,
-                                                                                       self.ref_to_time_to_function_mean[level][time].dat.data,
-                                                                                       ref_to_time_to_function[level][time].dat.data)
-                #update square
-                self.ref_to_time_to_function_square[level][time].dat.data[:] = _update_square(self.samples,
-                                                                                       self.ref_to_time_to_function_square[level][time].dat.data,
-                                                                                       ref_to_time_to_function[level][time].dat.data)
+    def update_arrays(self, ref_to_array: dict[int,np.ndarray], ref_to_control_array: dict[int,np.ndarray] | None = None) -> None:
+        """Add a sample given by the arrays of 'to_arrays'. Only NumPy is used, hence it may run on a background thread."""
         self.samples += 1
-    
+        self._ref_to_deviation = None
+        for level in self.ref_to_mean.keys():
+            sample = ref_to_array[level]
+            _update_moments(self.samples,self.ref_to_mean[level],self.ref_to_square[level],self.ref_to_cube[level],self.ref_to_quartic[level],sample)
+            for estimator in self.ref_to_quantile_estimators[level]:
+                estimator.update(sample)
+            if ref_to_control_array is not None:
+                if level not in self.ref_to_control_estimator.keys():
+                    self.ref_to_control_estimator[level] = ControlVariateEstimator()
+                self.ref_to_control_estimator[level].update(sample,ref_to_control_array[level])
+
+    def update_control(self, ref_to_time_to_control) -> None:
+        """Add a sample of the control only."""
+        for level in self.ref_to_control_estimator.keys():
+            self.ref_to_control_estimator[level].update_control(trajectory_to_array(ref_to_time_to_control[level],self.ref_to_time_grid[level]))
+
+    def _array_to_functions(self, level: int, array: np.ndarray) -> dict[float,Function]:
+        """Convert array of shape (time, degrees of freedom) to 'time -> function' dictionary."""
+        time_to_function = dict()
+        for index, time in enumerate(self.ref_to_time_grid[level]):
+            time_to_function[time] = Function(self.function_space)
+            time_to_function[time].dat.data[:] = array[index]
+        return time_to_function
+
+    @property
+    def ref_to_deviation(self) -> dict[int,np.ndarray]:
+        """Return the standard deviation. It is cached until the next update."""
+        if self._ref_to_deviation is None:
+            self._ref_to_deviation = {level: np.sqrt(self.ref_to_square[level]/max(self.samples,1)) for level in self.ref_to_square.keys()}
+        return self._ref_to_deviation
+
+    @property
+    def ref_to_skewness(self) -> dict[int,np.ndarray]:
+        """Return the skewness. It is set to 0 where the deviation vanishes."""
+        ref_to_skewness = dict()
+        for level in self.ref_to_square.keys():
+            square = self.ref_to_square[level]
+            safe_square = np.where(square > 0,square,1)
+            ref_to_skewness[level] = np.where(square > 0,np.sqrt(self.samples)*self.ref_to_cube[level]/np.power(safe_square,1.5),0)
+        return ref_to_skewness
+
+    @property
+    def ref_to_kurtosis(self) -> dict[int,np.ndarray]:
+        """Return the excess kurtosis. It is set to 0 where the deviation vanishes."""
+        ref_to_kurtosis = dict()
+        for level in self.ref_to_square.keys():
+            square = self.ref_to_square[level]
+            safe_square = np.where(square > 0,square,1)
+            ref_to_kurtosis[level] = np.where(square > 0,self.samples*self.ref_to_quartic[level]/np.power(safe_square,2) - 3,0)
+        return ref_to_kurtosis
+
+    @property
+    def ref_to_time_to_function_mean(self) -> dict[int,dict[float,Function]]:
+        return {level: self._array_to_functions(level,self.ref_to_mean[level]) for level in self.ref_to_mean.keys()}
+
     @property
     def ref_to_time_to_function_deviation(self) -> dict[int,dict[float,Function]]:
-        """Compute the standard deviation based on mean and second moment."""
-        ref_to_time_to_function_dev = {level: {time: Function(self.function_space) for time in self.ref_to_time_grid[level]} for level in self.ref_to_time_grid.keys()}
-        for level in self.ref_to_time_to_function_mean.keys():
-            for time in self.ref_to_time_to_function_mean[level].keys():
-                #Analytically the deviation is always non-negative and there is no issue to take the square root. 
-                #But numerically it might happen that the deviation is negative, leading to difficulties. We avoid this by first truncating negative values to 0.
-                dev = self.ref_to_time_to_function_square[level][time].dat.data - np.power(self.ref_to_time_to_function_mean[level][time].dat.data,2)
-                zeros = np.zeros(dev.shape)
-                dev_zeros = np.maximum(dev,zeros)
-                ref_to_time_to_function_dev[level][time].dat.data[:] = np.sqrt(dev_zeros)
-        return ref_to_time_to_function_dev
+        return {level: self._array_to_functions(level,self.ref_to_deviation[level]) for level in self.ref_to_deviation.keys()}
+    
+    @property
+    def ref_to_time_to_function_control_variate(self) -> dict[int,dict[float,Function]]:
+        """Return the control variate estimate of the mean."""
+        return {level: self._array_to_functions(level,self.ref_to_control_estimator[level].mean) for level in self.ref_to_control_estimator.keys()}
 
     def _save_mean(self, name_directory: str) -> None:
         """Save the mean value in vtk format."""
-        for level in self.ref_to_time_to_function_mean.keys():
+        for level in self.ref_to_mean.keys():
             outfile_name = name_directory + "/refinement_" + str(level) + "/mean.pvd"
-            save_function_as_VTK(outfile_name,self.name + "_mean",self.ref_to_time_to_function_mean[level])
+            save_function_as_VTK(outfile_name,self.name + "_mean",self._array_to_functions(level,self.ref_to_mean[level]))
 
     def _save_deviation(self, name_directory: str) -> None:
         """Save the mean value in vtk format."""
-        for level in self.ref_to_time_to_function_mean.keys():
+        for level in self.ref_to_deviation.keys():
             outfile_name = name_directory + "/refinement_" + str(level) + "/deviation.pvd"
-            save_function_as_VTK(outfile_name,self.name + "_dev",self.ref_to_time_to_function_deviation[level])
+            save_function_as_VTK(outfile_name,self.name + "_dev",self._array_to_functions(level,self.ref_to_deviation[level]))
+
+    def _save_higher_moments(self, name_directory: str) -> None:
+        """Save skewness and kurtosis in vtk format."""
+        ref_to_skewness = self.ref_to_skewness
+        ref_to_kurtosis = self.ref_to_kurtosis
+        for level in self.ref_to_mean.keys():
+            outfile_name = name_directory + "/refinement_" + str(level) + "/skewness.pvd"
+            save_function_as_VTK(outfile_name,self.name + "_skew",self._array_to_functions(level,ref_to_skewness[level]))
+            outfile_name = name_directory + "/refinement_" + str(level) + "/kurtosis.pvd"
+            save_function_as_VTK(outfile_name,self.name + "_kurt",self._array_to_functions(level,ref_to_kurtosis[level]))
+
+    def _save_quantiles(self, name_directory: str) -> None:
+        """Save quantiles in vtk format."""
+        for level in self.ref_to_quantile_estimators.keys():
+            for estimator in self.ref_to_quantile_estimators[level]:
+                outfile_name = name_directory + "/refinement_" + str(level) + f"/quantile_{100*estimator.probability:g}.pvd"
+                save_function_as_VTK(outfile_name,self.name + f"_q{100*estimator.probability:g}",self._array_to_functions(level,estimator.quantile))
+
+    def _save_control_variate(self, name_directory: str) -> None:
+        """Save the control variate estimate of the mean in vtk format."""
+        for level in self.ref_to_control_estimator.keys():
+            outfile_name = name_directory + "/refinement_" + str(level) + "/cv_mean.pvd"
+            save_function_as_VTK(outfile_name,self.name + "_cv_mean",self._array_to_functions(level,self.ref_to_control_estimator[level].mean))
 
     def save(self,name_directory: str) -> None:
-        """Save mean and standard deviation in vtk format."""
+        """Save mean, standard deviation, skewness, kurtosis and quantiles in vtk format."""
         save_directory = name_directory + "/" + self.name
         #remove old data
         if os.path.isdir(save_directory):
                 shutil.rmtree("./" + save_directory)
         self._save_mean(save_directory)
-        self._save_deviation(save_directory)
\ No newline at end of file
+        self._save_deviation(save_directory)
+        self._save_higher_moments(save_directory)
+        self._save_quantiles(save_directory)
+        if self.ref_to_control_estimator:
+            self._save_control_variate(save_directory)
@@ -1,88 +1,122 @@
 from firedrake import Function
 import csv
 import os
-from functools import cached_property
+from numpy import zeros_like
 
-from src.utils import swap_dictionary_keys
 from src.math.norms.stochastic import l1_stochastic, l2_stochastic, linf_stochastic
 from src.math.statistics import standard_deviation
 from src.math.distances.Bochner_time import BochnerTimeDistance
 from src.math.distances.space import SpaceDistance
+from src.discretisation.time import TimeDiscretisation
+from src.math.operators import DofArray, operator_space, dof_values
 from src.postprocess.eoc import get_ref_to_EOC
 from src.postprocess.processmanager import ProcessObject
+from src.postprocess.sample_table import SampleTable
+from src.utils import ComputationCache
 
 def _compare_coarse_and_fine_on_Y_X(ref_to_time_to_coarse: dict[int,dict[float,Function]],
                                     time_to_fine: dict[float,Function],
                                     Y_time_distance: BochnerTimeDistance,
-                                    X_space_distance: SpaceDistance) -> dict[int,float]:
+                                    X_space_distance: SpaceDistance,
+                                    cache: ComputationCache | None = None,
+                                    time_disc: TimeDiscretisation | None = None) -> dict[int,float]:
     """Compute the distance of coarse approximations and the finest approximation with respect to the 'Y' time distance and 'X' space distance. 
     
-    Return 'refinement level -> error' dictionary."""
-    return {level: Y_time_distance(ref_to_time_to_coarse[level],time_to_fine,X_space_distance) for level in ref_to_time_to_coarse.keys()}
+    The precomputed alignments of the time grids of 'time_disc' are used if provided. Return 'refinement level -> error' dictionary."""
+    return {level: Y_time_distance(ref_to_time_to_coarse[level],time_to_fine,X_space_distance,cache=cache,alignment=_alignment(time_disc,level)) 
+            for level in ref_to_time_to_coarse.keys()}
 
 
 def _compare_coarse_and_fine_on_Y_X_relative(ref_to_time_to_coarse: dict[int,dict[float,Function]],
                                     time_to_fine: dict[float,Function],
                                     Y_time_distance: BochnerTimeDistance,
-                                    X_space_distance: SpaceDistance) -> dict[int,float]:
+                                    X_space_distance: SpaceDistance,
+                                    cache: ComputationCache | None = None,
+                                    time_disc: TimeDiscretisation | None = None) -> dict[int,float]:
     """Compute the relative distance of coarse approximations and the finest approximation with respect to the 'Y' time distance and 'X' space distance. 
     Rescale error by Y-X norm of fine approximation.
     
     Return 'refinement level -> error' dictionary."""
-    time_to_zero = {time: Function(time_to_fine[time].function_space()) for time in time_to_fine}
+    time_to_zero = {time: DofArray(operator_space(time_to_fine[time]),zeros_like(dof_values(time_to_fine[time]))) for time in time_to_fine}
+    fine_norm = Y_time_distance(time_to_fine,time_to_zero,X_space_distance,alignment=_alignment(time_disc))
 
-    return {level: Y_time_distance(ref_to_time_to_coarse[level],time_to_fine,X_space_distance)/Y_time_distance(time_to_fine,time_to_zero,X_space_distance) 
+    return {level: Y_time_distance(ref_to_time_to_coarse[level],time_to_fine,X_space_distance,cache=cache,alignment=_alignment(time_disc,level))/fine_norm 
             for level in ref_to_time_to_coarse.keys()}
 
+def _alignment(time_disc: TimeDiscretisation | None, level: int | None = None):
+    """Return the alignment of the time grids of the level (default: finest level) and the finest level or None if no time discretisation is provided."""
+    if time_disc is None:
+        return None
+    fine_level = time_disc.refinement_levels[-1]
+    return time_disc.get_alignment(fine_level if level is None else level,fine_level)
+
 
 class TimeComparison(ProcessObject):
-    """Class that contains tools for comparison of coarse and fine functions."""
-    def __init__(self, ref_to_stepsize: dict[int,float], 
+    """Class that contains tools for comparison of coarse and fine functions. 
+    
+    The time grids of coarse and finest level are aligned once by the time discretisation."""
+    def __init__(self, time_disc: TimeDiscretisation, 
                  error_name: str, 
                  time_distance: BochnerTimeDistance,
                  space_distance: SpaceDistance,
                  comparison_type: str = "absolute") -> None:
-        self.seed_to_ref_to_error = dict()
-        self.seed_Id = 0
-        self.ref_to_stepsize = ref_to_stepsize
+        self.sample_table = None
+        self.time_disc = time_disc
+        self.ref_to_stepsize = time_disc.ref_to_time_stepsize
         self.error_name = error_name
         self.time_distance = time_distance
         self.space_distance = space_distance
         self.comparison_type = comparison_type
 
-    def update(self, ref_to_time_to_coarse: dict[int,dict[float,Function]], time_to_fine: dict[float,Function]) -> None:
-        """Add an entry to the 'seed -> refinement level -> error' dictionary."""
+    def update(self, 
+               ref_to_time_to_coarse: dict[int,dict[float,Function]], 
+               time_to_fine: dict[float,Function], 
+               cache: ComputationCache | None = None) -> None:
+        """Add a sample of 'refinement level -> error' to the sample table. 
+        
+        Local errors and time integrals are shared with other comparisons of the same data via the cache."""
         match self.comparison_type:
             case "absolute":
-                self.seed_to_ref_to_error[self.seed_Id] = _compare_coarse_and_fine_on_Y_X(ref_to_time_to_coarse,time_to_fine,self.time_distance,self.space_distance)
+                self._append(_compare_coarse_and_fine_on_Y_X(ref_to_time_to_coarse,time_to_fine,self.time_distance,self.space_distance,cache,self.time_disc))
             case "relative":
-                self.seed_to_ref_to_error[self.seed_Id] = _compare_coarse_and_fine_on_Y_X_relative(ref_to_time_to_coarse,time_to_fine,self.time_distance,self.space_distance)
+                self._append(_compare_coarse_and_fine_on_Y_X_relative(ref_to_time_to_coarse,time_to_fine,self.time_distance,self.space_distance,cache,self.time_disc))
             case other:
                 print(f"The comparison type '{self.comparison_type}' is not available.")
                 raise NotImplementedError
-        self.seed_Id += 1
 
-    @cached_property
-    def ref_to_seed_to_error(self):
-        if len(self.seed_to_ref_to_error) == 0:
+    @property
+    def seed_Id(self) -> int:
+        if self.sample_table is None:
+            return 0
+        return self.sample_table.samples
+
+    def _append(self, ref_to_error: dict[int,float]) -> None:
+        """Add a sample of 'refinement level -> error' to the sample table."""
+        if self.sample_table is None:
+            self.sample_table = SampleTable({level: [0] for level in ref_to_error.keys()})
+        self.sample_table.append(ref_to_error)
+
+    def _reduce(self, statistic) -> dict[int,float]:
+        """Apply the statistic along the seed axis."""
+        if self.sample_table is None:
             return dict()
-        return swap_dictionary_keys(self.seed_to_ref_to_error)
+        return {level: float(statistic(self.sample_table[level][:,0,0])) for level in self.sample_table.refinement_levels}
     
     @property
     def ref_to_error_l1(self) -> dict[int,float]:
-        return {level: l1_stochastic(self.ref_to_seed_to_error[level].values()) for level in self.ref_to_seed_to_error.keys()}
+        return self._reduce(l1_stochastic)
     
     @property
     def ref_to_error_l2(self) -> dict[int,float]:
-        return {level: l2_stochastic(self.ref_to_seed_to_error[level].values()) for level in self.ref_to_seed_to_error.keys()}
+        return self._reduce(l2_stochastic)
     
     @property
     def ref_to_error_linf(self) -> dict[int,float]:
-        return {level: linf_stochastic(self.ref_to_seed_to_error[level].values()) for level in self.ref_to_seed_to_error.keys()}
+        return self._reduce(linf_stochastic)
     
     @property
     def ref_to_error_deviation(self) -> dict[int,float]:
-        return {level: standard_deviation(self.ref_to_seed_to_error[level].values()) for level in self.ref_to_seed_to_error.keys()}
+        return self._reduce(standard_deviation)
     
     @property
     def ref_to_EOC_l1(self) -> dict[int,float]:
@@ -1,4 +1,5 @@
 import math
+from typing import Iterable
 
 def format_header(headline: str) -> str:
     """Return underlined headline."""
@@ -11,11 +12,13 @@ def _ns_to_readable_time(nanoseconds: int) -> str:
     seconds = (nanoseconds - minutes*1e9*60)/(1e9)
     return f"{hours}h {minutes:>2}min {seconds:>5.2f}s"
 
-def format_runtime(runtimes: dict[str,float]) -> str:
-    """Return formatted string of run times."""
-    total_time = sum(runtimes.values())
+def format_runtime(runtimes: dict[str,float], overlapping: Iterable[str] = ()) -> str:
+    """Return formatted string of run times. Overlapping run times, e.g., of a background thread, are marked by '*' and don't enter the total."""
+    overlapping = set(overlapping)
+    total_time = sum(runtimes[time] for time in runtimes.keys() if time not in overlapping)
     msg = format_header("RUN TIMES")
     for time in runtimes.keys():
-            msg += f"\n{time:_^12}:\t {_ns_to_readable_time(runtimes[time])} | {100*runtimes[time]/total_time:5.02f}%"
-    msg += f"\n___total____:\t {_ns_to_readable_time(sum(runtimes.values()))}"
+            marker = "*" if time in overlapping else ""
+            msg += f"\n{time:_^12}:\t {_ns_to_readable_time(runtimes[time])} | {100*runtimes[time]/total_time:5.02f}%{marker}"
+    msg += f"\n___total____:\t {_ns_to_readable_time(total_time)}"
     return msg
\ No newline at end of file
@@ -1,4 +1,5 @@
-from typing import TypeVar
+from typing import TypeVar, Iterable, Callable, Hashable
+from inspect import signature
 import logging
 
 Keys1 = TypeVar("Keys1")
@@ -35,6 +36,45 @@ def swap_dictionary_keys(key1_to_key2_to_value: dict[Keys1,dict[Keys2, Values]])
             
     return key2_to_key1_to_value
 
+Result = TypeVar("Result")
+class ComputationCache:
+    """Class that shares intermediate results between consumers of the same data.
+
+    Keys are built from the identity of the input objects and a description of the computation. 
+    Inputs are kept alive while the cache exists, such that their identities are not reused."""
+    def __init__(self) -> None:
+        self._key_to_result = dict()
+        self._keep_alive = dict()
+
+    def key(self, name: Hashable, *objects) -> tuple:
+        """Return the key of a computation on the given objects."""
+        for obj in objects:
+            self._keep_alive[id(obj)] = obj
+        return (name,) + tuple(id(obj) for obj in objects)
+
+    def get_or_compute(self, key: tuple, compute: Callable[[],Result]) -> Result:
+        """Return the stored result or compute and store it."""
+        if key not in self._key_to_result.keys():
+            self._key_to_result[key] = compute()
+        return self._key_to_result[key]
+
+    def lookup(self, key: tuple):
+        """Return the stored result or None."""
+        return self._key_to_result.get(key)
+
+    def store(self, key: tuple, result: Result) -> Result:
+        """Store and return the result."""
+        self._key_to_result[key] = result
+        return result
+
+    def clear(self) -> None:
+        self._key_to_result = dict()
+        self._keep_alive = dict()
+
+def accepts_cache(function: Callable) -> bool:
+    """Check whether the function accepts a computation cache as keyword 'cache'."""
+    return "cache" in signature(function).parameters
+
 def logstring_to_logger(loglevel: str):
     match loglevel:
         case "debug":